@@ -1,4 +1,10 @@
-import PetrolPumpService from '../../service/PetrolPump/detail.service.js';
+import PetrolPumpService, { ValidationError } from '../../service/PetrolPump/detail.service.js';
+import { sendNegotiated } from '../../middleware/eventBody.js';
+
+const MAX_BULK_EVENTS = 500;
+
+// Clients send the key of a vehicle visit in the Idempotency-Key header or in the body
+const idempotencyKeyOf = (req) => req.get('Idempotency-Key') || req.body.idempotencyKey || null;
 
 const PetrolPumpDetailController = {
     createPetrolPump: async (req, res) => {
@@ -10,7 +16,8 @@ const PetrolPumpDetailController = {
                 enteringTime,
                 exitTime,
                 fillingTime,
-                date
+                date,
+                idempotencyKeyOf(req)
             );
             res.status(201).json({ message: 'Petrol Pump record created successfully.', data: result });
         } catch (error) {
@@ -18,6 +25,22 @@ const PetrolPumpDetailController = {
         }
     },
 
+    processEvents: async (req, res) => {
+        try {
+            const { events } = req.body;
+            if (!Array.isArray(events) || events.length === 0) {
+                return res.status(400).json({ message: 'Request body must contain a non-empty events array.' });
+            }
+            if (events.length > MAX_BULK_EVENTS) {
+                return res.status(413).json({ message: `At most ${MAX_BULK_EVENTS} events per request.` });
+            }
+            const results = await PetrolPumpService.processEvents(events);
+            sendNegotiated(req, res, 200, { message: 'Petrol Pump events processed.', results });
+        } catch (error) {
+            res.status(500).json({ message: 'Failed to process Petrol Pump events.', error: error.message });
+        }
+    },
+
     getAllPetrolPumps: async (req, res) => {
         try {
             const result = await PetrolPumpService.getAllPetrolPumps();
@@ -27,16 +50,18 @@ const PetrolPumpDetailController = {
         }
     },
 
+    // Query: from, to, date, since, limit, cursor. The body stays an array of rows;
+    // the cursor for the next page, if any, is sent in the X-Next-Cursor header.
     getPetrolPumpById: async (req, res) => {
         try {
             const { id } = req.params;
-            const result = await PetrolPumpService.getPetrolPumpById(id);
-            if (result) {
-                res.status(200).json(result);
-            } else {
-                res.status(404).json({ message: 'Petrol Pump record not found.' });
-            }
+            const { rows, nextCursor } = await PetrolPumpService.getPetrolPumpById(id, req.query);
+            if (nextCursor) res.set('X-Next-Cursor', nextCursor);
+            res.status(200).json(rows);
         } catch (error) {
+            if (error instanceof ValidationError) {
+                return res.status(400).json({ message: error.message });
+            }
             res.status(500).json({ message: 'Failed to fetch Petrol Pump record.', error: error.message });
         }
     },
@@ -48,7 +73,8 @@ const PetrolPumpDetailController = {
                 petrolPumpID,
                 vehicleID,
                 exitTime,
-                fillingTime
+                fillingTime,
+                idempotencyKeyOf(req)
             );
             res.status(200).json({ message: 'Petrol Pump record updated successfully.', data: result });
         } catch (error) {
@@ -69,12 +95,16 @@ const PetrolPumpDetailController = {
     getPetrolPumpByIdAndDate: async (req, res) => {
         const { id, date } = req.params;
         try {
-            const petrolPump = await PetrolPumpService.getPetrolPumpByIdAndDate(id, date);
-            if (!petrolPump) {
+            const { rows, nextCursor } = await PetrolPumpService.getPetrolPumpByIdAndDate(id, date, req.query);
+            if (rows.length === 0 && !req.query.cursor) {
                 return res.status(404).json({ message: 'No record found for this pump on this date' });
             }
-            res.json(petrolPump);
+            if (nextCursor) res.set('X-Next-Cursor', nextCursor);
+            res.json(rows);
         } catch (error) {
+            if (error instanceof ValidationError) {
+                return res.status(400).json({ message: error.message });
+            }
             res.status(500).json({ message: 'Error fetching record', error: error.message });
         }
     },
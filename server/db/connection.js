@@ -1,28 +1,30 @@
 import mysql from 'mysql2';
 
-function handleDisconnect() {
-    const connection = mysql.createConnection({
-        host: 'localhost',
-        user: 'root',
-        password: 'Anurag@1532',
-        database: 'petrolpump'
-    });
-    connection.connect(err => {
-        if (err) {
-            console.error('Error connecting to MySQL:', err.stack);
-            setTimeout(handleDisconnect, 2000); 
-        } else {
-            console.log('Connected to MySQL as id', connection.threadId);
-        }
-    });
-    connection.on('error', err => {
-        if (err.code === 'PROTOCOL_CONNECTION_LOST') {
-            handleDisconnect();
-        } else {
-            throw err;
-        }
-    });
-    return connection;
-}
-const connection = handleDisconnect();
-export default connection;
\ No newline at end of file
+// Connection pool shared by all repositories. Concurrent requests from many pumps
+// each get their own connection instead of queueing on a single one, and mysql2
+// keeps a per-connection cache of statements prepared through execute().
+const pool = mysql.createPool({
+    host: process.env.DB_HOST || 'localhost',
+    user: process.env.DB_USER || 'root',
+    password: process.env.DB_PASSWORD || 'Anurag@1532',
+    database: process.env.DB_NAME || 'petrolpump',
+    connectionLimit: Number(process.env.DB_POOL_SIZE) || 10,
+    maxIdle: Number(process.env.DB_POOL_SIZE) || 10,
+    idleTimeout: 60000,
+    waitForConnections: true,
+    queueLimit: 0,
+    enableKeepAlive: true
+});
+
+// Connections that drop are discarded and replaced by the pool; this only reports
+// whether the database is reachable at startup
+pool.getConnection((err, connection) => {
+    if (err) {
+        console.error('Error connecting to MySQL:', err.stack);
+    } else {
+        console.log('Connected to MySQL as id', connection.threadId);
+        connection.release();
+    }
+});
+
+export default pool;
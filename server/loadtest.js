@@ -0,0 +1,87 @@
+// Entry/exit load test for the detail routes.
+//
+// Sends `count` vehicle entries (POST /PetrolPumps/detail) followed by their exits
+// (PUT /PetrolPumps/detail/:Pid/:Vid) with `concurrency` requests in flight, spread
+// over `pumps` petrol pumps, and reports requests per second and latency for each
+// phase. Uses only Node built-ins, so it runs without installing anything.
+//
+//   node loadtest.js [--url http://localhost:3000] [--count 2000] [--concurrency 50] [--pumps 20]
+//
+// To compare pool settings, run the server against a local MySQL loaded from sql.txt,
+// e.g. `DB_POOL_SIZE=1 npm start` versus `DB_POOL_SIZE=20 npm start`. The pumps must
+// exist in `Petrol Pump` (LOADTEST-1 ... LOADTEST-<pumps>) because of the foreign key.
+import { performance } from 'perf_hooks';
+
+const args = process.argv.slice(2);
+const option = (name, fallback) => {
+    const index = args.indexOf(`--${name}`);
+    return index >= 0 ? args[index + 1] : fallback;
+};
+
+const baseUrl = option('url', 'http://localhost:3000');
+const count = Number(option('count', 2000));
+const concurrency = Number(option('concurrency', 50));
+const pumps = Number(option('pumps', 20));
+const runId = Date.now().toString(36);
+
+const vehicles = Array.from({ length: count }, (_, i) => ({
+    petrolPumpID: `LOADTEST-${(i % pumps) + 1}`,
+    vehicleID: `${runId}-${i}`
+}));
+
+const entry = ({ petrolPumpID, vehicleID }) => fetch(`${baseUrl}/PetrolPumps/detail`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+        petrolPumpID,
+        vehicleID,
+        enteringTime: '10:00:00',
+        exitTime: '',
+        fillingTime: '',
+        date: new Date().toISOString().slice(0, 10)
+    })
+});
+
+const exit = ({ petrolPumpID, vehicleID }) => fetch(`${baseUrl}/PetrolPumps/detail/${petrolPumpID}/${vehicleID}`, {
+    method: 'PUT',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ petrolPumpID, vehicleID, exitTime: '10:05:00', fillingTime: '300 seconds' })
+});
+
+// Run send() for every vehicle with at most `concurrency` requests in flight
+async function runPhase(name, send) {
+    const latencies = [];
+    let failures = 0;
+    let next = 0;
+
+    const worker = async () => {
+        while (next < vehicles.length) {
+            const vehicle = vehicles[next++];
+            const started = performance.now();
+            try {
+                const response = await send(vehicle);
+                await response.arrayBuffer();
+                if (!response.ok) failures += 1;
+            } catch (error) {
+                failures += 1;
+            }
+            latencies.push(performance.now() - started);
+        }
+    };
+
+    const started = performance.now();
+    await Promise.all(Array.from({ length: concurrency }, worker));
+    const seconds = (performance.now() - started) / 1000;
+
+    latencies.sort((a, b) => a - b);
+    const percentile = (p) => latencies[Math.min(latencies.length - 1, Math.floor(latencies.length * p))].toFixed(1);
+    console.log(
+        `${name.padEnd(6)} ${(vehicles.length / seconds).toFixed(0).padStart(7)} req/s  ` +
+        `p50 ${percentile(0.5)} ms  p95 ${percentile(0.95)} ms  p99 ${percentile(0.99)} ms  ` +
+        `failures ${failures}/${vehicles.length}`
+    );
+}
+
+console.log(`${count} vehicles over ${pumps} pumps, ${concurrency} concurrent requests, ${baseUrl}`);
+await runPhase('entry', entry);
+await runPhase('exit', exit);
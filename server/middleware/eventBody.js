@@ -0,0 +1,60 @@
+import zlib from 'zlib';
+import { encode, decode } from './msgpack.js';
+
+const MSGPACK_TYPE = 'application/msgpack';
+const MAX_BODY_BYTES = 1024 * 1024;       // Compressed body size accepted from a pump
+const MAX_DECODED_BYTES = 5 * 1024 * 1024; // Guards against compression bombs
+
+// zstd is built into zlib from Node 22.15; older runtimes answer 415 and clients send gzip or JSON
+const decompressors = {
+    identity: (body) => body,
+    gzip: (body) => zlib.gunzipSync(body, { maxOutputLength: MAX_DECODED_BYTES }),
+    ...(zlib.zstdDecompressSync && {
+        zstd: (body) => zlib.zstdDecompressSync(body, { maxOutputLength: MAX_DECODED_BYTES })
+    })
+};
+
+const readBody = (req) => new Promise((resolve, reject) => {
+    const chunks = [];
+    let size = 0;
+    req.on('data', (chunk) => {
+        size += chunk.length;
+        if (size > MAX_BODY_BYTES) {
+            reject(Object.assign(new Error('Request body too large.'), { status: 413 }));
+            req.destroy();
+            return;
+        }
+        chunks.push(chunk);
+    });
+    req.on('end', () => resolve(Buffer.concat(chunks)));
+    req.on('error', reject);
+});
+
+// Bulk uploads from pumps on metered links may be MessagePack instead of JSON and
+// gzip or zstd compressed. JSON bodies (gzip included) are already parsed by
+// express.json(); this decodes the compact ones into the same req.body.
+export const decodeEventBody = async (req, res, next) => {
+    if (!req.is(MSGPACK_TYPE)) return next();
+
+    const encoding = (req.get('Content-Encoding') || 'identity').toLowerCase();
+    const decompress = decompressors[encoding];
+    if (!decompress) {
+        res.set('Accept-Encoding', Object.keys(decompressors).join(', '));
+        return res.status(415).json({ message: `Unsupported Content-Encoding ${encoding}.` });
+    }
+
+    try {
+        req.body = decode(decompress(await readBody(req)));
+        next();
+    } catch (error) {
+        res.status(error.status || 400).json({ message: 'Invalid MessagePack event body.', error: error.message });
+    }
+};
+
+// Answer in MessagePack when the client prefers it, otherwise in JSON
+export const sendNegotiated = (req, res, status, body) => {
+    if (req.accepts(['application/json', MSGPACK_TYPE]) === MSGPACK_TYPE) {
+        return res.status(status).type(MSGPACK_TYPE).send(encode(body));
+    }
+    return res.status(status).json(body);
+};
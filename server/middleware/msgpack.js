@@ -0,0 +1,193 @@
+// Minimal MessagePack codec for bulk event bodies: nil, booleans, integers, floats,
+// strings, binary, arrays and maps. Extension types (timestamps included) are not
+// used by the pumps and are rejected.
+
+const MAX_DEPTH = 64;
+
+const encodeValue = (value, out) => {
+    if (value === null || value === undefined) {
+        out.push(Buffer.from([0xc0]));
+    } else if (typeof value === 'boolean') {
+        out.push(Buffer.from([value ? 0xc3 : 0xc2]));
+    } else if (typeof value === 'number') {
+        encodeNumber(value, out);
+    } else if (typeof value === 'bigint') {
+        const buffer = Buffer.alloc(9);
+        if (value < 0n) {
+            buffer[0] = 0xd3;
+            buffer.writeBigInt64BE(value, 1);
+        } else {
+            buffer[0] = 0xcf;
+            buffer.writeBigUInt64BE(value, 1);
+        }
+        out.push(buffer);
+    } else if (typeof value === 'string') {
+        const bytes = Buffer.from(value, 'utf8');
+        out.push(header(bytes.length, 0xa0, 31, [0xd9, 0xda, 0xdb]), bytes);
+    } else if (Buffer.isBuffer(value) || value instanceof Uint8Array) {
+        out.push(header(value.length, null, -1, [0xc4, 0xc5, 0xc6]), Buffer.from(value));
+    } else if (Array.isArray(value)) {
+        out.push(header(value.length, 0x90, 15, [null, 0xdc, 0xdd]));
+        value.forEach((item) => encodeValue(item, out));
+    } else if (value instanceof Date) {
+        encodeValue(value.toISOString(), out);
+    } else if (typeof value === 'object') {
+        // Like JSON, keys with undefined values are left out
+        const entries = Object.entries(value).filter(([, item]) => item !== undefined);
+        out.push(header(entries.length, 0x80, 15, [null, 0xde, 0xdf]));
+        entries.forEach(([key, item]) => {
+            encodeValue(key, out);
+            encodeValue(item, out);
+        });
+    } else {
+        throw new TypeError(`Cannot encode ${typeof value} as MessagePack.`);
+    }
+};
+
+const encodeNumber = (value, out) => {
+    if (!Number.isSafeInteger(value)) {
+        const buffer = Buffer.alloc(9);
+        buffer[0] = 0xcb;
+        buffer.writeDoubleBE(value, 1);
+        out.push(buffer);
+    } else if (value >= 0 && value < 0x80) {
+        out.push(Buffer.from([value]));
+    } else if (value < 0 && value >= -0x20) {
+        out.push(Buffer.from([value & 0xff]));
+    } else if (value >= -0x80000000 && value <= 0xffffffff) {
+        const buffer = Buffer.alloc(5);
+        if (value < 0) {
+            buffer[0] = 0xd2;
+            buffer.writeInt32BE(value, 1);
+        } else {
+            buffer[0] = 0xce;
+            buffer.writeUInt32BE(value, 1);
+        }
+        out.push(buffer);
+    } else {
+        encodeValue(BigInt(value), out);
+    }
+};
+
+// Type byte and length for str/bin/array/map: the fix form when the length fits in
+// fixMax, otherwise the 8, 16 or 32-bit form (null where the format has none)
+const header = (length, fixBase, fixMax, [code8, code16, code32]) => {
+    if (length <= fixMax) return Buffer.from([fixBase | length]);
+    if (code8 !== null && length < 0x100) return Buffer.from([code8, length]);
+    if (length < 0x10000) {
+        const buffer = Buffer.alloc(3);
+        buffer[0] = code16;
+        buffer.writeUInt16BE(length, 1);
+        return buffer;
+    }
+    const buffer = Buffer.alloc(5);
+    buffer[0] = code32;
+    buffer.writeUInt32BE(length, 1);
+    return buffer;
+};
+
+export const encode = (value) => {
+    const out = [];
+    encodeValue(value, out);
+    return Buffer.concat(out);
+};
+
+class Decoder {
+    constructor(buffer) {
+        this.buffer = buffer;
+        this.offset = 0;
+    }
+
+    take(length) {
+        if (this.offset + length > this.buffer.length) throw new RangeError('Truncated MessagePack data.');
+        const start = this.offset;
+        this.offset += length;
+        return start;
+    }
+
+    uint(bytes) {
+        const start = this.take(bytes);
+        return bytes === 1 ? this.buffer.readUInt8(start)
+            : bytes === 2 ? this.buffer.readUInt16BE(start)
+                : this.buffer.readUInt32BE(start);
+    }
+
+    int64(signed) {
+        const start = this.take(8);
+        const value = signed ? this.buffer.readBigInt64BE(start) : this.buffer.readBigUInt64BE(start);
+        // Integers beyond 2^53 stay exact as BigInt
+        return value >= BigInt(Number.MIN_SAFE_INTEGER) && value <= BigInt(Number.MAX_SAFE_INTEGER)
+            ? Number(value) : value;
+    }
+
+    string(length) {
+        const start = this.take(length);
+        return this.buffer.toString('utf8', start, start + length);
+    }
+
+    bytes(length) {
+        const start = this.take(length);
+        return Buffer.from(this.buffer.subarray(start, start + length));
+    }
+
+    array(length, depth) {
+        const items = [];
+        for (let i = 0; i < length; i++) items.push(this.value(depth));
+        return items;
+    }
+
+    map(length, depth) {
+        const map = {};
+        for (let i = 0; i < length; i++) {
+            const key = this.value(depth);
+            if (typeof key !== 'string' && typeof key !== 'number') throw new TypeError('MessagePack map keys must be strings or numbers.');
+            // Keys become own data properties, so "__proto__" cannot replace the prototype
+            Object.defineProperty(map, key, { value: this.value(depth), enumerable: true, writable: true, configurable: true });
+        }
+        return map;
+    }
+
+    value(depth = 0) {
+        if (depth > MAX_DEPTH) throw new RangeError('MessagePack data nested too deeply.');
+        const code = this.uint(1);
+        if (code < 0x80) return code;
+        if (code < 0x90) return this.map(code & 0x0f, depth + 1);
+        if (code < 0xa0) return this.array(code & 0x0f, depth + 1);
+        if (code < 0xc0) return this.string(code & 0x1f);
+        if (code >= 0xe0) return code - 0x100;
+
+        switch (code) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return this.bytes(this.uint(1));
+            case 0xc5: return this.bytes(this.uint(2));
+            case 0xc6: return this.bytes(this.uint(4));
+            case 0xca: return this.buffer.readFloatBE(this.take(4));
+            case 0xcb: return this.buffer.readDoubleBE(this.take(8));
+            case 0xcc: return this.uint(1);
+            case 0xcd: return this.uint(2);
+            case 0xce: return this.uint(4);
+            case 0xcf: return this.int64(false);
+            case 0xd0: return this.buffer.readInt8(this.take(1));
+            case 0xd1: return this.buffer.readInt16BE(this.take(2));
+            case 0xd2: return this.buffer.readInt32BE(this.take(4));
+            case 0xd3: return this.int64(true);
+            case 0xd9: return this.string(this.uint(1));
+            case 0xda: return this.string(this.uint(2));
+            case 0xdb: return this.string(this.uint(4));
+            case 0xdc: return this.array(this.uint(2), depth + 1);
+            case 0xdd: return this.array(this.uint(4), depth + 1);
+            case 0xde: return this.map(this.uint(2), depth + 1);
+            case 0xdf: return this.map(this.uint(4), depth + 1);
+            default: throw new TypeError(`Unsupported MessagePack type 0x${code.toString(16)}.`);
+        }
+    }
+}
+
+export const decode = (buffer) => {
+    const decoder = new Decoder(Buffer.from(buffer.buffer, buffer.byteOffset, buffer.byteLength));
+    const value = decoder.value();
+    if (decoder.offset !== buffer.length) throw new RangeError('Extra bytes after MessagePack data.');
+    return value;
+};
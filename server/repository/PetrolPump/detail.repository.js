@@ -1,4 +1,63 @@
-import connection from '../../db/connection.js';
+import pool from '../../db/connection.js';
+
+// execute() rejects undefined bind values; store missing fields as NULL
+const bindable = (values) => values.map((value) => (value === undefined ? null : value));
+
+// Rows of one pump ordered by (Date, VehicleID, EnteringTime, ID), which matches the
+// idx_detail_pump_date_vehicle index, so filters and keyset pages are index range scans.
+// The ID primary key breaks ties between rows with equal sort columns, so the keyset
+// cursor is unique and no row is skipped at a page boundary.
+// filters: from/to ('YYYY-MM-DD'), since ({ date, time }: entered at or after), limit,
+// and after ({ date, vehicleID, enteringTime, id }: the last row of the previous page).
+// Fetches one extra row to tell whether another page follows.
+function queryPetrolPumpDetails(petrolPumpID, filters) {
+    return new Promise((resolve, reject) => {
+        const conditions = ['d.`PetrolPumpID` = ?'];
+        const values = [petrolPumpID];
+
+        if (filters.from) {
+            conditions.push('d.`Date` >= ?');
+            values.push(filters.from);
+        }
+        if (filters.to) {
+            conditions.push('d.`Date` <= ?');
+            values.push(filters.to);
+        }
+        if (filters.since) {
+            conditions.push('(d.`Date` > ? OR (d.`Date` = ? AND d.`EnteringTime` >= ?))');
+            values.push(filters.since.date, filters.since.date, filters.since.time);
+        }
+        if (filters.after) {
+            const { date, vehicleID, enteringTime, id } = filters.after;
+            conditions.push(`(d.\`Date\` > ? OR (d.\`Date\` = ? AND (d.\`VehicleID\` > ?
+                OR (d.\`VehicleID\` = ? AND (d.\`EnteringTime\` > ?
+                OR (d.\`EnteringTime\` = ? AND d.\`ID\` > ?))))))`);
+            values.push(date, date, vehicleID, vehicleID, enteringTime, enteringTime, id);
+        }
+
+        const query = `
+            SELECT 
+                d.\`ID\`,
+                d.\`PetrolPumpID\`, 
+                d.\`VehicleID\`, 
+                d.\`EnteringTime\`, 
+                d.\`ExitTime\`, 
+                d.\`FillingTime\`, 
+                DATE_FORMAT(d.\`Date\`, '%Y-%m-%d') AS \`Date\`
+            FROM \`Petrol Pump Detail\` d
+            WHERE ${conditions.join(' AND ')}
+            ORDER BY d.\`Date\`, d.\`VehicleID\`, d.\`EnteringTime\`, d.\`ID\`
+            LIMIT ?
+        `;
+        values.push(filters.limit + 1);
+
+        pool.query(query, values, (err, results) => {
+            if (err) return reject(err);
+            const hasMore = results.length > filters.limit;
+            resolve({ rows: hasMore ? results.slice(0, filters.limit) : results, hasMore });
+        });
+    });
+}
 
 const PetrolPumpRepository = {
     insertPetrolPump: (params) => {
@@ -10,36 +69,43 @@ const PetrolPumpRepository = {
                     \`EnteringTime\`, 
                     \`ExitTime\`, 
                     \`FillingTime\`, 
-                    \`Date\`
-                ) VALUES (?, ?, ?, ?, ?, ?)
+                    \`Date\`,
+                    \`IdempotencyKey\`
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON DUPLICATE KEY UPDATE \`IdempotencyKey\` = \`IdempotencyKey\`
             `;
-            connection.query(query, params, (err, results) => {
+            // Prepared once per pooled connection and reused for every entry
+            pool.execute(query, bindable(params), (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
         });
     },
 
-    getAllPetrolPumps: () => {
+    insertPetrolPumps: (rows) => {
         return new Promise((resolve, reject) => {
+            // One multi-row INSERT; the nested array expands to (?, ...), (?, ...).
+            // Rows whose idempotency key is already stored are skipped.
             const query = `
-                SELECT 
-                    \`PetrolPump ID\`, 
+                INSERT INTO \`Petrol Pump Detail\` (
+                    \`PetrolPumpID\`, 
                     \`VehicleID\`, 
                     \`EnteringTime\`, 
                     \`ExitTime\`, 
                     \`FillingTime\`, 
-                    \`Date\`
-                FROM \`Petrol Pump Detail\`
+                    \`Date\`,
+                    \`IdempotencyKey\`
+                ) VALUES ?
+                ON DUPLICATE KEY UPDATE \`IdempotencyKey\` = \`IdempotencyKey\`
             `;
-            connection.query(query, (err, results) => {
+            pool.query(query, [rows], (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
         });
     },
 
-    getPetrolPumpById: (id) => {
+    getAllPetrolPumps: () => {
         return new Promise((resolve, reject) => {
             const query = `
                 SELECT 
@@ -50,26 +116,35 @@ const PetrolPumpRepository = {
                     \`FillingTime\`, 
                     \`Date\`
                 FROM \`Petrol Pump Detail\`
-                WHERE \`PetrolPumpID\` = ?
             `;
-            connection.query(query, [id], (err, results) => {
+            pool.query(query, (err, results) => {
                 if (err) reject(err);
-                else resolve(results || null);
+                else resolve(results);
             });
         });
     },
 
+    getPetrolPumpById: (id, filters = {}) => {
+        return queryPetrolPumpDetails(id, filters);
+    },
+
     updatePetrolPump: (params) => {
         return new Promise((resolve, reject) => {
+            // The entry's idempotency key identifies exactly one visit; without it, every
+            // row of the vehicle ID at this pump is updated as before
+            const where = params.idempotencyKey
+                ? '`IdempotencyKey` = ? AND `PetrolPumpID` = ?'
+                : '`VehicleID` = ? AND `PetrolPumpID` = ?';
             const query = `
                 UPDATE \`Petrol Pump Detail\`
                 SET  
                     \`ExitTime\` = ?, 
                     \`FillingTime\` = ?
-                WHERE \`VehicleID\` = ? AND \`PetrolPumpID\` = ?
+                WHERE ${where}
             `;
-            const values = [params.exitTime, params.fillingTime, params.vehicleID, params.petrolPumpID];
-            connection.query(query, values, (err, results) => {
+            const values = [params.exitTime, params.fillingTime, params.idempotencyKey || params.vehicleID, params.petrolPumpID];
+            // Prepared once per pooled connection and reused for every exit
+            pool.execute(query, bindable(values), (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
@@ -82,26 +157,15 @@ const PetrolPumpRepository = {
                 DELETE FROM \`Petrol Pump Detail\`
                 WHERE \`PetrolPumpID\` = ?
             `;
-            connection.query(query, [id], (err, results) => {
+            pool.query(query, [id], (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
         });
     },
 
-    getPetrolPumpByIdAndDate: (petrolPumpID, date) => {
-        return new Promise((resolve, reject) => {
-            const query = `
-                SELECT \`Petrol Pump ID\`, \`Vehicle ID\`, \`Entering Time\`, \`Exit Time\`, 
-                       \`Filling Time\`, \`Date\`
-                FROM \`Petrol Pump\`
-                WHERE \`Petrol Pump ID\` = ? AND \`Date\` = ?
-            `;
-            connection.query(query, [petrolPumpID, date], (err, results) => {
-                if (err) reject(err);
-                else resolve(results || null); // Return the record or null if not found
-            });
-        });
+    getPetrolPumpByIdAndDate: (petrolPumpID, date, filters = {}) => {
+        return queryPetrolPumpDetails(petrolPumpID, { ...filters, from: date, to: date });
     },
 };
 
@@ -1,4 +1,4 @@
-import connection from '../../db/connection.js';
+import pool from '../../db/connection.js';
 
 const PetrolPumpRepository = {
     insertPetrolPump: (params) => {
@@ -7,7 +7,7 @@ const PetrolPumpRepository = {
                 INSERT INTO \`Petrol Pump\` (\`petrolPumpID\`, \`Name\`, \`Location\`) 
                 VALUES (?, ?, ?)
             `;
-            connection.query(query, params, (err, results) => {
+            pool.query(query, params, (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
@@ -20,7 +20,7 @@ const PetrolPumpRepository = {
                 SELECT \`petrolPumpID\`, \`Name\`, \`Location\`
                 FROM \`Petrol Pump\`
             `;
-            connection.query(query, (err, results) => {
+            pool.query(query, (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
@@ -34,7 +34,7 @@ const PetrolPumpRepository = {
                 FROM \`Petrol Pump\`
                 WHERE \`PetrolPumpID\` = ?
             `;
-            connection.query(query, [id], (err, results) => {
+            pool.query(query, [id], (err, results) => {
                 if (err) reject(err);
                 else resolve(results[0] || null);
             });
@@ -48,7 +48,7 @@ const PetrolPumpRepository = {
                 SET \`Name\` = ?, \`Location\` = ?
                 WHERE \`petrolPumpID\` = ?
             `;
-            connection.query(query, params, (err, results) => {
+            pool.query(query, params, (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
@@ -61,7 +61,7 @@ const PetrolPumpRepository = {
                 DELETE FROM \`Petrol Pump\`
                 WHERE \`petrolPumpID\` = ?
             `;
-            connection.query(query, [id], (err, results) => {
+            pool.query(query, [id], (err, results) => {
                 if (err) reject(err);
                 else resolve(results);
             });
@@ -76,7 +76,7 @@ const PetrolPumpRepository = {
                 ORDER BY CAST(SUBSTRING_INDEX(\`petrolPumpID\`, '-', -1) AS UNSIGNED) DESC
                 LIMIT 1
             `;
-            connection.query(query, (err, results) => {
+            pool.query(query, (err, results) => {
                 if (err) reject(err);
                 else resolve(results[0] ? results[0]['petrolPumpID'] : null); // Fixed line
             });
@@ -1,10 +1,12 @@
 import express from 'express';
 import PetrolPumpController from '../controller/PetrolPump/petrolPump.controller.js';
 import PetrolPumpDetailController from '../controller/PetrolPump/detail.controller.js'
+import { decodeEventBody } from '../middleware/eventBody.js';
 
 const PetrolPumpRouter = express.Router();
 
 PetrolPumpRouter.post('/detail', PetrolPumpDetailController.createPetrolPump); 
+PetrolPumpRouter.post('/detail/bulk', decodeEventBody, PetrolPumpDetailController.processEvents); 
 PetrolPumpRouter.get('/detail', PetrolPumpDetailController.getAllPetrolPumps); 
 PetrolPumpRouter.get('/detail/:id', PetrolPumpDetailController.getPetrolPumpById); 
 PetrolPumpRouter.get('/detail/:id/:date', PetrolPumpDetailController.getPetrolPumpByIdAndDate);
@@ -9,7 +9,8 @@ const PORT = 3000;
 app.use(cors({
   origin: '*',  // Allow all origins
   methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-  allowedHeaders: ['Content-Type', 'Authorization'],
+  allowedHeaders: ['Content-Type', 'Content-Encoding', 'Authorization'],
+  exposedHeaders: ['X-Next-Cursor'],
 }));
 
 // Middleware for JSON parsing
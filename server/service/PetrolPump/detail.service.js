@@ -1,31 +1,149 @@
 import PetrolPumpRepository from '../../repository/PetrolPump/detail.repository.js';
 
+const DEFAULT_PAGE_SIZE = 1000;
+const MAX_PAGE_SIZE = 5000;
+const DATE_PATTERN = /^\d{4}-\d{2}-\d{2}$/;
+const SINCE_PATTERN = /^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})$/;
+
+export class ValidationError extends Error {}
+
+// Cursors are opaque to clients: the sort key of the last row of a page
+const encodeCursor = (row) => Buffer.from(
+    JSON.stringify([row.Date, row.VehicleID, row.EnteringTime, row.ID])
+).toString('base64url');
+
+const decodeCursor = (cursor) => {
+    try {
+        const [date, vehicleID, enteringTime, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+        if (DATE_PATTERN.test(date) && Number.isInteger(id)) return { date, vehicleID, enteringTime, id };
+    } catch (error) {
+        // Fall through to the validation error below
+    }
+    throw new ValidationError('Invalid cursor.');
+};
+
+// Validate query parameters (from, to, since, limit, cursor) into repository filters
+const parseDetailFilters = (query) => {
+    const filters = {};
+    for (const field of ['from', 'to']) {
+        if (query[field] !== undefined) {
+            if (!DATE_PATTERN.test(query[field])) throw new ValidationError(`${field} must be YYYY-MM-DD.`);
+            filters[field] = query[field];
+        }
+    }
+    if (query.date !== undefined) {
+        if (!DATE_PATTERN.test(query.date)) throw new ValidationError('date must be YYYY-MM-DD.');
+        filters.from = query.date;
+        filters.to = query.date;
+    }
+    if (query.since !== undefined) {
+        const match = SINCE_PATTERN.exec(query.since);
+        if (!match) throw new ValidationError('since must be YYYY-MM-DD HH:MM:SS.');
+        filters.since = { date: match[1], time: match[2] };
+    }
+
+    const limit = query.limit === undefined ? DEFAULT_PAGE_SIZE : Number(query.limit);
+    if (!Number.isInteger(limit) || limit < 1) throw new ValidationError('limit must be a positive integer.');
+    filters.limit = Math.min(limit, MAX_PAGE_SIZE);
+
+    if (query.cursor) filters.after = decodeCursor(query.cursor);
+    return filters;
+};
+
+// Returns { rows, nextCursor }, with nextCursor null on the last page
+const toPage = ({ rows, hasMore }) => ({
+    rows,
+    nextCursor: hasMore ? encodeCursor(rows[rows.length - 1]) : null
+});
+
 const PetrolPumpService = {
-    createPetrolPump: async (petrolPumpID, vehicleID, enteringTime, exitTime, fillingTime, date) => {
+    // An entry whose idempotency key is already stored is not inserted again, so
+    // clients can retry after a timeout without creating a duplicate row
+    createPetrolPump: async (petrolPumpID, vehicleID, enteringTime, exitTime, fillingTime, date, idempotencyKey = null) => {
         return await PetrolPumpRepository.insertPetrolPump([
             petrolPumpID,
             vehicleID,
             enteringTime,
             exitTime,
             fillingTime,
-            date
+            date,
+            idempotencyKey
         ]);
     },
 
+    // Apply a batch of entry and exit events. Entries are stored with one multi-row
+    // INSERT before exits are applied, so an exit may follow its entry in the same batch.
+    // Returns one { status, vehicleID, error } result per event, in order. vehicleID is the
+    // key the row is updated under: exits match rows on the client's vehicle (track) ID or the
+    // visit's idempotency key, never on the ID column, which only orders detail pages.
+    processEvents: async (events) => {
+        const results = new Array(events.length);
+        const entries = [];
+        const exits = [];
+
+        events.forEach((event, index) => {
+            if (event && event.type === 'entry') entries.push(index);
+            else if (event && event.type === 'exit') exits.push(index);
+            else results[index] = { status: 'error', error: 'Unknown event type' };
+        });
+
+        if (entries.length > 0) {
+            const rows = entries.map((index) => {
+                const { petrolPumpID, vehicleID, enteringTime, exitTime, fillingTime, date, idempotencyKey } = events[index];
+                return [petrolPumpID, vehicleID, enteringTime, exitTime || '', fillingTime || '', date, idempotencyKey || null];
+            });
+            try {
+                await PetrolPumpRepository.insertPetrolPumps(rows);
+                entries.forEach((index) => {
+                    results[index] = { status: 'ok', vehicleID: events[index].vehicleID };
+                });
+            } catch (error) {
+                // The multi-row insert is all or nothing; retry row by row so one bad event
+                // does not fail the whole batch
+                for (const [row, index] of entries.entries()) {
+                    try {
+                        await PetrolPumpRepository.insertPetrolPump(rows[row]);
+                        results[index] = { status: 'ok', vehicleID: events[index].vehicleID };
+                    } catch (rowError) {
+                        results[index] = { status: 'error', vehicleID: events[index].vehicleID, error: rowError.message };
+                    }
+                }
+            }
+        }
+
+        await Promise.all(exits.map(async (index) => {
+            const { petrolPumpID, vehicleID, exitTime, fillingTime, idempotencyKey } = events[index];
+            try {
+                const result = await PetrolPumpRepository.updatePetrolPump({
+                    petrolPumpID, vehicleID, exitTime, fillingTime, idempotencyKey
+                });
+                results[index] = result.affectedRows > 0
+                    ? { status: 'ok', vehicleID }
+                    : { status: 'error', vehicleID, error: 'Vehicle not found' };
+            } catch (error) {
+                results[index] = { status: 'error', vehicleID, error: error.message };
+            }
+        }));
+
+        return results;
+    },
+
     getAllPetrolPumps: async () => {
         return await PetrolPumpRepository.getAllPetrolPumps();
     },
 
-    getPetrolPumpById: async (id) => {
-        return await PetrolPumpRepository.getPetrolPumpById(id);
+    getPetrolPumpById: async (id, query = {}) => {
+        return toPage(await PetrolPumpRepository.getPetrolPumpById(id, parseDetailFilters(query)));
     },
 
-    updatePetrolPump: async (petrolPumpID, vehicleID, exitTime, fillingTime) => {
+    // With the entry's idempotency key, only that visit's row is updated
+    updatePetrolPump: async (petrolPumpID, vehicleID, exitTime, fillingTime, idempotencyKey = null) => {
         return await PetrolPumpRepository.updatePetrolPump({
             petrolPumpID,
             vehicleID,
             exitTime,
-            fillingTime
+            fillingTime,
+            idempotencyKey
         });
     },
     
@@ -34,8 +152,9 @@ const PetrolPumpService = {
         return await PetrolPumpRepository.deletePetrolPumpById(id);
     },
 
-    getPetrolPumpByIdAndDate: async (petrolPumpID, date) => {
-        return await PetrolPumpRepository.getPetrolPumpByIdAndDate(petrolPumpID, date);
+    getPetrolPumpByIdAndDate: async (petrolPumpID, date, query = {}) => {
+        if (!DATE_PATTERN.test(date)) throw new ValidationError('date must be YYYY-MM-DD.');
+        return toPage(await PetrolPumpRepository.getPetrolPumpByIdAndDate(petrolPumpID, date, parseDetailFilters(query)));
     },
 };
 
@@ -1,13 +1,20 @@
 import aiohttp
 import asyncio
-import requests
 import json
-from datetime import datetime
+import gzip
+import hashlib
+from datetime import datetime, timedelta
 import logging
 import time
-import concurrent.futures
 import threading
+import heapq
+import itertools
+import random
+import contextlib
+from config import Config
 from api_request_tracker import request_tracker
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from api_metrics import metrics, outcome_for_status
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -27,137 +34,331 @@ BASE_URL = "http://13.233.118.66:3000"
 POST_VEHICLE_ENDPOINT = f"{BASE_URL}/PetrolPumps/details/"
 UPDATE_VEHICLE_ENDPOINT = f"{BASE_URL}/PetrolPumps/details"
 GET_VEHICLES_ENDPOINT = f"{BASE_URL}/PetrolPumps/details"
+# The bulk route is mounted as POST /PetrolPumps/detail/bulk on the Node server (singular "detail")
+BULK_EVENTS_PATH = "/PetrolPumps/detail/bulk"
+BULK_EVENTS_ENDPOINT = f"{BASE_URL}{BULK_EVENTS_PATH}"
 
-# Thread pool for async operations
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=10)
+def set_base_url(base_url):
+    """Point all endpoints at another server, e.g. a local mock backend for load tests."""
+    global BASE_URL, POST_VEHICLE_ENDPOINT, UPDATE_VEHICLE_ENDPOINT, GET_VEHICLES_ENDPOINT, BULK_EVENTS_ENDPOINT
+    
+    BASE_URL = base_url.rstrip("/")
+    POST_VEHICLE_ENDPOINT = f"{BASE_URL}/PetrolPumps/details/"
+    UPDATE_VEHICLE_ENDPOINT = f"{BASE_URL}/PetrolPumps/details"
+    GET_VEHICLES_ENDPOINT = f"{BASE_URL}/PetrolPumps/details"
+    BULK_EVENTS_ENDPOINT = f"{BASE_URL}{BULK_EVENTS_PATH}"
+
+def make_idempotency_key(camera_id, track_id, date, entering_time):
+    """
+    Idempotency key of one vehicle visit. The same camera, track and entry time always give the
+    same key, so the server can drop replays of an entry it already stored and exits can address
+    exactly that row.
+    """
+    return hashlib.sha1(f"{camera_id}|{track_id}|{date} {entering_time}".encode()).hexdigest()[:32]
+
+def _idempotency_headers(payload):
+    key = payload.get("IdempotencyKey")
+    return {"Idempotency-Key": key} if key else None
+
+breaker = CircuitBreaker("backend", Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_TIMEOUT)
+
+# Long-lived event loop thread and pooled session shared by all API calls
+_loop = None
+_loop_thread = None
+_session = None
+_loop_lock = threading.Lock()
+
+# Heap of (due time, sequence, request) owned by the loop thread. Only requests sent with
+# retry_on_failure=True (the default for direct callers of the API functions) land here;
+# the event dispatcher passes retry_on_failure=False and retries from its own outbox.
+_retry_heap = []
+_retry_sequence = itertools.count()
+_retry_wakeup = None
+_retry_semaphore = None
+_retry_task = None
+_retry_tasks = set()
+
+# Completion futures of in-flight entry POSTs, keyed by (petrol pump ID, local vehicle ID).
+# Owned by the loop thread; each resolves to the server-assigned ID, or None if the POST failed.
+_entry_futures = {}
+
+# Cleared when the server answers the bulk endpoint with 404/405, so callers fall back to single requests
+_bulk_supported = True
+
+# Cleared when the server answers a compact bulk body with 415 or a codec is not installed; bulk then sends plain JSON
+_compact_bulk_supported = True
+
+# Progress of running batch PUT operations by name, updated on the loop thread
+_batch_progress = {}
+
+# Cached vehicle records by (petrol pump ID, date), shared by dashboard sessions
+_details_cache = {}
+_details_lock = threading.Lock()
+
+def _loop_backlog():
+    """Tasks scheduled on the background loop and not finished yet, including the retry scheduler."""
+    return len(asyncio.all_tasks(_loop)) if _loop is not None else 0
+
+metrics.register_gauge("api_client_retry_queue_depth", "Failed requests waiting for a retry",
+                       lambda: len(_retry_heap))
+metrics.register_gauge("api_client_loop_tasks", "Tasks pending on the API client event loop", _loop_backlog)
+metrics.register_gauge("request_tracker_vehicles", "Vehicles tracked with their full record",
+                       lambda: request_tracker.get_stats()["tracked_vehicles"])
+metrics.register_gauge("request_tracker_archived_vehicles", "Compact records of retired vehicles",
+                       lambda: request_tracker.get_stats()["archived_vehicles"])
+
+def _get_loop():
+    """Get the background event loop, starting its thread on first use."""
+    global _loop, _loop_thread
+    
+    with _loop_lock:
+        if _loop is None or not _loop_thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="api-client-loop", daemon=True)
+            _loop_thread.start()
+            logger.info("Started API client event loop")
+    return _loop
+
+async def _get_session():
+    """Get the shared aiohttp session. Only called on the loop thread, so no locking is needed."""
+    global _session
+    
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit_per_host=Config.API_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=Config.API_KEEPALIVE_TIMEOUT
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.API_REQUEST_TIMEOUT)
+        )
+    return _session
+
+@contextlib.asynccontextmanager
+async def _request(method, url, endpoint, **kwargs):
+    """
+    Send a request on the shared session through the circuit breaker and record its metrics.
+    Connection errors, timeouts and 5xx responses count as failures. A cancelled request
+    (e.g. its caller gave up or the loop is shutting down) says nothing about the backend
+    and is not counted.
+    
+    Args:
+        endpoint (str): Metrics label for the endpoint (entry, exit, details or bulk)
+    
+    Raises:
+        CircuitOpenError: If the circuit is open and the request was not sent
+    """
+    if not breaker.allow_request():
+        metrics.observe(endpoint, method, "rejected")
+        raise CircuitOpenError(f"Backend circuit is {breaker.state}, not sending {method} {url}")
+    
+    session = await _get_session()
+    metrics.in_flight += 1
+    started = time.perf_counter()
+    try:
+        response = await session.request(method, url, **kwargs)
+    except asyncio.CancelledError:
+        metrics.in_flight -= 1
+        metrics.observe(endpoint, method, "cancelled")
+        breaker.release_probe()
+        raise
+    except Exception as e:
+        metrics.in_flight -= 1
+        metrics.observe(endpoint, method, "timeout" if isinstance(e, asyncio.TimeoutError) else "error",
+                        time.perf_counter() - started)
+        breaker.record_failure(e)
+        raise
+    
+    metrics.observe(endpoint, method, outcome_for_status(response.status), time.perf_counter() - started)
+    try:
+        if response.status >= 500:
+            breaker.record_failure(f"HTTP {response.status}")
+        else:
+            breaker.record_success()
+        yield response
+    finally:
+        metrics.in_flight -= 1
+        response.release()
 
-# In-memory queue for failed requests to retry later
-failed_requests_queue = []
-_is_retry_thread_running = False
-_retry_thread = None
-_lock = threading.Lock()
+def _submit(coro):
+    """Schedule a coroutine on the background loop and return a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+def close_session():
+    """Close the shared session and stop the background loop. Queued retries resume on the next loop."""
+    global _loop, _session, _retry_task
+    
+    with _loop_lock:
+        if _loop is None:
+            return
+        if _session is not None:
+            asyncio.run_coroutine_threadsafe(_session.close(), _loop).result(timeout=Config.API_REQUEST_TIMEOUT)
+            _session = None
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
+        _retry_task = None
+        _retry_tasks.clear()
 
 class RetryableRequest:
-    def __init__(self, request_type, endpoint, payload, vehicle_id=None):
+    def __init__(self, request_type, endpoint, payload, vehicle_id=None, petrol_pump_id=None):
         self.request_type = request_type  # 'POST' or 'PUT'
-        self.endpoint = endpoint
+        self.endpoint = endpoint  # Full URL of the request, including path parameters
         self.payload = payload
         self.vehicle_id = vehicle_id
+        self.petrol_pump_id = petrol_pump_id
         self.retry_count = 0
         self.timestamp = time.time()
     
     def __str__(self):
         return f"{self.request_type} {self.endpoint} - Payload: {self.payload}"
 
-def _start_retry_thread():
-    """Start a background thread to retry failed requests."""
-    global _is_retry_thread_running, _retry_thread
+def _entry_future(petrol_pump_id, vehicle_id):
+    """Get or create the completion future of a vehicle's entry POST. Runs on the loop thread."""
+    key = (petrol_pump_id, str(vehicle_id))
+    future = _entry_futures.get(key)
+    if future is None:
+        future = asyncio.get_running_loop().create_future()
+        _entry_futures[key] = future
+    return future
+
+def _finish_entry(petrol_pump_id, vehicle_id, server_id):
+    """Resolve a vehicle's entry future, waking every exit waiting on it."""
+    future = _entry_futures.pop((petrol_pump_id, str(vehicle_id)), None)
+    if future is not None and not future.done():
+        future.set_result(server_id)
+
+async def _wait_for_entry(petrol_pump_id, vehicle_id, timeout):
+    """
+    Wait for an in-flight entry POST of this vehicle to finish.
+    
+    Returns:
+        str: Server-assigned ID, or None if no POST is in flight, it failed or it timed out
+    """
+    future = _entry_futures.get((petrol_pump_id, str(vehicle_id)))
+    if future is None:
+        return None
     
-    with _lock:
-        if not _is_retry_thread_running:
-            _is_retry_thread_running = True
-            _retry_thread = threading.Thread(target=_retry_failed_requests, daemon=True)
-            _retry_thread.start()
-            logger.info("Started retry thread for failed API requests")
+    if not future.done():
+        logger.info(f"Waiting for POST to complete for vehicle {vehicle_id}")
+    try:
+        # Shield the shared future so a timed-out waiter does not cancel it for the others
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Timed out after {timeout}s waiting for POST of vehicle {vehicle_id}")
+        return None
+
+def _retry_delay(retry_count):
+    """Exponential backoff with jitter, so requests that failed together do not retry together."""
+    delay = min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * (2 ** retry_count))
+    return random.uniform(delay / 2, delay)
 
-def _retry_failed_requests():
-    """Background thread function that periodically retries failed requests."""
-    global _is_retry_thread_running, failed_requests_queue
+def _schedule_retry(request):
+    """Push a request onto the retry heap. Runs on the loop thread."""
+    global _retry_wakeup, _retry_semaphore, _retry_task
     
-    while _is_retry_thread_running:
-        try:
-            # Sleep to avoid CPU hogging
-            time.sleep(5)
-            
-            with _lock:
-                if not failed_requests_queue:
-                    continue
-                    
-                current_time = time.time()
-                requests_to_retry = []
-                
-                # Find requests that are due for retry (at least 5 seconds old)
-                for request in failed_requests_queue:
-                    if current_time - request.timestamp >= 5:
-                        requests_to_retry.append(request)
-                
-                # Remove the requests we're about to retry from the queue
-                if requests_to_retry:
-                    failed_requests_queue = [r for r in failed_requests_queue if r not in requests_to_retry]
-            
-            # Process the retries outside the lock
-            for request in requests_to_retry:
-                try:
-                    if request.request_type == 'POST':
-                        response = requests.post(
-                            request.endpoint,
-                            json=request.payload,
-                            timeout=10
-                        )
-                        if response.status_code == 201:
-                            logger.info(f"Successfully retried POST request: {request.endpoint}")
-                            # Update the tracker
-                            track_id = request.payload.get('VehicleID', 'unknown')
-                            petrol_pump_id = request.payload.get('petrolPumpID', 'unknown')
-                            request_tracker.update_post_status(track_id, petrol_pump_id, response.json())
-                        else:
-                            # If still failing after 3 retries, log and drop
-                            if request.retry_count >= 3:
-                                logger.error(f"Failed to retry POST request after 3 attempts: {request.endpoint}")
-                            else:
-                                request.retry_count += 1
-                                request.timestamp = time.time()
-                                with _lock:
-                                    failed_requests_queue.append(request)
-                    
-                    elif request.request_type == 'PUT':
-                        put_endpoint = f"{request.endpoint}/{request.vehicle_id}"
-                        response = requests.put(
-                            put_endpoint,
-                            json=request.payload,
-                            timeout=10
-                        )
-                        if response.status_code == 200:
-                            logger.info(f"Successfully retried PUT request: {put_endpoint}")
-                            # Update the tracker
-                            request_tracker.update_put_status(request.vehicle_id, 
-                                                             request.endpoint.split('/')[-1], 
-                                                             True)
-                        else:
-                            # If still failing after 3 retries, log and drop
-                            if request.retry_count >= 3:
-                                logger.error(f"Failed to retry PUT request after 3 attempts: {put_endpoint}")
-                            else:
-                                request.retry_count += 1
-                                request.timestamp = time.time()
-                                with _lock:
-                                    failed_requests_queue.append(request)
-                except Exception as e:
-                    logger.error(f"Error during retry: {str(e)}")
-                    if request.retry_count < 3:
-                        request.retry_count += 1
-                        request.timestamp = time.time()
-                        with _lock:
-                            failed_requests_queue.append(request)
-                    
-        except Exception as e:
-            logger.error(f"Error in retry thread: {str(e)}")
+    loop = asyncio.get_running_loop()
+    if _retry_task is None or _retry_task.done():
+        _retry_wakeup = asyncio.Event()
+        _retry_semaphore = asyncio.Semaphore(Config.MAX_CONCURRENT_RETRIES)
+        _retry_task = loop.create_task(_run_retries())
+        logger.info("Started retry scheduler for failed API requests")
+    
+    due = loop.time() + _retry_delay(request.retry_count)
+    heapq.heappush(_retry_heap, (due, next(_retry_sequence), request))
+    
+    # Only wake the scheduler if this request is now the next one due
+    if _retry_heap[0][2] is request:
+        _retry_wakeup.set()
+
+async def _run_retries():
+    """Sleep until the earliest retry is due, then start it once a concurrency slot is free."""
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        _retry_wakeup.clear()
+        if not _retry_heap:
+            await _retry_wakeup.wait()
+            continue
+        
+        # While the circuit is open, hold retries until the breaker allows a probe
+        delay = max(_retry_heap[0][0] - loop.time(), breaker.retry_in())
+        if delay > 0:
+            try:
+                await asyncio.wait_for(_retry_wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        await _retry_semaphore.acquire()
+        _, _, request = heapq.heappop(_retry_heap)
+        task = loop.create_task(_attempt_retry(request))
+        _retry_tasks.add(task)
+        task.add_done_callback(_retry_tasks.discard)
 
-def _queue_failed_request(request_type, endpoint, payload, vehicle_id=None):
-    """Add a failed request to the retry queue."""
-    global failed_requests_queue
+async def _attempt_retry(request):
+    """Send one retry and reschedule it with a longer delay if it fails."""
+    rejected = False
+    try:
+        succeeded = await _send_retry(request)
+    except CircuitOpenError:
+        rejected = True
+        succeeded = False
+    except Exception as e:
+        logger.error(f"Error during retry of {request}: {str(e)}")
+        succeeded = False
+    finally:
+        _retry_semaphore.release()
     
-    request = RetryableRequest(request_type, endpoint, payload, vehicle_id)
+    if succeeded:
+        return
     
-    with _lock:
-        failed_requests_queue.append(request)
+    # Not an attempt; hold the request until the circuit lets requests through again
+    if rejected:
+        _schedule_retry(request)
+        return
     
-    # Ensure the retry thread is running
-    _start_retry_thread()
+    request.retry_count += 1
+    if request.retry_count >= Config.MAX_RETRIES:
+        logger.error(f"Dropping {request.request_type} request after {request.retry_count} attempts: {request.endpoint}")
+    else:
+        _schedule_retry(request)
+
+async def _send_retry(request):
+    """Resend a failed request on the shared session. Returns True if the server accepted it."""
+    if request.request_type == 'POST':
+        async with _request('POST', request.endpoint, 'entry', json=request.payload,
+                              headers=_idempotency_headers(request.payload)) as response:
+            if response.status != 201:
+                logger.warning(f"Retry of POST {request.endpoint} failed with status {response.status}")
+                return False
+            logger.info(f"Successfully retried POST request: {request.endpoint}")
+            response_json = await response.json(content_type=None) or {}
+            track_id = request.payload.get('VehicleID', 'unknown')
+            petrol_pump_id = request.payload.get('petrolPumpID', 'unknown')
+            request_tracker.update_post_status(track_id, petrol_pump_id, response_json)
+            return True
     
+    async with _request('PUT', request.endpoint, 'exit', json=request.payload,
+                          headers=_idempotency_headers(request.payload)) as response:
+        if response.status != 200:
+            logger.warning(f"Retry of PUT {request.endpoint} failed with status {response.status}")
+            return False
+        logger.info(f"Successfully retried PUT request: {request.endpoint}")
+        request_tracker.update_put_status(request.vehicle_id, request.petrol_pump_id, True)
+        return True
+
+def _queue_failed_request(request_type, endpoint, payload, vehicle_id=None, petrol_pump_id=None):
+    """Schedule a failed request for retry. Safe to call from any thread."""
+    request = RetryableRequest(request_type, endpoint, payload, vehicle_id, petrol_pump_id)
+    _get_loop().call_soon_threadsafe(_schedule_retry, request)
     logger.info(f"Queued {request_type} request for retry: {endpoint}")
 
-async def post_vehicle_entry_async(petrol_pump_id, vehicle_type="Car", vehicle_id=None, entering_time=None, date=None):
+def get_pending_retries():
+    """Number of failed requests waiting for their next retry."""
+    return len(_retry_heap) + len(_retry_tasks)
+
+async def post_vehicle_entry_async(petrol_pump_id, vehicle_type="Car", vehicle_id=None, entering_time=None, date=None,
+                                   retry_on_failure=True, idempotency_key=None):
     """
     Asynchronously post a new vehicle entry to the backend.
     
@@ -167,9 +368,16 @@ async def post_vehicle_entry_async(petrol_pump_id, vehicle_type="Car", vehicle_i
         vehicle_id (str): Optional vehicle ID
         entering_time (str): Time of entry (format: "HH:MM:SS")
         date (str): Date of entry (format: "YYYY-MM-DD")
+        retry_on_failure (bool): Queue the request for retry if it fails. Callers that
+                                 own retries themselves (e.g. the event outbox) pass False.
+        idempotency_key (str): Key from make_idempotency_key; the server stores an entry
+                               only once per key, so retries cannot create duplicates
     
     Returns:
         dict: Response from the server or None if request failed
+    
+    Raises:
+        CircuitOpenError: If the backend circuit is open and retry_on_failure is False
     """
     # Set default values if not provided
     if entering_time is None:
@@ -196,48 +404,65 @@ async def post_vehicle_entry_async(petrol_pump_id, vehicle_type="Car", vehicle_i
         "ServerUpdate": True,     # Fixed as per requirements
         "VehicleID": vehicle_id
     }
+    if idempotency_key:
+        payload["IdempotencyKey"] = idempotency_key
     
     # Register this POST request with the tracker
     # If already tracked, it will be ignored
     request_tracker.track_post_request(vehicle_id, petrol_pump_id, payload)
     
+    # Exits of this vehicle await this future instead of polling the tracker
+    _entry_future(petrol_pump_id, vehicle_id)
+    server_id = None
+    
     # Log the request details
     logger.info(f"Posting vehicle entry - Pump ID: {petrol_pump_id}, Track ID: {vehicle_id}, Type: {vehicle_type}")
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(POST_VEHICLE_ENDPOINT, json=payload, timeout=10) as response:
-                response_text = await response.text()
+        async with _request('POST', POST_VEHICLE_ENDPOINT, 'entry', json=payload,
+                                  headers=_idempotency_headers(payload)) as response:
+            response_text = await response.text()
+            
+            try:
+                response_json = json.loads(response_text) if response_text else {}
+            except json.JSONDecodeError:
+                response_json = {}
+            
+            if response.status == 201:
+                # Update the request tracker with success
+                request_tracker.update_post_status(vehicle_id, petrol_pump_id, response_json)
                 
-                try:
-                    response_json = json.loads(response_text) if response_text else {}
-                except json.JSONDecodeError:
-                    response_json = {}
+                server_id = response_json.get('VehicleID')
+                logger.info(f"Successfully posted vehicle entry. Server assigned ID: {server_id}")
+                logger.info(f"Local ID {vehicle_id} mapped to Server ID {server_id}")
                 
-                if response.status == 201:
-                    # Update the request tracker with success
-                    request_tracker.update_post_status(vehicle_id, petrol_pump_id, response_json)
-                    
-                    server_id = response_json.get('VehicleID', 'Unknown')
-                    logger.info(f"Successfully posted vehicle entry. Server assigned ID: {server_id}")
-                    logger.info(f"Local ID {vehicle_id} mapped to Server ID {server_id}")
-                    
-                    return response_json
-                else:
-                    logger.error(f"Failed to post vehicle entry. Status: {response.status}")
-                    logger.error(f"Response: {response_text}")
-                    
-                    # Queue for retry
+                return response_json
+            else:
+                logger.error(f"Failed to post vehicle entry. Status: {response.status}")
+                logger.error(f"Response: {response_text}")
+                
+                # Queue for retry
+                if retry_on_failure:
                     _queue_failed_request('POST', POST_VEHICLE_ENDPOINT, payload)
-                    return None
+                return None
+    except CircuitOpenError:
+        # Backend is down: buffer locally without waiting on a timeout
+        if not retry_on_failure:
+            raise
+        _queue_failed_request('POST', POST_VEHICLE_ENDPOINT, payload)
+        return None
     except Exception as e:
         logger.error(f"Exception during post_vehicle_entry_async: {str(e)}")
         
         # Queue for retry
-        _queue_failed_request('POST', POST_VEHICLE_ENDPOINT, payload)
+        if retry_on_failure:
+            _queue_failed_request('POST', POST_VEHICLE_ENDPOINT, payload)
         return None
+    finally:
+        _finish_entry(petrol_pump_id, vehicle_id, server_id)
 
-async def update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time=None, filling_time=None, entry_time=None):
+async def update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time=None, filling_time=None, entry_time=None,
+                                    retry_on_failure=True, idempotency_key=None):
     """
     Asynchronously update a vehicle's exit information.
     
@@ -247,9 +472,15 @@ async def update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time=None,
         exit_time (str): Time of exit (format: "HH:MM:SS")
         filling_time (str): Duration of filling in the format "X seconds"
         entry_time (str): Original entry time (for calculating filling time if not provided)
+        retry_on_failure (bool): Queue the request for retry if it fails
+        idempotency_key (str): Key of the vehicle's entry; the server then updates exactly
+                               that record rather than every record with this vehicle ID
     
     Returns:
         bool: True if update was successful, False otherwise
+    
+    Raises:
+        CircuitOpenError: If the backend circuit is open and retry_on_failure is False
     """
     if exit_time is None:
         exit_time = datetime.now().strftime("%H:%M:%S")
@@ -270,24 +501,15 @@ async def update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time=None,
         "ExitTime": exit_time,
         "FillingTime": filling_time
     }
+    if idempotency_key:
+        payload["IdempotencyKey"] = idempotency_key
     
-    # Wait for POST completion if necessary (with timeout)
-    max_retries = 3
-    retry_delay = 0.5  # seconds
-    
-    for retry in range(max_retries):
-        # Check if POST has completed
-        vehicle_status = request_tracker.get_vehicle_status(track_id=vehicle_id)
-        if vehicle_status and vehicle_status.get("posted", False):
-            break
-            
-        # If this is not the last retry, wait and try again
-        if retry < max_retries - 1:
-            logger.info(f"Waiting for POST to complete for vehicle {vehicle_id} (retry {retry+1}/{max_retries})")
-            time.sleep(retry_delay)
+    # If this vehicle's entry POST is still in flight, wait for it and take the server ID from its result
+    posted_id = await _wait_for_entry(petrol_pump_id, vehicle_id, Config.API_ENTRY_WAIT_TIMEOUT)
     
     # Check with the tracker if we can proceed with PUT
     can_proceed, server_id = request_tracker.track_put_request(vehicle_id, petrol_pump_id, payload)
+    server_id = posted_id or server_id
     
     if not can_proceed:
         # As a fallback, allow PUT even if POST hasn't completed yet
@@ -310,30 +532,37 @@ async def update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time=None,
     logger.info(f"PUT Payload: {payload}")
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.put(update_url, json=payload, timeout=10) as response:
-                response_text = await response.text()
-                logger.info(f"Server response status: {response.status}")
-                logger.info(f"Server response: {response_text}")
+        async with _request('PUT', update_url, 'exit', json=payload,
+                            headers=_idempotency_headers(payload)) as response:
+            response_text = await response.text()
+            logger.info(f"Server response status: {response.status}")
+            logger.info(f"Server response: {response_text}")
+            
+            if response.status == 200:
+                logger.info(f"Successfully updated vehicle exit: {vehicle_id}")
                 
-                if response.status == 200:
-                    logger.info(f"Successfully updated vehicle exit: {vehicle_id}")
-                    
-                    # Update the tracker with success
-                    request_tracker.update_put_status(vehicle_id, petrol_pump_id, True)
-                    
-                    return True
-                else:
-                    logger.error(f"Failed to update vehicle exit. Status: {response.status}")
-                    logger.error(f"Response: {response_text}")
-                    logger.error(f"URL: {update_url}, Vehicle ID: {vehicle_id}")
-                    
-                    # Update the tracker with failure
-                    request_tracker.update_put_status(vehicle_id, petrol_pump_id, False)
-                    
-                    # Queue for retry
-                    _queue_failed_request('PUT', UPDATE_VEHICLE_ENDPOINT, payload, vehicle_id)
-                    return False
+                # Update the tracker with success
+                request_tracker.update_put_status(vehicle_id, petrol_pump_id, True)
+                
+                return True
+            else:
+                logger.error(f"Failed to update vehicle exit. Status: {response.status}")
+                logger.error(f"Response: {response_text}")
+                logger.error(f"URL: {update_url}, Vehicle ID: {vehicle_id}")
+                
+                # Update the tracker with failure
+                request_tracker.update_put_status(vehicle_id, petrol_pump_id, False)
+                
+                # Queue for retry
+                if retry_on_failure:
+                    _queue_failed_request('PUT', update_url, payload, vehicle_id, petrol_pump_id)
+                return False
+    except CircuitOpenError:
+        request_tracker.update_put_status(vehicle_id, petrol_pump_id, False)
+        if not retry_on_failure:
+            raise
+        _queue_failed_request('PUT', update_url, payload, vehicle_id, petrol_pump_id)
+        return False
     except Exception as e:
         logger.error(f"Exception during update_vehicle_exit_async: {str(e)}")
         logger.error(f"URL: {update_url}, Vehicle ID: {vehicle_id}")
@@ -342,16 +571,20 @@ async def update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time=None,
         request_tracker.update_put_status(vehicle_id, petrol_pump_id, False)
         
         # Queue for retry
-        _queue_failed_request('PUT', UPDATE_VEHICLE_ENDPOINT, payload, vehicle_id)
+        if retry_on_failure:
+            _queue_failed_request('PUT', update_url, payload, vehicle_id, petrol_pump_id)
         return False
 
-async def get_vehicle_details_async(petrol_pump_id, vehicle_id=None):
+async def get_vehicle_details_async(petrol_pump_id, vehicle_id=None, date=None, since=None, page_size=None):
     """
     Asynchronously get vehicle details from the server.
     
     Args:
         petrol_pump_id (str): ID of the petrol pump
         vehicle_id (str, optional): If provided, get details for a specific vehicle
+        date (str, optional): Only records of this date ("YYYY-MM-DD")
+        since (str, optional): Only records that entered at or after this time ("YYYY-MM-DD HH:MM:SS")
+        page_size (int, optional): Records per page requested from the server
     
     Returns:
         list or dict: Vehicle details from the server or None if request failed
@@ -360,126 +593,398 @@ async def get_vehicle_details_async(petrol_pump_id, vehicle_id=None):
     if vehicle_id:
         url += f"/vehicle/{vehicle_id}"
     
+    params = {}
+    if date:
+        params["date"] = date
+    if since:
+        params["since"] = since
+    if page_size is None:
+        page_size = Config.DETAILS_PAGE_SIZE
+    if page_size and not vehicle_id:
+        params["limit"] = page_size
+    
+    # The server pages long histories; follow X-Next-Cursor until the last page
+    records = []
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result
-                else:
+        while True:
+            async with _request('GET', url, 'details', params=params) as response:
+                if response.status != 200:
                     error_text = await response.text()
                     logger.error(f"Failed to get vehicle details. Status: {response.status}, Response: {error_text}")
                     return None
+                result = await response.json()
+                next_cursor = response.headers.get("X-Next-Cursor")
+            
+            if not isinstance(result, list):
+                return result
+            records.extend(result)
+            if not next_cursor:
+                return records
+            params["cursor"] = next_cursor
     except Exception as e:
         logger.error(f"Exception during get_vehicle_details_async: {str(e)}")
         return None
 
+def _tracked_bulk_item(item):
+    """
+    Copy of a bulk event as the tracker stores it. Bulk events name the idempotency key
+    "idempotencyKey"; the tracked payload keeps it as "IdempotencyKey", like single requests,
+    so a later exit PUT for the vehicle finds it.
+    """
+    tracked = dict(item)
+    key = tracked.pop("idempotencyKey", None)
+    if key:
+        tracked["IdempotencyKey"] = key
+    return tracked
+
+async def post_events_bulk_async(events):
+    """
+    Send a batch of entry and exit events in one request to the bulk endpoint.
+    
+    Args:
+        events (list): Dicts with type ("entry" or "exit"), petrol_pump_id, vehicle_id and,
+                       for entries, entering_time, date and vehicle_type, or, for exits,
+                       exit_time and filling_time; optionally the visit's idempotency_key
+    
+    Returns:
+        list: One result per event, in order - the server response dict (or None) for entries
+              and True/False for exits - or None if the request as a whole failed
+    
+    Raises:
+        CircuitOpenError: If the backend circuit is open and nothing was sent
+    """
+    global _bulk_supported
+    
+    body = []
+    for event in events:
+        vehicle_id = str(event["vehicle_id"])
+        if event["type"] == "entry":
+            item = {
+                "type": "entry",
+                "petrolPumpID": event["petrol_pump_id"],
+                "vehicleID": vehicle_id,
+                "vehicleType": event["vehicle_type"],
+                "enteringTime": event["entering_time"],
+                "date": event["date"]
+            }
+            if event.get("idempotency_key"):
+                item["idempotencyKey"] = event["idempotency_key"]
+            request_tracker.track_post_request(vehicle_id, event["petrol_pump_id"], _tracked_bulk_item(item))
+            _entry_future(event["petrol_pump_id"], vehicle_id)
+        else:
+            item = {
+                "type": "exit",
+                "petrolPumpID": event["petrol_pump_id"],
+                "vehicleID": vehicle_id,
+                "exitTime": event["exit_time"],
+                "fillingTime": event["filling_time"]
+            }
+            if event.get("idempotency_key"):
+                item["idempotencyKey"] = event["idempotency_key"]
+            request_tracker.track_put_request(vehicle_id, event["petrol_pump_id"], _tracked_bulk_item(item),
+                                              allow_if_not_posted=True)
+        body.append(item)
+    
+    logger.info(f"Posting {len(body)} events in one bulk request")
+    
+    results = None
+    rejected = None
+    try:
+        for compact in ((True, False) if _compact_bulk_enabled() else (False,)):
+            data, headers = _encode_bulk_body({"events": body}, compact)
+            async with _request('POST', BULK_EVENTS_ENDPOINT, 'bulk', data=data, headers=headers) as response:
+                # 415 from servers that know the formats, 400 from ones that cannot parse the body at all
+                if compact and response.status in (400, 415):
+                    logger.warning(f"Server rejected a {headers['Content-Type']} {headers.get('Content-Encoding', '')} "
+                                   f"bulk body ({response.status}), falling back to JSON")
+                    _disable_compact_bulk()
+                    continue
+                if response.status in (404, 405):
+                    logger.warning("Server has no bulk endpoint, falling back to single requests")
+                    _bulk_supported = False
+                elif response.status != 200:
+                    logger.error(f"Bulk request failed. Status: {response.status}, Response: {await response.text()}")
+                else:
+                    server_results = (await _decode_bulk_response(response)).get("results") or []
+                    if len(server_results) != len(body):
+                        logger.error(f"Bulk response has {len(server_results)} results for {len(body)} events")
+                    else:
+                        results = server_results
+            break
+    except CircuitOpenError as e:
+        rejected = e
+    except Exception as e:
+        logger.error(f"Exception during post_events_bulk_async: {str(e)}")
+    
+    # Report each event's outcome to the tracker and to exits waiting on entries
+    outcomes = []
+    for index, item in enumerate(body):
+        result = results[index] if results else None
+        ok = bool(result) and result.get("status") == "ok"
+        if not ok and result:
+            logger.error(f"Bulk {item['type']} for vehicle {item['vehicleID']} failed: {result.get('error')}")
+        
+        if item["type"] == "entry":
+            # The result's vehicleID is the ID the server stored the entry under and matches
+            # exits against. The Node server has no surrogate row key: it stores and echoes the
+            # track ID sent here, so for it the server ID is the track ID.
+            response_json = {"VehicleID": result.get("vehicleID") or item["vehicleID"]} if ok else None
+            if ok:
+                request_tracker.update_post_status(item["vehicleID"], item["petrolPumpID"], response_json)
+            _finish_entry(item["petrolPumpID"], item["vehicleID"], response_json["VehicleID"] if ok else None)
+            outcomes.append(response_json)
+        else:
+            request_tracker.update_put_status(item["vehicleID"], item["petrolPumpID"], ok)
+            outcomes.append(ok)
+    
+    if rejected is not None:
+        raise rejected
+    return outcomes if results else None
+
+def bulk_upload_supported():
+    """False once the server has shown it has no bulk endpoint."""
+    return _bulk_supported
+
+def _compact_bulk_enabled():
+    return _compact_bulk_supported and (Config.BULK_ENCODING != "json" or Config.BULK_COMPRESSION is not None)
+
+def _disable_compact_bulk():
+    global _compact_bulk_supported
+    _compact_bulk_supported = False
+
+def _encode_bulk_body(payload, compact):
+    """
+    Serialize a bulk request body, in the configured compact format if `compact` is set.
+    
+    Returns:
+        tuple: (body bytes, request headers)
+    """
+    if compact:
+        try:
+            headers = {}
+            if Config.BULK_ENCODING == "msgpack":
+                import msgpack
+                data = msgpack.packb(payload)
+                headers["Content-Type"] = "application/msgpack"
+                headers["Accept"] = "application/msgpack, application/json;q=0.5"
+            else:
+                data = json.dumps(payload, separators=(",", ":")).encode()
+                headers["Content-Type"] = "application/json"
+            
+            if Config.BULK_COMPRESSION == "gzip":
+                data = gzip.compress(data)
+                headers["Content-Encoding"] = "gzip"
+            elif Config.BULK_COMPRESSION == "zstd":
+                import zstandard
+                data = zstandard.ZstdCompressor().compress(data)
+                headers["Content-Encoding"] = "zstd"
+            return data, headers
+        except ImportError as e:
+            logger.error(f"Cannot encode compact bulk bodies ({str(e)}), sending JSON instead")
+            _disable_compact_bulk()
+    
+    return json.dumps(payload, separators=(",", ":")).encode(), {"Content-Type": "application/json"}
+
+async def _decode_bulk_response(response):
+    if response.content_type == "application/msgpack":
+        import msgpack
+        return msgpack.unpackb(await response.read())
+    return await response.json()
+
 # Synchronous wrappers for the async functions to maintain compatibility with the existing code
 
-def post_vehicle_entry(petrol_pump_id, vehicle_id=None, entering_time=None, date=None, vehicle_type="Car"):
+def post_vehicle_entry(petrol_pump_id, vehicle_id=None, entering_time=None, date=None, vehicle_type="Car",
+                       retry_on_failure=True, idempotency_key=None):
     """
     Synchronous wrapper for post_vehicle_entry_async.
-    Submits the API request in a background thread.
+    Schedules the request on the background loop without waiting.
+    
+    Returns:
+        concurrent.futures.Future: Resolves to the server response or None
+    """
+    return _submit(post_vehicle_entry_async(petrol_pump_id, vehicle_type, vehicle_id, entering_time, date,
+                                            retry_on_failure, idempotency_key))
+
+def update_vehicle_exit(petrol_pump_id, vehicle_id, exit_time=None, filling_time=None, entry_time=None,
+                        retry_on_failure=True, idempotency_key=None):
     """
-    loop = asyncio.new_event_loop()
+    Synchronous wrapper for update_vehicle_exit_async.
+    Schedules the request on the background loop without waiting.
     
-    def _run_async():
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(
-            post_vehicle_entry_async(petrol_pump_id, vehicle_type, vehicle_id, entering_time, date)
-        )
+    Returns:
+        concurrent.futures.Future: Resolves to True if the update succeeded, False otherwise
+    """
+    return _submit(update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time, filling_time, entry_time,
+                                             retry_on_failure, idempotency_key))
+
+def post_events_bulk(events):
+    """
+    Synchronous wrapper for post_events_bulk_async.
+    
+    Returns:
+        concurrent.futures.Future: Resolves to the per-event results, or None if the request failed
+    """
+    return _submit(post_events_bulk_async(events))
+
+def _process_vehicle_detail(item):
+    """Normalize one vehicle record from the API, with defaults for missing fields."""
+    processed_item = {
+        'VehicleID': item.get('VehicleID', 'unknown'),
+        'EnteringTime': item.get('EnteringTime', ''),
+        'ExitTime': item.get('ExitTime', ''),
+        'FillingTime': item.get('FillingTime', ''),
+        'ServerConnected': "0",  # Default to not connected
+        'ServerUpdate': False,   # Default to not updated
+        'Date': str(item.get('Date') or '')[:10],
+        'VehicleType': item.get('VehicleType', 'Car')
+    }
+    
+    # Try to determine if vehicle is active/connected
+    if 'ServerConnected' in item:
+        processed_item['ServerConnected'] = item['ServerConnected']
+    
+    if 'ServerUpdate' in item:
+        processed_item['ServerUpdate'] = item['ServerUpdate']
     
-    # Submit to thread pool
-    future = executor.submit(_run_async)
+    return processed_item
+
+def _record_key(item):
+    """Records are identified by vehicle ID and entry, since track IDs repeat across runs and days."""
+    return (item['VehicleID'], item['Date'], item['EnteringTime'])
+
+def _entry_datetime(item):
+    """Entry of a record as a datetime, or None if its date or time cannot be parsed."""
     try:
-        result = future.result(timeout=0.1)  # Small timeout to avoid blocking
-        return result
-    except concurrent.futures.TimeoutError:
-        # The async operation is still running in the background
-        logger.info(f"Vehicle entry submission for {vehicle_id} is running in background")
+        return datetime.strptime(f"{item['Date']} {item['EnteringTime']}", "%Y-%m-%d %H:%M:%S")
+    except ValueError:
         return None
 
-def update_vehicle_exit(petrol_pump_id, vehicle_id, exit_time=None, filling_time=None, entry_time=None):
+def _fetch_watermark(records):
     """
-    Synchronous wrapper for update_vehicle_exit_async.
-    Submits the API request in a background thread.
+    Entry time to fetch from incrementally: the earliest entry of a record that has not
+    exited yet (its exit may still be written), otherwise the latest entry seen.
+    
+    Only records entered within Config.DETAILS_OPEN_WINDOW of the latest entry count as
+    open, so a vehicle whose exit never arrives does not pin the watermark; a late exit
+    of an older record is picked up by the next full download.
     """
-    loop = asyncio.new_event_loop()
+    entries = [(item['Date'], item['EnteringTime']) for item in records.values() if item['Date']]
+    if not entries:
+        return None
+    latest = max(entries)
     
-    def _run_async():
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(
-            update_vehicle_exit_async(petrol_pump_id, vehicle_id, exit_time, filling_time, entry_time)
-        )
+    oldest_open = None
+    latest_entry = _entry_datetime({'Date': latest[0], 'EnteringTime': latest[1]})
+    if latest_entry is not None:
+        oldest_open = latest_entry - timedelta(seconds=Config.DETAILS_OPEN_WINDOW)
+    open_entries = []
+    for item in records.values():
+        if not item['Date'] or item['ExitTime']:
+            continue
+        entered = _entry_datetime(item)
+        if entered is not None and (oldest_open is None or entered >= oldest_open):
+            open_entries.append((item['Date'], item['EnteringTime']))
     
-    # Submit to thread pool
-    future = executor.submit(_run_async)
+    date, entering_time = min(open_entries) if open_entries else latest
+    return f"{date} {entering_time}"
+
+def _fetch_vehicle_details(petrol_pump_id, vehicle_id=None, date=None, since=None):
+    """Fetch and normalize vehicle records. Returns a list, or None if the request failed or timed out."""
+    future = _submit(get_vehicle_details_async(petrol_pump_id, vehicle_id, date, since))
     try:
-        result = future.result(timeout=0.1)  # Small timeout to avoid blocking
-        return result
-    except concurrent.futures.TimeoutError:
-        # The async operation is still running in the background
-        logger.info(f"Vehicle exit update for {vehicle_id} is running in background")
+        api_data = future.result(timeout=Config.API_REQUEST_TIMEOUT * 2)
+    except Exception as e:
+        future.cancel()
+        logger.error(f"Vehicle details request for {petrol_pump_id} did not complete: {e!r}")
         return None
+    if api_data is None:
+        return None
+    
+    # Ensure we're working with a list for consistency
+    if isinstance(api_data, dict):
+        api_data = [api_data]
+    
+    processed_data = []
+    for item in api_data:
+        try:
+            processed_data.append(_process_vehicle_detail(item))
+        except Exception as e:
+            logger.error(f"Error processing item from API: {e}")
+    return processed_data
 
-def get_vehicle_details(petrol_pump_id, vehicle_id=None):
-    """
-    Synchronous wrapper for get_vehicle_details_async.
+def get_vehicle_details(petrol_pump_id, vehicle_id=None, date=None, use_cache=True):
     """
-    loop = asyncio.new_event_loop()
+    Get vehicle details for a pump, served from a local cache keyed by pump and date.
     
-    def _run_async():
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(
-            get_vehicle_details_async(petrol_pump_id, vehicle_id)
-        )
+    Within Config.DETAILS_CACHE_TTL the cached records are returned without a request. After
+    that only records from the fetch watermark onwards are downloaded and merged into
+    the cache; a full download replaces it every Config.DETAILS_FULL_REFRESH seconds.
+    
+    Args:
+        petrol_pump_id (str): ID of the petrol pump
+        vehicle_id (str, optional): Get details for a specific vehicle (never cached)
+        date (str, optional): Only records of this date ("YYYY-MM-DD"); None for all dates
+        use_cache (bool): False to force a full download
     
-    # For data retrieval, we actually wait for the result
-    future = executor.submit(_run_async)
+    Returns:
+        list: Vehicle records ordered by date and entry time, the last cached records if the
+              server cannot be reached, or [] if none are available
+    """
+    cached = None
     try:
-        # Get the API response
-        api_data = future.result()
+        if vehicle_id:
+            return _fetch_vehicle_details(petrol_pump_id, vehicle_id) or []
         
-        # Early return if no data
-        if not api_data:
+        key = (petrol_pump_id, date)
+        now = time.monotonic()
+        with _details_lock:
+            cached = _details_cache.get(key) if use_cache else None
+            if cached and now - cached["fetched"] < Config.DETAILS_CACHE_TTL:
+                return list(cached["ordered"])
+        
+        incremental = cached is not None and now - cached["full_fetched"] < Config.DETAILS_FULL_REFRESH
+        since = _fetch_watermark(cached["records"]) if incremental else None
+        fetched = _fetch_vehicle_details(petrol_pump_id, date=date, since=since)
+        
+        if fetched is None:
             logger.warning(f"No data received from API for petrol_pump_id={petrol_pump_id}")
-            return []
-            
-        # Ensure we're working with a list for consistency
-        if isinstance(api_data, dict):
-            api_data = [api_data]
+            # Serve the last known records rather than nothing while the server is unavailable
+            return list(cached["ordered"]) if cached else []
         
-        # Process the data to make it safe
-        processed_data = []
-        for item in api_data:
-            try:
-                # Create a processed item with default values for all required fields
-                processed_item = {
-                    'VehicleID': item.get('VehicleID', 'unknown'),
-                    'EnteringTime': item.get('EnteringTime', ''),
-                    'ExitTime': item.get('ExitTime', ''),
-                    'FillingTime': item.get('FillingTime', ''),
-                    'ServerConnected': "0",  # Default to not connected
-                    'ServerUpdate': False,   # Default to not updated
-                    'Date': item.get('Date', ''),
-                    'VehicleType': item.get('VehicleType', 'Car')
-                }
-                
-                # Try to determine if vehicle is active/connected
-                if 'ServerConnected' in item:
-                    processed_item['ServerConnected'] = item['ServerConnected']
-                
-                if 'ServerUpdate' in item:
-                    processed_item['ServerUpdate'] = item['ServerUpdate']
-                
-                processed_data.append(processed_item)
-            except Exception as e:
-                logger.error(f"Error processing item from API: {e}")
-                
-        return processed_data
+        with _details_lock:
+            if incremental:
+                records = dict(cached["records"])
+                full_fetched = cached["full_fetched"]
+            else:
+                records = {}
+                full_fetched = now
+            for item in fetched:
+                records[_record_key(item)] = item
+            ordered = sorted(records.values(), key=lambda item: (item['Date'], item['EnteringTime']))
+            _details_cache[key] = {
+                "records": records,
+                "ordered": ordered,
+                "fetched": now,
+                "full_fetched": full_fetched
+            }
+        
+        logger.info(f"Fetched {len(fetched)} vehicle records for {petrol_pump_id} "
+                    f"({'since ' + since if since else 'full'}), {len(ordered)} cached")
+        return list(ordered)
     except Exception as e:
         logger.error(f"Error in get_vehicle_details: {str(e)}")
-        return []
+        return list(cached["ordered"]) if cached else []
+
+def clear_vehicle_details_cache(petrol_pump_id=None):
+    """Drop cached vehicle records for one pump, or for all pumps."""
+    with _details_lock:
+        for key in list(_details_cache):
+            if petrol_pump_id is None or key[0] == petrol_pump_id:
+                del _details_cache[key]
+
+def get_circuit_state():
+    """Get the backend circuit breaker state and its recent transitions."""
+    return breaker.snapshot()
 
 # Functions to access the request tracker
 def get_request_stats():
@@ -490,22 +995,119 @@ def get_request_debug_logs():
     """Get debug logs from the request tracker."""
     return request_tracker.get_debug_logs()
 
+def query_request_debug_logs(event_types=None, outcomes=None, vehicle_id=None, since=None, until=None, limit=None):
+    """Get structured debug records from the request tracker, filtered by type, outcome, vehicle and time."""
+    return request_tracker.query_debug_logs(event_types, outcomes, vehicle_id, since, until, limit)
+
 def get_vehicle_status(track_id=None, server_id=None):
     """Get status of a vehicle or all vehicles."""
     return request_tracker.get_vehicle_status(track_id, server_id)
 
-def force_update_stale_vehicles(petrol_pump_id="IOCL-1", max_active_time=300):
+def get_archived_vehicles(limit=None):
+    """Get compact records of vehicles retired from the request tracker, most recent first."""
+    return request_tracker.get_archived_vehicles(limit)
+
+def get_request_tracker_memory():
+    """Get the request tracker's record counts and approximate memory use."""
+    return request_tracker.get_memory_usage()
+
+def _with_entry_key(payload, vehicle):
+    """Add the idempotency key of a tracked vehicle's entry POST to an exit payload."""
+    key = ((vehicle or {}).get("post_payload") or {}).get("IdempotencyKey")
+    if key:
+        payload["IdempotencyKey"] = key
+    return payload
+
+async def _put_exits_async(petrol_pump_id, jobs, name, progress_callback=None):
     """
-    Force update vehicles that have been active for too long.
+    Send exit PUTs for many vehicles at once, at most Config.BATCH_PUT_CONCURRENCY at a time.
+    The whole batch is bounded by Config.BATCH_PUT_DEADLINE; PUTs still pending then are cancelled
+    and counted as failures.
+    
+    Args:
+        petrol_pump_id (str): ID of the petrol pump
+        jobs (list): (label, server vehicle ID, payload) tuples
+        name (str): Batch name used in logs and progress reports
+        progress_callback (callable): Called with the progress dict after each PUT
+    
+    Returns:
+        dict: Results of the operation with success and failure counts
+    """
+    results = {
+        "success": 0,
+        "failure": 0,
+        "errors": []
+    }
+    progress = {
+        "name": name,
+        "total": len(jobs),
+        "done": 0,
+        "success": 0,
+        "failure": 0,
+        "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    _batch_progress[name] = progress
+    semaphore = asyncio.Semaphore(Config.BATCH_PUT_CONCURRENCY)
+    
+    def report(ok, error=None):
+        results["success" if ok else "failure"] += 1
+        if error:
+            results["errors"].append(error)
+        progress["done"] += 1
+        progress["success" if ok else "failure"] += 1
+        if progress["done"] % Config.BATCH_PUT_CONCURRENCY == 0 or progress["done"] == progress["total"]:
+            logger.info(f"{name}: {progress['done']}/{progress['total']} done ({progress['failure']} failed)")
+        if progress_callback is not None:
+            try:
+                progress_callback(dict(progress))
+            except Exception as e:
+                logger.error(f"Error in {name} progress callback: {str(e)}")
+    
+    async def put_exit(label, vehicle_id, payload):
+        update_url = f"{UPDATE_VEHICLE_ENDPOINT}/{petrol_pump_id}/vehicle/{vehicle_id}"
+        async with semaphore:
+            try:
+                async with _request('PUT', update_url, 'exit', json=payload,
+                                    headers=_idempotency_headers(payload)) as response:
+                    if response.status == 200:
+                        logger.info(f"{name}: exit updated for vehicle {label} (server ID: {vehicle_id})")
+                        request_tracker.update_put_status(vehicle_id, petrol_pump_id, True)
+                        report(True)
+                    else:
+                        response_text = await response.text()
+                        logger.error(f"{name}: PUT failed for vehicle {label}. Status: {response.status}")
+                        report(False, f"Vehicle {vehicle_id}: Status {response.status}, Response: {response_text}")
+            except Exception as e:
+                logger.error(f"{name}: error sending PUT for vehicle {label}: {str(e)}")
+                report(False, f"Vehicle {vehicle_id}: Exception: {str(e)}")
+    
+    tasks = [asyncio.ensure_future(put_exit(*job)) for job in jobs]
+    try:
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=Config.BATCH_PUT_DEADLINE)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"{name}: {len(pending)} PUTs still pending after {Config.BATCH_PUT_DEADLINE}s were cancelled")
+                for _ in pending:
+                    report(False, f"Timed out after {Config.BATCH_PUT_DEADLINE}s")
+    finally:
+        _batch_progress.pop(name, None)
+    
+    return results
+
+async def force_update_stale_vehicles_async(petrol_pump_id="IOCL-1", max_active_time=300, progress_callback=None):
+    """
+    Asynchronously force exit updates for vehicles that have been active for too long.
     
     Args:
         petrol_pump_id (str): ID of the petrol pump
         max_active_time (int): Maximum time in seconds a vehicle should be active
+        progress_callback (callable): Called with the progress dict after each PUT
     
     Returns:
         int: Number of vehicles updated
     """
-    updated_count = 0
     current_time = datetime.now()
     
     # Get all vehicle statuses
@@ -514,128 +1116,112 @@ def force_update_stale_vehicles(petrol_pump_id="IOCL-1", max_active_time=300):
         logger.warning("No vehicles found in tracker")
         return 0
     
+    jobs = []
     for vehicle in vehicles:
         try:
             # Check if the vehicle is still marked as in ROI but has been there too long
-            if vehicle.get("posted", False) and not vehicle.get("put_completed", False):
-                track_id = vehicle.get("track_id")
-                server_id = vehicle.get("server_vehicle_id")
-                
-                # Skip if no server ID (shouldn't happen if posted is True)
-                if not server_id:
-                    logger.warning(f"Vehicle {track_id} is posted but has no server ID")
-                    continue
-                
-                # Check post timestamp
-                post_timestamp = vehicle.get("post_timestamp")
-                if not post_timestamp:
-                    logger.warning(f"Vehicle {track_id} has no post timestamp")
-                    continue
-                
-                try:
-                    # Parse timestamp
-                    timestamp_dt = datetime.strptime(post_timestamp, "%Y-%m-%d %H:%M:%S.%f")
-                    time_diff = (current_time - timestamp_dt).total_seconds()
-                    
-                    # If vehicle has been active for too long, force an exit update
-                    if time_diff > max_active_time:
-                        logger.info(f"Forcing exit update for stale vehicle {track_id} (server ID: {server_id})")
-                        
-                        # Get current time for exit time
-                        exit_time = current_time.strftime("%H:%M:%S")
-                        
-                        # Calculate filling time (use default if entry time not available)
-                        filling_time = "300 seconds"  # Default
-                        
-                        # Create exit payload
-                        payload = {
-                            "ExitTime": exit_time,
-                            "FillingTime": filling_time
-                        }
-                        
-                        # Force PUT request
-                        update_url = f"{UPDATE_VEHICLE_ENDPOINT}/{petrol_pump_id}/vehicle/{server_id}"
-                        
-                        # Use synchronous request for immediate feedback
-                        try:
-                            response = requests.put(update_url, json=payload, timeout=10)
-                            
-                            if response.status_code == 200:
-                                logger.info(f"Successfully forced exit update for vehicle {track_id} (server ID: {server_id})")
-                                request_tracker.update_put_status(server_id, petrol_pump_id, True)
-                                updated_count += 1
-                            else:
-                                logger.error(f"Failed to update vehicle exit. Status: {response.status_code}")
-                                logger.error(f"Response: {response.text}")
-                        except Exception as e:
-                            logger.error(f"Error sending forced PUT request: {str(e)}")
-                        
-                except ValueError:
-                    logger.warning(f"Invalid timestamp format for vehicle {track_id}: {post_timestamp}")
-                    continue
+            if not vehicle.get("posted", False) or vehicle.get("put_completed", False):
+                continue
+            
+            track_id = vehicle.get("track_id")
+            server_id = vehicle.get("server_vehicle_id")
+            
+            # Skip if no server ID (shouldn't happen if posted is True)
+            if not server_id:
+                logger.warning(f"Vehicle {track_id} is posted but has no server ID")
+                continue
+            
+            # Check post timestamp
+            post_timestamp = vehicle.get("post_timestamp")
+            if not post_timestamp:
+                logger.warning(f"Vehicle {track_id} has no post timestamp")
+                continue
+            
+            try:
+                timestamp_dt = datetime.strptime(post_timestamp, "%Y-%m-%d %H:%M:%S.%f")
+            except ValueError:
+                logger.warning(f"Invalid timestamp format for vehicle {track_id}: {post_timestamp}")
+                continue
+            
+            # If vehicle has been active for too long, force an exit update
+            if (current_time - timestamp_dt).total_seconds() > max_active_time:
+                logger.info(f"Forcing exit update for stale vehicle {track_id} (server ID: {server_id})")
+                jobs.append((track_id, server_id, _with_entry_key({
+                    "ExitTime": current_time.strftime("%H:%M:%S"),
+                    "FillingTime": "300 seconds"  # Default, entry time is not available here
+                }, vehicle)))
         except Exception as e:
             logger.error(f"Error processing vehicle for forced update: {str(e)}")
     
-    return updated_count
+    if not jobs:
+        return 0
+    
+    results = await _put_exits_async(petrol_pump_id, jobs, "Stale vehicle update", progress_callback)
+    return results["success"]
 
-def manual_batch_put_request(petrol_pump_id="IOCL-1", vehicle_ids=None):
+async def manual_batch_put_request_async(petrol_pump_id="IOCL-1", vehicle_ids=None, progress_callback=None):
     """
-    Manually send PUT requests for a batch of vehicles.
+    Asynchronously send PUT requests for a batch of vehicles.
     
     Args:
         petrol_pump_id (str): ID of the petrol pump
         vehicle_ids (list): List of vehicle IDs to update. If None, update all vehicles
                            with server IDs that haven't had a PUT completed
+        progress_callback (callable): Called with the progress dict after each PUT
     
     Returns:
         dict: Results of the operation with success and failure counts
     """
-    results = {
-        "success": 0,
-        "failure": 0,
-        "errors": []
-    }
-    
     # Get current time for exit time
     current_time = datetime.now().strftime("%H:%M:%S")
     
     # If no vehicle IDs specified, get all vehicles with server IDs that need PUT
     if not vehicle_ids:
-        all_vehicles = request_tracker.get_vehicle_status()
-        vehicle_ids = []
-        
-        for vehicle in all_vehicles:
-            if (vehicle.get("posted", False) and 
-                vehicle.get("server_vehicle_id") and 
-                not vehicle.get("put_completed", False)):
-                vehicle_ids.append(vehicle.get("server_vehicle_id"))
-    
-    # Process each vehicle
-    for vehicle_id in vehicle_ids:
-        try:
-            # Create a generic exit payload
-            payload = {
-                "ExitTime": current_time,
-                "FillingTime": "5 seconds"  # Default filling time
-            }
-            
-            # Create the URL
-            update_url = f"{UPDATE_VEHICLE_ENDPOINT}/{petrol_pump_id}/vehicle/{vehicle_id}"
-            
-            # Send the PUT request
-            response = requests.put(update_url, json=payload, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info(f"Manual PUT success for vehicle {vehicle_id}")
-                results["success"] += 1
-            else:
-                logger.error(f"Manual PUT failed for vehicle {vehicle_id}. Status: {response.status_code}")
-                logger.error(f"Response: {response.text}")
-                results["failure"] += 1
-                results["errors"].append(f"Vehicle {vehicle_id}: Status {response.status_code}, Response: {response.text}")
-        except Exception as e:
-            logger.error(f"Error in manual PUT for vehicle {vehicle_id}: {str(e)}")
-            results["failure"] += 1
-            results["errors"].append(f"Vehicle {vehicle_id}: Exception: {str(e)}")
+        vehicle_ids = [
+            vehicle.get("server_vehicle_id") for vehicle in request_tracker.get_vehicle_status()
+            if (vehicle.get("posted", False) and
+                vehicle.get("server_vehicle_id") and
+                not vehicle.get("put_completed", False))
+        ]
+    
+    # Create a generic exit payload for each vehicle
+    jobs = [(vehicle_id, vehicle_id, _with_entry_key({
+        "ExitTime": current_time,
+        "FillingTime": "5 seconds"  # Default filling time
+    }, request_tracker.get_vehicle_status(server_id=vehicle_id))) for vehicle_id in vehicle_ids]
+    
+    return await _put_exits_async(petrol_pump_id, jobs, "Manual batch PUT", progress_callback)
+
+def force_update_stale_vehicles(petrol_pump_id="IOCL-1", max_active_time=300, progress_callback=None):
+    """
+    Synchronous wrapper for force_update_stale_vehicles_async.
+    Waits for the batch, which is bounded by Config.BATCH_PUT_DEADLINE.
     
-    return results
\ No newline at end of file
+    Returns:
+        int: Number of vehicles updated
+    """
+    future = _submit(force_update_stale_vehicles_async(petrol_pump_id, max_active_time, progress_callback))
+    try:
+        return future.result(timeout=Config.BATCH_PUT_DEADLINE + Config.API_REQUEST_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error in force_update_stale_vehicles: {str(e)}")
+        return 0
+
+def manual_batch_put_request(petrol_pump_id="IOCL-1", vehicle_ids=None, progress_callback=None):
+    """
+    Synchronous wrapper for manual_batch_put_request_async.
+    Waits for the batch, which is bounded by Config.BATCH_PUT_DEADLINE.
+    
+    Returns:
+        dict: Results of the operation with success and failure counts
+    """
+    future = _submit(manual_batch_put_request_async(petrol_pump_id, vehicle_ids, progress_callback))
+    try:
+        return future.result(timeout=Config.BATCH_PUT_DEADLINE + Config.API_REQUEST_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error in manual_batch_put_request: {str(e)}")
+        return {"success": 0, "failure": 0, "errors": [f"Exception: {str(e)}"]}
+
+def get_batch_progress():
+    """Get the progress of batch PUT operations currently running."""
+    return [dict(progress) for progress in _batch_progress.values()]
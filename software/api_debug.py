@@ -4,7 +4,9 @@ import numpy as np
 import time
 import json
 from datetime import datetime
-from api_client import get_request_stats, get_request_debug_logs, get_vehicle_status
+from api_client import (get_request_stats, query_request_debug_logs, get_vehicle_status, get_circuit_state,
+                        get_request_tracker_memory)
+from api_request_tracker import format_debug_record
 
 # Set page configuration
 st.set_page_config(
@@ -82,6 +84,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def vehicles_frame(vehicles):
+    """DataFrame of tracker records, which are read-only mappings with read-only payloads."""
+    return pd.DataFrame([{field: dict(value) if field.endswith("_payload") and value else value
+                          for field, value in vehicle.items()} for vehicle in vehicles])
+
 def main():
     # Initialize session state
     if 'auto_refresh' not in st.session_state:
@@ -145,6 +152,7 @@ def main():
             <div class="metric-card">
                 <h3>Total Vehicles</h3>
                 <p style="font-size: 24px; margin: 0;">{stats.get('total_vehicles', 0)}</p>
+                <p style="font-size: 14px; margin: 0;">(Tracked: {stats.get('tracked_vehicles', 0)}, Archived: {stats.get('archived_vehicles', 0)})</p>
             </div>
             """, unsafe_allow_html=True)
         
@@ -158,7 +166,7 @@ def main():
             <div class="metric-card">
                 <h3>Pending Operations</h3>
                 <p style="font-size: 24px; margin: 0;">{total_pending}</p>
-                <p style="font-size: 14px; margin: 0;">(POST: {pending_posts}, PUT: {pending_puts})</p>
+                <p style="font-size: 14px; margin: 0;">(POST: {pending_posts}, PUT: {pending_puts}, Expired: {stats.get('expired_vehicles', 0)})</p>
             </div>
             """, unsafe_allow_html=True)
         
@@ -187,13 +195,62 @@ def main():
             </div>
             """, unsafe_allow_html=True)
         
+        memory = get_request_tracker_memory()
+        st.caption(f"Request tracker memory: {memory['total_bytes'] / 1024:.0f} KiB "
+                   f"(records {memory['vehicles_bytes'] / 1024:.0f} KiB, indexes {memory['index_bytes'] / 1024:.0f} KiB, "
+                   f"archive {memory['archive_bytes'] / 1024:.0f} KiB)")
+        
+        # Backend circuit breaker
+        st.subheader("Backend Circuit")
+        
+        circuit = get_circuit_state()
+        circuit_class = {
+            "closed": "status-success",
+            "half_open": "status-pending",
+            "open": "status-error"
+        }.get(circuit["state"], "status-pending")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h3>State</h3>
+                <span class="status-badge {circuit_class}">{circuit["state"].replace("_", "-").upper()}</span>
+                <p style="font-size: 14px; margin: 0;">Next probe in: {circuit["retry_in"]}s</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h3>Consecutive Failures</h3>
+                <p style="font-size: 24px; margin: 0;">{circuit["consecutive_failures"]} / {circuit["failure_threshold"]}</p>
+                <p style="font-size: 14px; margin: 0;">Last error: {circuit["last_error"] or "None"}</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col3:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h3>Rejected While Open</h3>
+                <p style="font-size: 24px; margin: 0;">{circuit["rejected"]}</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        if circuit["transitions"]:
+            df_transitions = pd.DataFrame(circuit["transitions"][::-1])
+            df_transitions.columns = ["Time", "From", "To", "Reason"]
+            st.dataframe(df_transitions, use_container_width=True, height=200)
+        else:
+            st.info("No circuit state changes yet.")
+        
         # Vehicle status summary
         st.subheader("Vehicle Status Summary")
         
         all_vehicles = get_vehicle_status()
         if all_vehicles:
-            # Convert to DataFrame
-            df_vehicles = pd.DataFrame(all_vehicles)
+            df_vehicles = vehicles_frame(all_vehicles)
             
             # Add status column
             def determine_status(row):
@@ -252,51 +309,53 @@ def main():
             st.info("No vehicle data available.")
     
     with tabs[1]:  # Request Logs Tab
-        # Fetch debug logs
-        logs = get_request_debug_logs()
-        
         st.subheader("API Request Logs")
         
         # Filter options
-        col1, col2, col3 = st.columns([2, 2, 1])
+        col1, col2, col3, col4, col5 = st.columns([2, 1, 2, 1, 1])
         
         with col1:
-            filter_text = st.text_input("🔍 Filter Logs", help="Filter logs by text")
+            filter_vehicle = st.text_input("🔍 Vehicle", help="Track ID or server ID")
         
         with col2:
-            filter_type = st.multiselect(
-                "Filter by Type",
-                options=["POST", "PUT", "SUCCESS", "DENIED", "FAILED", "TRACKED", "RETRY"],
-                default=[]
-            )
+            filter_type = st.multiselect("Type", options=["POST", "PUT", "RETRY"], default=[])
         
         with col3:
-            max_logs = st.number_input("Max Logs", min_value=10, max_value=1000, value=100, step=10)
-        
-        # Apply filters
-        filtered_logs = logs
+            filter_outcome = st.multiselect(
+                "Outcome",
+                options=["TRACKED", "SUCCESS", "FAILED", "DENIED", "NOT_FOUND", "MISSING_ID", "DUPLICATE",
+                         "WITHOUT_POST", "PENDING"],
+                default=[]
+            )
         
-        if filter_text:
-            filtered_logs = [log for log in filtered_logs if filter_text.lower() in log.lower()]
+        with col4:
+            window = st.selectbox("Time Range", options=["All", "Last 5 min", "Last 15 min", "Last hour"])
         
-        if filter_type:
-            filtered_logs = [log for log in filtered_logs if any(t in log for t in filter_type)]
+        with col5:
+            max_logs = st.number_input("Max Logs", min_value=10, max_value=1000, value=100, step=10)
         
-        # Limit number of logs
-        filtered_logs = filtered_logs[-max_logs:] if len(filtered_logs) > max_logs else filtered_logs
+        window_seconds = {"Last 5 min": 300, "Last 15 min": 900, "Last hour": 3600}.get(window)
+        records = query_request_debug_logs(
+            event_types=set(filter_type),
+            outcomes=set(filter_outcome),
+            vehicle_id=filter_vehicle.strip() or None,
+            since=time.time() - window_seconds if window_seconds else None,
+            limit=int(max_logs)
+        )
+        filtered_logs = [format_debug_record(record) for record in records]
         
         # Display logs
         if filtered_logs:
-            # Color-code different log types
+            # Color-code by outcome, then by type
             formatted_logs = []
-            for log in filtered_logs:
-                if "SUCCESS" in log:
+            for record, log in zip(records, filtered_logs):
+                if record.outcome == "SUCCESS":
                     log = f'<span style="color: green;">{log}</span>'
-                elif "FAILED" in log or "DENIED" in log:
+                elif record.outcome in ("FAILED", "DENIED", "NOT_FOUND"):
                     log = f'<span style="color: red;">{log}</span>'
-                elif "POST" in log:
+                elif record.event_type == "POST":
                     log = f'<span style="color: blue;">{log}</span>'
-                elif "PUT" in log:
+                elif record.event_type == "PUT":
                     log = f'<span style="color: purple;">{log}</span>'
                 
                 formatted_logs.append(log)
@@ -382,21 +441,20 @@ def main():
                     post_payload = vehicle.get('post_payload')
                     if post_payload:
                         st.subheader("POST Payload")
-                        st.json(post_payload)
+                        st.json(dict(post_payload))
                 
                 with col2:
                     put_payload = vehicle.get('put_payload')
                     if put_payload:
                         st.subheader("PUT Payload")
-                        st.json(put_payload)
+                        st.json(dict(put_payload))
             else:
                 st.warning("No vehicle found with the specified ID.")
         else:
             # Show all vehicles
             all_vehicles = get_vehicle_status()
             if all_vehicles:
-                # Convert to DataFrame
-                df_vehicles = pd.DataFrame(all_vehicles)
+                df_vehicles = vehicles_frame(all_vehicles)
                 
                 # Select columns for display
                 display_cols = [
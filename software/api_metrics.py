@@ -0,0 +1,137 @@
+import threading
+import logging
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+logger = logging.getLogger('api_metrics')
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def outcome_for_status(status):
+    """Outcome label of an HTTP response: success, 4xx or 5xx."""
+    if status >= 500:
+        return "5xx"
+    if status >= 400:
+        return "4xx"
+    return "success"
+
+
+class RequestMetrics:
+    """
+    Latency histograms and outcome counters per endpoint and method, plus gauges.
+
+    observe() is only called from the API client's loop thread, so recording is a
+    dict lookup, a bisect and two increments with no lock. Scrapes from the metrics
+    server read copies of the dicts and may be one request behind, which is fine
+    for monitoring. Gauges are callables evaluated at scrape time, so they cost
+    nothing between scrapes.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.in_flight = 0
+        self._latency = {}   # (endpoint, method) -> [count per bucket..., +Inf count, sum of seconds]
+        self._outcomes = {}  # (endpoint, method, outcome) -> count
+        self._gauges = {}    # name -> (help text, callable returning a number)
+
+    def observe(self, endpoint, method, outcome, seconds=None):
+        """
+        Record one finished request.
+
+        Args:
+            endpoint (str): Endpoint label, e.g. "entry" or "exit"
+            method (str): HTTP method
+            outcome (str): success, 4xx, 5xx, timeout, error, rejected or cancelled
+            seconds (float): Latency, or None for requests that were never sent
+        """
+        key = (endpoint, method, outcome)
+        self._outcomes[key] = self._outcomes.get(key, 0) + 1
+        if seconds is not None:
+            series = self._latency.get((endpoint, method))
+            if series is None:
+                series = self._latency[(endpoint, method)] = [0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, seconds)] += 1
+            series[-1] += seconds
+
+    def register_gauge(self, name, help_text, value):
+        """Expose value() as a gauge; registering a name again replaces it."""
+        self._gauges[name] = (help_text, value)
+
+    def render(self):
+        """Format all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP api_client_request_duration_seconds Time from sending a request to its response headers",
+            "# TYPE api_client_request_duration_seconds histogram"
+        ]
+        for (endpoint, method), series in sorted(list(self._latency.items())):
+            series = list(series)
+            labels = f'endpoint="{endpoint}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'api_client_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'api_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"api_client_request_duration_seconds_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"api_client_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines.append("# HELP api_client_requests_total Requests by endpoint, method and outcome")
+        lines.append("# TYPE api_client_requests_total counter")
+        for (endpoint, method, outcome), count in sorted(list(self._outcomes.items())):
+            lines.append(f'api_client_requests_total{{endpoint="{endpoint}",method="{method}",outcome="{outcome}"}} {count}')
+
+        for name, (help_text, value) in sorted(list(self._gauges.items())):
+            try:
+                current = value()
+            except Exception as e:
+                logger.error(f"Error reading gauge {name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {current}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
+metrics.register_gauge("api_client_requests_in_flight", "Requests sent and waiting for a response",
+                       lambda: metrics.in_flight)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_server(host=None, port=None):
+    """Serve the metrics at /metrics once per process."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        host = host or Config.METRICS_HOST
+        port = port or Config.METRICS_PORT
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+        except OSError as e:
+            logger.error(f"Could not start metrics server on {host}:{port}: {str(e)}")
+            return None
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        logger.info(f"Metrics server running on http://{host}:{port}/metrics")
+        return _server
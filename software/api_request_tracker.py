@@ -1,26 +1,109 @@
 import logging
+import sys
 import threading
 import time
+from types import MappingProxyType
+from collections import OrderedDict, deque, namedtuple
 from datetime import datetime
-import json
+from config import Config
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('api_request_tracker')
 
+# Compact record of a vehicle that was retired from full tracking. Timestamps are Unix times
+# (None if the request was never made) and outcome is "completed" or "expired".
+ArchivedVehicle = namedtuple("ArchivedVehicle", [
+    "track_id", "petrol_pump_id", "server_vehicle_id", "post_timestamp", "put_timestamp", "outcome"
+])
+
+
+# Structured debug log record. event_type is POST, PUT or RETRY; detail is the retry count of a
+# failed PUT or the number of pending requests found by the retry thread.
+DebugRecord = namedtuple("DebugRecord", [
+    "timestamp", "event_type", "track_id", "server_id", "outcome", "detail"
+])
+
+
+def format_debug_record(record):
+    """Format a debug record as a log line."""
+    timestamp = datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")
+    line = f"[{timestamp}] {record.event_type} {record.outcome}"
+    fields = []
+    if record.track_id is not None:
+        fields.append(f"Vehicle: {record.track_id}")
+    if record.server_id:
+        fields.append(f"Server ID: {record.server_id}")
+    if record.detail is not None:
+        fields.append(f"Count: {record.detail}")
+    return f"{line} - {', '.join(fields)}" if fields else line
+
+
+def _empty_counts():
+    # expired/expired_unposted only grow for retired vehicles: those given up on before their
+    # exit completed, and the part of them whose entry never posted either
+    return {"total": 0, "posted": 0, "put_attempted": 0, "put_completed": 0, "put_pending": 0,
+            "expired": 0, "expired_unposted": 0}
+
+
+def _epoch(timestamp):
+    """Convert a tracker timestamp string to a Unix time, which takes a third of the memory."""
+    return datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+
+
+def _frozen(vehicle):
+    """Read-only copy of a vehicle record, with its request payloads copied read-only too."""
+    record = dict(vehicle)
+    for field in ("post_payload", "put_payload"):
+        if isinstance(record.get(field), dict):
+            record[field] = MappingProxyType(dict(record[field]))
+    return MappingProxyType(record)
+
+
+def _deep_size(obj, seen):
+    """Approximate memory of obj and the containers and strings it references, counting shared objects once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    return size
+
 class VehicleRequestTracker:
     """
     Class to track and manage API requests for vehicles.
     Ensures POST requests are completed before allowing PUT requests.
+    
+    Retention is bounded: vehicles whose exit completed keep their full record for
+    REQUEST_TRACKER_COMPLETED_AGE seconds, up to REQUEST_TRACKER_MAX_COMPLETED of them,
+    and vehicles whose exit never completes are given up on after
+    REQUEST_TRACKER_MAX_ACTIVE_AGE. Retired vehicles leave a compact ArchivedVehicle.
+    Both groups are kept in age order, so expiry only looks at the oldest entries.
+    
+    Every change to a record goes through _add, _remove, _update or _set_server_id,
+    which bump a version number. get_vehicle_status() without arguments returns an
+    immutable snapshot that is rebuilt only when the version moved on, and shared by
+    all readers until then. Lookups of one vehicle return a read-only copy of its record.
     """
     def __init__(self):
         self._lock = threading.Lock()
         self._vehicles = {}  # Track request status for each vehicle
         self._server_id_map = {}  # Map from server ID to key in _vehicles
+        self._track_index = {}  # Map from str(track ID) to the keys in _vehicles with that track ID, oldest first
+        self._counts = _empty_counts()  # Stats counters, kept in step with _vehicles on every change
+        self._retired_counts = _empty_counts()  # Stats counters of vehicles retired from _vehicles
+        self._active = OrderedDict()  # Key -> monotonic time tracked, for vehicles whose exit has not completed, oldest first
+        self._completed = OrderedDict()  # Key -> monotonic time the exit completed, oldest first
+        self._archive = OrderedDict()  # Key -> ArchivedVehicle of retired vehicles, oldest first
+        self._version = 0  # Bumped on every change to a vehicle record
+        self._snapshot = (-1, ())  # (version, read-only copies of all records) for lock-free reads
         self._retry_thread = None
         self._is_running = False
-        self._debug_log = []
+        self._debug_log = deque(maxlen=Config.REQUEST_TRACKER_DEBUG_LOG_SIZE)  # DebugRecords, oldest first
     
     def track_post_request(self, track_id, petrol_pump_id, payload, result=None):
         """
@@ -41,18 +124,18 @@ class VehicleRequestTracker:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
             
             # Check if already tracked
-            if key in self._vehicles:
+            existed = key in self._vehicles
+            if existed:
                 if self._vehicles[key]["posted"]:
                     logger.warning(f"Duplicate POST attempt for vehicle {track_id}")
-                    self._log_debug(f"DUPLICATE POST detected - Vehicle: {track_id}")
+                    self._log_debug("POST", "DUPLICATE", track_id)
                     return False
+                self._remove(key)
             
             # Create or update tracking record
             server_id = None
             if result and "VehicleID" in result:
                 server_id = result["VehicleID"]
-                # Add to server ID map for quicker lookup
-                self._server_id_map[server_id] = key
             
             vehicle_data = {
                 "track_id": track_id,
@@ -69,12 +152,13 @@ class VehicleRequestTracker:
                 "last_retry": None
             }
             
-            self._vehicles[key] = vehicle_data
+            self._add(key, vehicle_data)
+            self._expire()
             
             # Log the action
-            action = "updated" if key in self._vehicles else "created"
+            action = "updated" if existed else "created"
             logger.info(f"POST request {action} for vehicle {track_id}")
-            self._log_debug(f"POST request tracked - Vehicle: {track_id}, Server ID: {server_id}")
+            self._log_debug("POST", "TRACKED", track_id, server_id)
             
             # Start retry thread if not running
             self._ensure_retry_thread()
@@ -97,24 +181,21 @@ class VehicleRequestTracker:
             key = f"{petrol_pump_id}_{track_id}"
             if key not in self._vehicles:
                 logger.warning(f"Cannot update POST status: Vehicle {track_id} not found")
-                self._log_debug(f"UPDATE POST FAILED - Vehicle: {track_id} not found")
+                self._log_debug("POST", "NOT_FOUND", track_id)
                 return False
             
             # Update tracking data
-            self._vehicles[key]["posted"] = True
-            self._vehicles[key]["retry_count"] = 0
+            self._update(key, posted=True, retry_count=0)
             
             # Extract server vehicle ID if present
             if result and "VehicleID" in result:
                 server_id = result["VehicleID"]
-                self._vehicles[key]["server_vehicle_id"] = server_id
-                # Add to server ID map
-                self._server_id_map[server_id] = key
+                self._set_server_id(key, server_id)
                 logger.info(f"Updated vehicle {track_id} with server ID {server_id}")
-                self._log_debug(f"POST SUCCESS - Vehicle: {track_id}, Server ID: {server_id}")
+                self._log_debug("POST", "SUCCESS", track_id, server_id)
             else:
                 logger.warning(f"Server response for vehicle {track_id} missing VehicleID")
-                self._log_debug(f"POST MISSING ID - Vehicle: {track_id}")
+                self._log_debug("POST", "MISSING_ID", track_id)
             
             return True
     
@@ -133,24 +214,12 @@ class VehicleRequestTracker:
                 # This looks like a server ID
                 logger.debug(f"Treating {track_id} as a server ID")
                 
-                # Try to find the vehicle using the server ID map
-                if track_id in self._server_id_map:
-                    key = self._server_id_map[track_id]
+                # The server ID map covers every vehicle with a server ID
+                key = self._server_id_map.get(track_id)
+                if key is not None:
                     logger.debug(f"Found key {key} using server ID map for {track_id}")
                     vehicle = self._vehicles.get(key)
                     server_id = track_id
-                else:
-                    # If not in map, search all vehicles for this server ID
-                    logger.debug(f"Server ID {track_id} not in map, searching all vehicles")
-                    for vkey, vdata in self._vehicles.items():
-                        if vdata.get("server_vehicle_id") == track_id:
-                            key = vkey
-                            vehicle = vdata
-                            server_id = track_id
-                            # Add to map for future use
-                            self._server_id_map[track_id] = key
-                            logger.debug(f"Found key {key} by searching for server ID {track_id}")
-                            break
             
             # If not found as server ID, try regular lookup
             if vehicle is None:
@@ -164,15 +233,15 @@ class VehicleRequestTracker:
             if vehicle is None:
                 if not allow_if_not_posted:
                     logger.warning(f"PUT request denied: Vehicle {track_id} not found (POST first)")
-                    self._log_debug(f"PUT DENIED - Vehicle: {track_id} POST not found")
+                    self._log_debug("PUT", "DENIED", track_id)
                     return False, None
                 else:
                     # Create a new entry if allowed to bypass POST
                     logger.warning(f"Creating entry for PUT without POST: Vehicle {track_id}")
-                    self._log_debug(f"PUT WITHOUT POST - Creating entry for vehicle: {track_id}")
+                    self._log_debug("PUT", "WITHOUT_POST", track_id)
                     key = f"{petrol_pump_id}_{track_id}"
                     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-                    self._vehicles[key] = {
+                    vehicle = {
                         "track_id": track_id,
                         "petrol_pump_id": petrol_pump_id,
                         "posted": False,  # No POST has been completed
@@ -186,6 +255,8 @@ class VehicleRequestTracker:
                         "retry_count": 0,
                         "last_retry": None
                     }
+                    self._add(key, vehicle)
+                    self._expire()
                     # No server ID available
                     return True, None
             
@@ -208,11 +279,9 @@ class VehicleRequestTracker:
             
             # Update tracking data
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-            vehicle["put_attempted"] = True
-            vehicle["put_payload"] = payload
-            vehicle["put_timestamp"] = timestamp
+            self._update(key, put_attempted=True, put_payload=payload, put_timestamp=timestamp)
             
-            self._log_debug(f"PUT TRACKED - Vehicle: {track_id}, Server ID: {server_id}")
+            self._log_debug("PUT", "TRACKED", track_id, server_id)
             logger.info(f"PUT request tracked for vehicle {track_id} with server ID {server_id}")
             
             # Start retry thread if not running
@@ -238,16 +307,7 @@ class VehicleRequestTracker:
             
             # First check if this is a server ID
             if isinstance(track_id, str) and track_id.startswith("14") and "-" in track_id:  # Rough check for server ID format
-                if track_id in self._server_id_map:
-                    key = self._server_id_map[track_id]
-                else:
-                    # Search all vehicles for this server ID
-                    for vkey, vdata in self._vehicles.items():
-                        if vdata.get("server_vehicle_id") == track_id:
-                            key = vkey
-                            # Add to map for future use
-                            self._server_id_map[track_id] = key
-                            break
+                key = self._server_id_map.get(track_id)
             
             # If not found as server ID, try regular lookup
             if key is None:
@@ -255,19 +315,20 @@ class VehicleRequestTracker:
             
             if key not in self._vehicles:
                 logger.warning(f"Cannot update PUT status: Vehicle {track_id} not found")
-                self._log_debug(f"UPDATE PUT FAILED - Vehicle: {track_id} not found")
+                self._log_debug("PUT", "NOT_FOUND", track_id)
                 return False
             
             # Update tracking data
             if success:
-                self._vehicles[key]["put_completed"] = True
-                self._vehicles[key]["retry_count"] = 0
-                self._log_debug(f"PUT SUCCESS - Vehicle: {track_id}")
+                self._update(key, put_completed=True, retry_count=0)
+                self._log_debug("PUT", "SUCCESS", self._vehicles[key]["track_id"], self._vehicles[key]["server_vehicle_id"])
                 logger.info(f"PUT request completed for vehicle {track_id}")
+                self._expire()
             else:
-                self._vehicles[key]["retry_count"] += 1
-                self._vehicles[key]["last_retry"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-                self._log_debug(f"PUT FAILED - Vehicle: {track_id}, Retry count: {self._vehicles[key]['retry_count']}")
+                self._update(key, retry_count=self._vehicles[key]["retry_count"] + 1,
+                             last_retry=datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"))
+                self._log_debug("PUT", "FAILED", self._vehicles[key]["track_id"], self._vehicles[key]["server_vehicle_id"],
+                                self._vehicles[key]["retry_count"])
                 logger.warning(f"PUT request failed for vehicle {track_id} (retry: {self._vehicles[key]['retry_count']})")
             
             return True
@@ -284,7 +345,7 @@ class VehicleRequestTracker:
             
             for key, vehicle in self._vehicles.items():
                 # Check for pending POST requests
-                if not vehicle["posted"] and vehicle["retry_count"] < 5:
+                if not vehicle["posted"] and vehicle["retry_count"] < Config.MAX_RETRIES:
                     pending.append({
                         "type": "POST",
                         "track_id": vehicle["track_id"],
@@ -294,7 +355,7 @@ class VehicleRequestTracker:
                     })
                 
                 # Check for pending PUT requests
-                if vehicle["posted"] and vehicle["put_attempted"] and not vehicle["put_completed"] and vehicle["retry_count"] < 5:
+                if vehicle["posted"] and vehicle["put_attempted"] and not vehicle["put_completed"] and vehicle["retry_count"] < Config.MAX_RETRIES:
                     pending.append({
                         "type": "PUT",
                         "track_id": vehicle["track_id"],
@@ -322,13 +383,17 @@ class VehicleRequestTracker:
                 # Sleep to avoid CPU hogging
                 time.sleep(5)
                 
+                # Retire old vehicles even while no new requests arrive
+                with self._lock:
+                    self._expire()
+                
                 # This method just signals that retries are needed
                 # Actual retry logic should be implemented by the caller
                 pending = self.get_pending_requests()
                 
                 if pending:
                     logger.info(f"Retry thread found {len(pending)} pending requests")
-                    self._log_debug(f"RETRY THREAD - Found {len(pending)} pending requests")
+                    self._log_debug("RETRY", "PENDING", detail=len(pending))
                     # Signal that retries are needed through an event or callback
                     # Actual retry logic is in the API client
             except Exception as e:
@@ -342,19 +407,51 @@ class VehicleRequestTracker:
         if self._retry_thread and self._retry_thread.is_alive():
             self._retry_thread.join(timeout=1.0)
     
-    def _log_debug(self, message):
-        """Add a debug log entry with timestamp."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-        self._debug_log.append(f"[{timestamp}] {message}")
-        
-        # Keep log at reasonable size
-        if len(self._debug_log) > 1000:
-            self._debug_log = self._debug_log[-1000:]
+    def _log_debug(self, event_type, outcome, track_id=None, server_id=None, detail=None):
+        """
+        Add a record to the debug log ring, dropping the oldest once it is full.
+        Appending to a bounded deque is atomic, so this works with or without the lock held.
+        """
+        self._debug_log.append(DebugRecord(time.time(), event_type, track_id, server_id, outcome, detail))
     
     def get_debug_logs(self):
-        """Get the debug logs."""
-        with self._lock:
-            return self._debug_log.copy()
+        """Get the debug logs as formatted lines, oldest first."""
+        return [format_debug_record(record) for record in list(self._debug_log)]
+    
+    def query_debug_logs(self, event_types=None, outcomes=None, vehicle_id=None, since=None, until=None, limit=None):
+        """
+        Get debug records matching all given filters, oldest first.
+        
+        Args:
+            event_types: Event types to include, e.g. {"POST", "PUT"} (optional)
+            outcomes: Outcomes to include, e.g. {"FAILED", "DENIED"} (optional)
+            vehicle_id: Track ID or server ID of a vehicle (optional)
+            since: Earliest Unix time to include (optional)
+            until: Latest Unix time to include (optional)
+            limit: Return only the most recent matching records (optional)
+            
+        Returns:
+            list: DebugRecord tuples
+        """
+        vehicle_id = str(vehicle_id) if vehicle_id is not None else None
+        matches = []
+        # Records are in time order, so walk back from the newest and stop at `since` or `limit`
+        for record in reversed(list(self._debug_log)):
+            if since is not None and record.timestamp < since:
+                break
+            if until is not None and record.timestamp > until:
+                continue
+            if event_types and record.event_type not in event_types:
+                continue
+            if outcomes and record.outcome not in outcomes:
+                continue
+            if vehicle_id is not None and vehicle_id != str(record.track_id) and vehicle_id != record.server_id:
+                continue
+            matches.append(record)
+            if limit is not None and len(matches) >= limit:
+                break
+        matches.reverse()
+        return matches
     
     def get_vehicle_status(self, track_id=None, server_id=None):
         """
@@ -365,63 +462,222 @@ class VehicleRequestTracker:
             server_id: Server-assigned ID (optional)
             
         Returns:
-            dict or list: Vehicle status data
+            Mapping or tuple: Read-only copy of the vehicle's record (None if not found), or for
+            all vehicles a shared read-only snapshot of every record
         """
+        if not track_id and not server_id:
+            return self._vehicle_snapshot()
+        
         with self._lock:
             if track_id:
-                # Search by track ID
-                for key, vehicle in self._vehicles.items():
-                    if str(vehicle["track_id"]) == str(track_id):
-                        return vehicle
-                return None
-            
-            elif server_id:
-                # Search by server ID
-                for key, vehicle in self._vehicles.items():
-                    if vehicle["server_vehicle_id"] == server_id:
-                        return vehicle
-                return None
-            
+                # Look up by track ID; the most recent vehicle wins if several pumps use the same ID
+                keys = self._track_index.get(str(track_id))
+                key = next(reversed(keys)) if keys else None
             else:
-                # Return all vehicles
-                return list(self._vehicles.values())
+                # Look up by server ID
+                key = self._server_id_map.get(server_id)
+            return _frozen(self._vehicles[key]) if key is not None else None
+    
+    def _vehicle_snapshot(self):
+        """
+        Get read-only copies of all vehicle records as of one version.
+        
+        Reading the current snapshot takes no lock. After a change, the first reader
+        rebuilds it under the lock and later readers share the new one.
+        """
+        snapshot = self._snapshot
+        if snapshot[0] == self._version:
+            return snapshot[1]
+        
+        with self._lock:
+            if self._snapshot[0] != self._version:
+                records = tuple(_frozen(vehicle) for vehicle in self._vehicles.values())
+                self._snapshot = (self._version, records)
+            return self._snapshot[1]
     
     def get_stats(self):
         """
         Get statistics about the tracked requests.
         
         Returns:
-            dict: Statistics
+            dict: Statistics. Vehicles given up on before their exit completed count in
+                  expired_vehicles, not in posts_pending or puts_pending.
         """
         with self._lock:
-            total = len(self._vehicles)
-            posted = sum(1 for v in self._vehicles.values() if v["posted"])
-            put_attempted = sum(1 for v in self._vehicles.values() if v["put_attempted"])
-            put_completed = sum(1 for v in self._vehicles.values() if v["put_completed"])
-            pending_posts = sum(1 for v in self._vehicles.values() if not v["posted"])
-            pending_puts = sum(1 for v in self._vehicles.values() if v["put_attempted"] and not v["put_completed"])
-            
+            tracked = self._counts["total"]
+            archived = len(self._archive)
+            # Totals cover every vehicle seen, including those retired from full tracking
+            counts = {name: count + self._retired_counts[name] for name, count in self._counts.items()}
+        
+        return {
+            "total_vehicles": counts["total"],
+            "tracked_vehicles": tracked,
+            "archived_vehicles": archived,
+            "posts_completed": counts["posted"],
+            "posts_pending": counts["total"] - counts["posted"] - counts["expired_unposted"],
+            "puts_attempted": counts["put_attempted"],
+            "puts_completed": counts["put_completed"],
+            "puts_pending": counts["put_pending"],
+            "expired_vehicles": counts["expired"],
+            "success_rate": (counts["put_completed"] / counts["put_attempted"]) * 100 if counts["put_attempted"] > 0 else 0
+        }
+    
+    def get_memory_usage(self):
+        """
+        Estimate the memory held by the tracker. Walks every record, so call it for reporting only.
+        
+        Returns:
+            dict: Record counts and approximate bytes of the vehicle records, indexes and archive
+        """
+        with self._lock:
+            seen = set()
+            vehicles_bytes = _deep_size(self._vehicles, seen)
+            index_bytes = sum(_deep_size(index, seen) for index in
+                              (self._server_id_map, self._track_index, self._active, self._completed))
+            archive_bytes = _deep_size(self._archive, seen)
             return {
-                "total_vehicles": total,
-                "posts_completed": posted,
-                "posts_pending": pending_posts,
-                "puts_attempted": put_attempted,
-                "puts_completed": put_completed,
-                "puts_pending": pending_puts,
-                "success_rate": (put_completed / put_attempted) * 100 if put_attempted > 0 else 0
+                "tracked_vehicles": len(self._vehicles),
+                "archived_vehicles": len(self._archive),
+                "vehicles_bytes": vehicles_bytes,
+                "index_bytes": index_bytes,
+                "archive_bytes": archive_bytes,
+                "total_bytes": vehicles_bytes + index_bytes + archive_bytes
             }
     
+    def get_archived_vehicles(self, limit=None):
+        """Get compact records of retired vehicles as dicts, most recent first."""
+        with self._lock:
+            records = list(self._archive.values())
+        records.reverse()
+        return [record._asdict() for record in records[:limit]]
+    
+    def _add(self, key, vehicle):
+        """Start tracking a vehicle record. Called with the lock held."""
+        self._vehicles[key] = vehicle
+        self._version += 1
+        self._index(key, vehicle)
+        self._count(vehicle, 1)
+        if vehicle["put_completed"]:
+            self._completed[key] = time.monotonic()
+        else:
+            self._active[key] = time.monotonic()
+    
+    def _remove(self, key):
+        """Stop tracking a vehicle record and return it. Called with the lock held."""
+        self._unindex(key)
+        vehicle = self._vehicles.pop(key)
+        self._version += 1
+        self._count(vehicle, -1)
+        self._active.pop(key, None)
+        self._completed.pop(key, None)
+        return vehicle
+    
+    def _retire(self, key, outcome):
+        """Replace a vehicle's full record with a compact archive record. Called with the lock held."""
+        vehicle = self._remove(key)
+        self._count(vehicle, 1, self._retired_counts)
+        if outcome == "expired":
+            # Nothing is pending for a vehicle given up on; count it as expired instead
+            self._retired_counts["expired"] += 1
+            if vehicle["put_attempted"]:
+                self._retired_counts["put_pending"] -= 1
+            if not vehicle["posted"]:
+                self._retired_counts["expired_unposted"] += 1
+        if Config.REQUEST_TRACKER_ARCHIVE_SIZE > 0:
+            self._archive.pop(key, None)
+            self._archive[key] = ArchivedVehicle(
+                vehicle["track_id"], sys.intern(str(vehicle["petrol_pump_id"])), vehicle["server_vehicle_id"],
+                _epoch(vehicle["post_timestamp"]), _epoch(vehicle["put_timestamp"]), outcome
+            )
+            while len(self._archive) > Config.REQUEST_TRACKER_ARCHIVE_SIZE:
+                self._archive.popitem(last=False)
+    
+    def _expire(self):
+        """Retire vehicles past the retention limits, oldest first. Called with the lock held."""
+        now = time.monotonic()
+        retired = 0
+        
+        while self._completed:
+            key, completed_at = next(iter(self._completed.items()))
+            if (len(self._completed) <= Config.REQUEST_TRACKER_MAX_COMPLETED and
+                    now - completed_at < Config.REQUEST_TRACKER_COMPLETED_AGE):
+                break
+            self._retire(key, "completed")
+            retired += 1
+        
+        while self._active:
+            key, tracked_at = next(iter(self._active.items()))
+            if now - tracked_at < Config.REQUEST_TRACKER_MAX_ACTIVE_AGE:
+                break
+            logger.warning(f"Giving up on vehicle {self._vehicles[key]['track_id']}: exit not completed "
+                           f"after {Config.REQUEST_TRACKER_MAX_ACTIVE_AGE}s")
+            self._retire(key, "expired")
+            retired += 1
+        
+        if retired:
+            logger.debug(f"Retired {retired} vehicles, {len(self._vehicles)} still tracked")
+    
+    def _count(self, vehicle, sign, counts=None):
+        """Add (sign=1) or remove (sign=-1) a vehicle record's contribution to the stats counters."""
+        if counts is None:
+            counts = self._counts
+        counts["total"] += sign
+        if vehicle["posted"]:
+            counts["posted"] += sign
+        if vehicle["put_attempted"]:
+            counts["put_attempted"] += sign
+            counts["put_completed" if vehicle["put_completed"] else "put_pending"] += sign
+        elif vehicle["put_completed"]:
+            counts["put_completed"] += sign
+    
+    def _update(self, key, **fields):
+        """Set status fields of a vehicle record and adjust the counters. Called with the lock held."""
+        vehicle = self._vehicles[key]
+        was_completed = vehicle["put_completed"]
+        self._count(vehicle, -1)
+        vehicle.update(fields)
+        self._version += 1
+        self._count(vehicle, 1)
+        if vehicle["put_completed"] and not was_completed:
+            self._active.pop(key, None)
+            self._completed[key] = time.monotonic()
+    
+    def _index(self, key, vehicle):
+        """Add a vehicle record to the track ID and server ID indexes. Called with the lock held."""
+        self._track_index.setdefault(str(vehicle["track_id"]), {})[key] = None
+        if vehicle["server_vehicle_id"]:
+            self._server_id_map[vehicle["server_vehicle_id"]] = key
+    
+    def _unindex(self, key):
+        """Remove a vehicle record from the indexes. Called with the lock held."""
+        vehicle = self._vehicles[key]
+        track_key = str(vehicle["track_id"])
+        keys = self._track_index.get(track_key)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._track_index[track_key]
+        server_id = vehicle["server_vehicle_id"]
+        if server_id and self._server_id_map.get(server_id) == key:
+            del self._server_id_map[server_id]
+    
+    def _set_server_id(self, key, server_id):
+        """Assign a vehicle's server ID and keep the server ID map in step. Called with the lock held."""
+        vehicle = self._vehicles[key]
+        old_server_id = vehicle["server_vehicle_id"]
+        if old_server_id and old_server_id != server_id and self._server_id_map.get(old_server_id) == key:
+            del self._server_id_map[old_server_id]
+        vehicle["server_vehicle_id"] = server_id
+        self._version += 1
+        self._server_id_map[server_id] = key
+    
     def refresh_server_id_map(self):
-        """Rebuild the server ID map to ensure it's up-to-date."""
+        """Rebuild the track ID and server ID indexes from the tracked vehicles."""
         with self._lock:
-            # Clear the existing map
             self._server_id_map.clear()
-            
-            # Rebuild it from all tracked vehicles
+            self._track_index.clear()
             for key, vehicle in self._vehicles.items():
-                server_id = vehicle.get("server_vehicle_id")
-                if server_id:
-                    self._server_id_map[server_id] = key
+                self._index(key, vehicle)
             
             logger.info(f"Refreshed server ID map with {len(self._server_id_map)} entries")
 
@@ -0,0 +1,213 @@
+import cv2
+import numpy as np
+import threading
+import queue
+import logging
+import os
+import re
+from datetime import datetime
+from config import Config
+
+logger = logging.getLogger('camera')
+
+
+def map_points(points, from_size, to_size):
+    """
+    Map polygon or box coordinates between two resolutions of the same view.
+
+    Args:
+        points: Array-like of (x, y) points
+        from_size (tuple): (width, height) the points are expressed in
+        to_size (tuple): (width, height) to map the points to
+
+    Returns:
+        np.ndarray: Mapped points as integers, shaped (-1, 2)
+    """
+    scale = np.array([to_size[0] / from_size[0], to_size[1] / from_size[1]])
+    return np.round(np.asarray(points, dtype=float).reshape(-1, 2) * scale).astype(int)
+
+
+class CameraSource:
+    """
+    Camera definition with a low-resolution detection stream and an optional
+    high-resolution evidence stream (e.g. an IP camera's substream and main stream).
+    Detection runs on the detection stream only; frames of the evidence stream are
+    only converted and written when a snapshot or clip of an entry or exit is needed.
+    """
+    def __init__(self, detection_url, evidence_url=None, camera_id=None):
+        self.detection_url = detection_url
+        self.evidence_url = evidence_url or None
+        self.camera_id = camera_id or self._default_id(detection_url)
+
+    @staticmethod
+    def _default_id(url):
+        """Derive a readable camera ID from a stream URL or file path, dropping credentials."""
+        url = re.sub(r'//[^@/]*@', '//', url)
+        return re.sub(r'[^A-Za-z0-9._-]+', '_', url).strip('_')[-64:]
+
+    @property
+    def has_evidence_stream(self):
+        return self.evidence_url is not None
+
+    def __repr__(self):
+        return f"CameraSource({self.camera_id}, evidence={'yes' if self.evidence_url else 'no'})"
+
+
+class EvidenceRecorder:
+    """
+    Capture snapshots (and optional clips) of entries and exits from a camera's
+    evidence stream.
+
+    One background thread keeps the evidence stream connected and calls grab() on
+    every frame, which keeps the stream position current without converting or
+    copying frames. Only when an entry or exit is queued is the latest grabbed frame
+    retrieved, annotated and written. With OpenCV's FFmpeg backend grab() still
+    decodes each compressed frame, since inter-coded frames depend on the ones before
+    them; the colour conversion, copy and JPEG encoding happen per event only.
+
+    A snapshot lags the event by the detection pipeline (the frame is processed
+    before the event is queued), at most one evidence frame interval until the next
+    grab() returns, and the evidence stream's own RTSP and decoder buffering, which
+    may differ from the detection stream's; together typically a few hundred
+    milliseconds. Events that cannot be captured within Config.EVIDENCE_MAX_DELAY
+    seconds, e.g. while the stream reconnects, are logged as lost.
+    """
+    def __init__(self, camera, output_dir=None, clip_seconds=None):
+        self.camera = camera
+        self.output_dir = output_dir or Config.EVIDENCE_DIR
+        self.clip_seconds = Config.EVIDENCE_CLIP_SECONDS if clip_seconds is None else clip_seconds
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def request(self, track_id, event, detection_size, box=None, roi_points=None):
+        """
+        Queue an evidence capture.
+
+        Args:
+            track_id: Local tracking ID of the vehicle
+            event (str): "entry" or "exit"
+            detection_size (tuple): (width, height) of the detection stream
+            box (tuple): Optional (x1, y1, x2, y2) in detection coordinates
+            roi_points: Optional ROI polygon in detection coordinates
+        """
+        self._queue.put({
+            "track_id": track_id,
+            "event": event,
+            "detection_size": detection_size,
+            "box": box,
+            "roi_points": roi_points,
+            "time": datetime.now()
+        })
+
+    def _run(self):
+        cap = None
+        jobs = []
+        delay = Config.RTSP_RECONNECT_DELAY
+        try:
+            while not self._stop_event.is_set():
+                if cap is None:
+                    cap = cv2.VideoCapture(self.camera.evidence_url)
+                    if not cap.isOpened():
+                        logger.error(f"Could not open evidence stream for camera {self.camera.camera_id}, "
+                                     f"retrying in {delay}s")
+                        cap.release()
+                        cap = None
+                        jobs = self._drop_stale(jobs + self._take_jobs())
+                        self._stop_event.wait(delay)
+                        delay = min(delay * 2, Config.RTSP_RECONNECT_MAX_DELAY)
+                        continue
+                    delay = Config.RTSP_RECONNECT_DELAY
+
+                # Advance to the newest frame without converting it
+                if not cap.grab():
+                    logger.warning(f"Lost evidence stream for camera {self.camera.camera_id}, reconnecting")
+                    cap.release()
+                    cap = None
+                    continue
+
+                jobs += self._take_jobs()
+                if jobs:
+                    jobs = self._serve(cap, jobs)
+        finally:
+            if cap is not None:
+                cap.release()
+
+    def _take_jobs(self):
+        """Every capture request queued so far."""
+        jobs = []
+        while True:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                return jobs
+
+    def _drop_stale(self, jobs):
+        """Keep the jobs that may still be captured; log the others as lost."""
+        now = datetime.now()
+        kept = []
+        for job in jobs:
+            if (now - job["time"]).total_seconds() <= Config.EVIDENCE_MAX_DELAY:
+                kept.append(job)
+            else:
+                logger.error(f"Lost {job['event']} evidence for vehicle {job['track_id']}: "
+                             f"no evidence frame within {Config.EVIDENCE_MAX_DELAY}s")
+        return kept
+
+    def _serve(self, cap, jobs):
+        """Capture the jobs from the last grabbed frame. Returns the jobs still waiting for a frame."""
+        ret, frame = cap.retrieve()
+        if not ret:
+            return self._drop_stale(jobs)
+        for job in jobs:
+            try:
+                self._capture(cap, frame, job)
+            except Exception as e:
+                logger.error(f"Error capturing evidence for vehicle {job['track_id']}: {str(e)}")
+        return []
+
+    def _capture(self, cap, frame, job):
+        evidence_size = (frame.shape[1], frame.shape[0])
+        annotated = frame.copy()
+        if job["roi_points"] is not None and len(job["roi_points"]) > 2:
+            roi = map_points(job["roi_points"], job["detection_size"], evidence_size)
+            cv2.polylines(annotated, [roi.reshape((-1, 1, 2))], True, (0, 255, 0), 2)
+        if job["box"] is not None:
+            (x1, y1), (x2, y2) = map_points(job["box"], job["detection_size"], evidence_size)
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 0, 255), 3)
+
+        stamp = job["time"].strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"{self.camera.camera_id}_{job['track_id']}_{job['event']}_{stamp}")
+        if not cv2.imwrite(f"{base}.jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, Config.EVIDENCE_JPEG_QUALITY]):
+            logger.error(f"Could not write {job['event']} evidence for vehicle {job['track_id']} to {base}.jpg")
+            return
+        logger.info(f"Saved {job['event']} evidence for vehicle {job['track_id']}: {base}.jpg")
+
+        if self.clip_seconds > 0:
+            self._record_clip(cap, frame, f"{base}.mp4")
+
+    def _record_clip(self, cap, first_frame, path):
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        height, width = first_frame.shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        try:
+            writer.write(first_frame)
+            for _ in range(int(fps * self.clip_seconds) - 1):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+        finally:
+            writer.release()
@@ -0,0 +1,128 @@
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger('circuit_breaker')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to one backend.
+
+    Closed: requests go through and consecutive failures are counted.
+    Open: after failure_threshold consecutive failures, requests are rejected
+    immediately so callers can buffer locally instead of waiting on timeouts.
+    Half-open: once reset_timeout has passed, a single probe request is let
+    through; its success closes the circuit and its failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, history=50):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._last_error = None
+        self._rejected = 0
+        self._transitions = deque(maxlen=history)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow_request(self):
+        """
+        Check whether a request may be sent now. A True result in the half-open
+        state claims the single probe slot, so the caller must report the outcome.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN, "reset timeout elapsed")
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def retry_in(self):
+        """Seconds until a request would be allowed (0 when closed or a probe may be sent)."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            if self._state == self.HALF_OPEN:
+                # The probe in flight will settle the state within a request timeout
+                return 1.0 if self._probe_in_flight else 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED, "request succeeded")
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._open(f"probe failed: {self._last_error}")
+            elif self._state == self.CLOSED and self._failures >= self.failure_threshold:
+                self._open(f"{self._failures} consecutive failures, last: {self._last_error}")
+
+    def release_probe(self):
+        """Give back the half-open probe slot of a request that ended without an outcome, e.g. was cancelled."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, reason):
+        self._opened_at = time.monotonic()
+        self._transition(self.OPEN, reason)
+
+    def _transition(self, state, reason):
+        """Change state and record it. Called with the lock held."""
+        logger.warning(f"Circuit {self.name}: {self._state} -> {state} ({reason})")
+        self._transitions.append({
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "from": self._state,
+            "to": state,
+            "reason": reason
+        })
+        self._state = state
+
+    def snapshot(self):
+        """
+        Get the breaker state for display.
+
+        Returns:
+            dict: state, consecutive failures, last error, rejected count, seconds
+                  until the next probe and recent transitions (oldest first)
+        """
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "last_error": self._last_error,
+                "rejected": self._rejected,
+                "retry_in": round(retry_in, 1),
+                "transitions": list(self._transitions)
+            }
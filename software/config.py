@@ -25,10 +25,39 @@ class Config:
     
     # RTSP specific settings
     RTSP_RECONNECT_ATTEMPTS = 5  # Number of reconnection attempts for RTSP streams
-    RTSP_RECONNECT_DELAY = 3     # Delay between reconnection attempts in seconds
+    RTSP_RECONNECT_DELAY = 3     # Initial delay between reconnection attempts in seconds (doubles each attempt)
+    RTSP_RECONNECT_MAX_DELAY = 30 # Upper bound on the backoff delay in seconds
     RTSP_CONNECTION_TIMEOUT = 10 # Timeout for RTSP connection in seconds
     RTSP_MAX_RETRIES = 3         # Maximum number of retries for RTSP read operations
     
+    # Decoder settings
+    DECODER_BACKEND = "opencv"   # "opencv" decodes in the processing thread, "pyav" in a separate process
+    DECODER_THREADS = 2          # FFmpeg decoder threads for the PyAV backend (0 lets FFmpeg decide)
+    DECODE_RESIZE = None         # Optional (width, height) to scale frames to at decode time
+    DECODER_RING_SLOTS = 4       # Shared-memory frame slots between the decoder process and the detector
+    
+    # Frame rings shared with UI consumers
+    FRAME_RING_SLOTS = 4         # Frames kept per ring; views stay valid until the writer wraps around
+    
+    # Encode-once JPEG previews
+    PREVIEW_FPS = 5              # Maximum preview frames encoded per second per camera
+    PREVIEW_JPEG_QUALITY = 70    # JPEG quality of preview frames
+    PREVIEW_MAX_WIDTH = 960      # Previews wider than this are downscaled
+    PREVIEW_SERVER_ENABLED = True # Serve previews as MJPEG over HTTP
+    PREVIEW_HOST = "127.0.0.1"   # Preview server bind address
+    PREVIEW_PORT = 8090          # Preview server port, streams at /<camera_id>/<original|processed>.mjpg
+    
+    # Client-side API metrics in the Prometheus text format
+    METRICS_SERVER_ENABLED = True # Serve metrics over HTTP
+    METRICS_HOST = "127.0.0.1"   # Metrics server bind address
+    METRICS_PORT = 9108          # Metrics server port, scraped at /metrics
+    
+    # Evidence capture from a camera's high-resolution stream
+    EVIDENCE_DIR = "evidence"    # Directory for entry/exit snapshots and clips
+    EVIDENCE_JPEG_QUALITY = 90   # JPEG quality for evidence snapshots
+    EVIDENCE_CLIP_SECONDS = 0    # Length of an evidence clip per event (0 = snapshot only)
+    EVIDENCE_MAX_DELAY = 5       # Seconds an event waits for an evidence frame before it is logged as lost
+    
     # Sample RTSP URL templates (for testing)
     RTSP_URL_SAMPLES = [
         "rtsp://username:password@ip_address:port/path",
@@ -58,4 +87,42 @@ class Config:
     
     # Error recovery
     MAX_RETRIES = 5           # Maximum number of retries for API operations
-    RETRY_DELAY = 5           # Delay between retries in seconds
\ No newline at end of file
+    RETRY_DELAY = 5           # Delay between retries in seconds
+    RETRY_BASE_DELAY = 2      # Delay before the first scheduled retry in seconds, doubled per attempt
+    RETRY_MAX_DELAY = 300     # Upper bound on the delay between scheduled retries
+    MAX_CONCURRENT_RETRIES = 5 # Retries in flight at once, so a backlog does not flood the server
+    
+    # HTTP client for the backend API
+    API_REQUEST_TIMEOUT = 10           # Total timeout per request in seconds
+    API_MAX_CONNECTIONS_PER_HOST = 20  # Keep-alive connections kept open to the backend
+    API_KEEPALIVE_TIMEOUT = 60         # Seconds an idle connection stays in the pool
+    API_ENTRY_WAIT_TIMEOUT = 10        # Longest an exit waits for its vehicle's entry POST
+    
+    # Circuit breaker around every call to the backend
+    CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures (errors, timeouts, 5xx) that open the circuit
+    CIRCUIT_RESET_TIMEOUT = 30     # Seconds the circuit stays open before a single probe request
+    
+    # Batch exit updates (stale vehicles, manual batches)
+    BATCH_PUT_CONCURRENCY = 10     # PUTs in flight at once per batch
+    BATCH_PUT_DEADLINE = 30        # Upper bound in seconds on a whole batch, regardless of its size
+    
+    # Vehicle detail cache for dashboards
+    DETAILS_CACHE_TTL = 10         # Seconds cached records are served without asking the server
+    DETAILS_FULL_REFRESH = 600     # Seconds between full downloads; refreshes in between are incremental
+    DETAILS_PAGE_SIZE = 1000       # Records per page when downloading
+    DETAILS_OPEN_WINDOW = 600      # Seconds before the latest entry that unexited records are re-fetched; older ones wait for a full download
+    
+    # Durable outbox for entry/exit events
+    OUTBOX_PATH = "data/outbox.db"  # SQLite file holding events until the server accepts them
+    OUTBOX_BATCH_SIZE = 50          # Events delivered per drain batch (one bulk request, or concurrent single requests)
+    BULK_UPLOAD_ENABLED = True      # Send each drain batch as one bulk request when the server supports it
+    BULK_WINDOW = 0.5               # Seconds to let a partial batch fill up before sending it
+    BULK_ENCODING = "json"          # "json", or "msgpack" (needs the msgpack package)
+    BULK_COMPRESSION = None         # None, "gzip", or "zstd" (needs the zstandard package)
+    
+    # Request tracker retention
+    REQUEST_TRACKER_MAX_COMPLETED = 5000    # Completed vehicles kept with their full record
+    REQUEST_TRACKER_COMPLETED_AGE = 3600    # Seconds a completed vehicle keeps its full record
+    REQUEST_TRACKER_MAX_ACTIVE_AGE = 86400  # Seconds before a vehicle whose exit never completed is given up on
+    REQUEST_TRACKER_ARCHIVE_SIZE = 20000    # Compact records of retired vehicles kept (0 disables the archive)
+    REQUEST_TRACKER_DEBUG_LOG_SIZE = 1000   # Debug records kept in the tracker's ring buffer
\ No newline at end of file
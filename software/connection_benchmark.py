@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import time
+import aiohttp
+import api_client
+from mock_backend import MockBackend, FaultConfig, start_in_thread
+
+logger = logging.getLogger('connection_benchmark')
+
+
+def _post_with_new_session(url, payload):
+    """Send one entry the way the client did before the shared loop: own event loop, session and connection."""
+    async def post():
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=payload) as response:
+                return await response.json()
+    return asyncio.run(post())
+
+
+def run_pooled(count):
+    futures = [api_client.post_vehicle_entry("BENCH-1", vehicle_id=f"pooled-{i}", retry_on_failure=False)
+               for i in range(count)]
+    concurrent.futures.wait(futures)
+
+
+def run_per_request(count, base_url, workers=10):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_post_with_new_session, f"{base_url}/PetrolPumps/details/", {
+            "petrolPumpID": "BENCH-1", "VehicleID": f"single-{i}", "EnteringTime": "10:00:00",
+            "Date": "2026-01-01", "VehicleType": "Car"
+        }) for i in range(count)]
+        concurrent.futures.wait(futures)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare a burst of entry POSTs through api_client's pooled session with one "
+                    "session and event loop per request, against the mock backend"
+    )
+    parser.add_argument("--count", type=int, default=100, help="Entries per burst")
+    parser.add_argument("--latency", type=float, default=0.005, help="Backend latency in seconds")
+    parser.add_argument("--port", type=int, default=8801, help="Port for the mock backend")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for label, run in (("per-request", lambda base_url: run_per_request(args.count, base_url)),
+                       ("pooled", lambda base_url: run_pooled(args.count))):
+        backend = MockBackend(FaultConfig(latency=args.latency))
+        base_url = start_in_thread(backend, port=args.port)
+        args.port += 1
+        api_client.set_base_url(base_url)
+
+        started = time.perf_counter()
+        run(base_url)
+        elapsed = time.perf_counter() - started
+        stats = backend.stats()
+        print(f"{label:>12}: {stats['entries']} entries in {elapsed * 1000:.0f} ms "
+              f"({elapsed * 1000 / args.count:.1f} ms each), {stats['connections']} TCP connections")
+    api_client.close_session()
+
+
+if __name__ == "__main__":
+    main()
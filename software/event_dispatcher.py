@@ -0,0 +1,298 @@
+import queue
+import threading
+import concurrent.futures
+import logging
+import time
+from config import Config
+from outbox import EventOutbox
+from api_client import (post_vehicle_entry, update_vehicle_exit, post_events_bulk,
+                        bulk_upload_supported, get_vehicle_status, make_idempotency_key, breaker)
+from circuit_breaker import CircuitOpenError
+from api_metrics import metrics
+
+logger = logging.getLogger('event_dispatcher')
+
+
+class EventDispatcher:
+    """
+    Deliver vehicle entry and exit events to the backend off the frame loop.
+
+    The frame loop only enqueues an event and continues. A writer thread commits
+    queued events to the durable outbox in batches, and a drainer thread delivers
+    them to the server in order, deleting each one only after the server accepted
+    it. When bulk upload is enabled, events arriving within a short window are
+    coalesced and sent as one request. While the backend circuit is open, events
+    stay buffered in the outbox and only a probe is sent. The result is passed to
+    the event's callback once the request finishes; callbacks run on the API
+    client's loop thread and should only update in-memory state.
+    """
+    def __init__(self, outbox=None):
+        self._queue = queue.Queue()
+        self._outbox = outbox
+        self._callbacks = {}  # Outbox ID -> callback, for events dispatched in this run
+        self._wakeup = threading.Event()
+        self._writer_thread = None
+        self._drain_thread = None
+        self._running = False
+
+    def start(self):
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            if self._outbox is None:
+                self._outbox = EventOutbox()
+            self._running = True
+            self._writer_thread = threading.Thread(target=self._write_events, name="event-writer", daemon=True)
+            self._drain_thread = threading.Thread(target=self._drain_outbox, name="event-drainer", daemon=True)
+            self._writer_thread.start()
+            self._drain_thread.start()
+            metrics.register_gauge("event_dispatcher_backlog", "Events queued or waiting in the outbox",
+                                   self.pending)
+            logger.info("Started event dispatcher")
+
+    def stop(self):
+        """Stop after persisting the events already queued; undelivered events stay in the outbox."""
+        self._running = False
+        self._queue.put(None)
+        self._wakeup.set()
+        for thread in (self._writer_thread, self._drain_thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=1.0)
+
+    def pending(self):
+        """Number of events not yet delivered (queued in memory or waiting in the outbox)."""
+        outbox_pending = self._outbox.count() if self._outbox else 0
+        return self._queue.qsize() + outbox_pending
+
+    def dispatch_entry(self, petrol_pump_id, track_id, entering_time, date, vehicle_type, camera_id=None,
+                       callback=None):
+        """
+        Queue a vehicle entry.
+
+        Args:
+            camera_id (str): Camera that saw the vehicle, part of the entry's idempotency key
+            callback (callable): Called with the server response dict, or None on failure
+
+        Returns:
+            str: Idempotency key of the entry, to pass to dispatch_exit
+        """
+        idempotency_key = make_idempotency_key(camera_id, track_id, date, entering_time)
+        self._queue.put(({
+            "type": "entry",
+            "petrol_pump_id": petrol_pump_id,
+            "track_id": track_id,
+            "entry_time": entering_time,
+            "payload": {
+                "entering_time": entering_time,
+                "date": date,
+                "vehicle_type": vehicle_type,
+                "idempotency_key": idempotency_key
+            }
+        }, callback))
+        return idempotency_key
+
+    def dispatch_exit(self, petrol_pump_id, track_id, exit_time, filling_time, entry_time,
+                      server_id=None, idempotency_key=None, callback=None):
+        """
+        Queue a vehicle exit. The server ID is looked up in the request tracker if not given.
+
+        Args:
+            idempotency_key (str): Key returned by dispatch_entry for this vehicle
+            callback (callable): Called with True if the update succeeded, False otherwise
+        """
+        self._queue.put(({
+            "type": "exit",
+            "petrol_pump_id": petrol_pump_id,
+            "track_id": track_id,
+            "entry_time": entry_time,
+            "server_id": server_id,
+            "payload": {
+                "exit_time": exit_time,
+                "filling_time": filling_time,
+                "entry_time": entry_time,
+                "idempotency_key": idempotency_key
+            }
+        }, callback))
+
+    def _write_events(self):
+        """Commit queued events to the outbox, batching everything that queued up into one transaction."""
+        while self._running or not self._queue.empty():
+            item = self._queue.get()
+            items = [item] if item is not None else []
+            while True:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is not None:
+                    items.append(extra)
+            if not items:
+                continue
+
+            try:
+                ids = self._outbox.append_many([event for event, _ in items])
+                for outbox_id, (_, callback) in zip(ids, items):
+                    if callback is not None:
+                        self._callbacks[outbox_id] = callback
+                self._wakeup.set()
+            except Exception as e:
+                logger.error(f"Error writing {len(items)} events to the outbox: {str(e)}")
+
+    def _drain_outbox(self):
+        """Deliver outbox events in order, one batch at a time, backing off while deliveries fail."""
+        while self._running:
+            try:
+                batch = self._outbox.pending(Config.OUTBOX_BATCH_SIZE)
+                if not batch:
+                    self._wakeup.wait(timeout=1.0)
+                    self._wakeup.clear()
+                    continue
+
+                # While the backend circuit is open, keep events buffered in the outbox
+                retry_in = breaker.retry_in()
+                if retry_in > 0:
+                    self._wakeup.wait(timeout=retry_in)
+                    self._wakeup.clear()
+                    continue
+
+                # Give a partial batch a moment to fill up so it goes out as one request
+                if self._use_bulk() and len(batch) < Config.OUTBOX_BATCH_SIZE and Config.BULK_WINDOW > 0:
+                    time.sleep(Config.BULK_WINDOW)
+                    batch = self._outbox.pending(Config.OUTBOX_BATCH_SIZE)
+
+                # A half-open circuit allows a single probe, so send one request's worth
+                if breaker.state != breaker.CLOSED and not self._use_bulk():
+                    batch = batch[:1]
+
+                failures = 0
+                for event, result, error in self._deliver(batch):
+                    if not self._complete(event, result, error):
+                        failures += 1
+
+                # Leave failed events in the outbox and wait before draining again
+                if failures:
+                    logger.warning(f"{failures} of {len(batch)} outbox events failed, retrying in {Config.RETRY_DELAY}s")
+                    self._wakeup.wait(timeout=Config.RETRY_DELAY)
+                    self._wakeup.clear()
+            except Exception as e:
+                logger.error(f"Error draining outbox: {str(e)}")
+                self._wakeup.wait(timeout=Config.RETRY_DELAY)
+                self._wakeup.clear()
+
+    def _use_bulk(self):
+        return Config.BULK_UPLOAD_ENABLED and bulk_upload_supported()
+
+    def _deliver(self, batch):
+        """
+        Send a batch, in one bulk request if possible and otherwise as concurrent single requests.
+
+        Returns:
+            list: (event, result, error) for every event in the batch
+        """
+        if self._use_bulk():
+            try:
+                results = post_events_bulk([self._bulk_event(event) for event in batch]).result()
+                if results is not None:
+                    return [(event, result, None) for event, result in zip(batch, results)]
+                error = "bulk request failed"
+            except Exception as e:
+                error = e
+            # Without bulk support on the server, send this batch one event at a time instead
+            if bulk_upload_supported():
+                return [(event, None, error) for event in batch]
+
+        futures = [(event, self._send(event)) for event in batch]
+        concurrent.futures.wait([future for _, future in futures])
+        delivered = []
+        for event, future in futures:
+            try:
+                delivered.append((event, future.result(), None))
+            except Exception as e:
+                delivered.append((event, None, e))
+        return delivered
+
+    def _bulk_event(self, event):
+        payload = event["payload"]
+        if event["type"] == "entry":
+            return {
+                "type": "entry",
+                "petrol_pump_id": event["petrol_pump_id"],
+                "vehicle_id": event["track_id"],
+                "entering_time": payload["entering_time"],
+                "date": payload["date"],
+                "vehicle_type": payload["vehicle_type"],
+                "idempotency_key": payload.get("idempotency_key")
+            }
+        return {
+            "type": "exit",
+            "petrol_pump_id": event["petrol_pump_id"],
+            "vehicle_id": self._resolve_vehicle_id(event),
+            "exit_time": payload["exit_time"],
+            "filling_time": payload["filling_time"],
+            "idempotency_key": payload.get("idempotency_key")
+        }
+
+    def _send(self, event):
+        """Hand an outbox event to the API client; the outbox owns retries."""
+        payload = event["payload"]
+        if event["type"] == "entry":
+            return post_vehicle_entry(
+                petrol_pump_id=event["petrol_pump_id"],
+                vehicle_id=event["track_id"],
+                entering_time=payload["entering_time"],
+                date=payload["date"],
+                vehicle_type=payload["vehicle_type"],
+                retry_on_failure=False,
+                idempotency_key=payload.get("idempotency_key")
+            )
+        return update_vehicle_exit(
+            petrol_pump_id=event["petrol_pump_id"],
+            vehicle_id=self._resolve_vehicle_id(event),
+            exit_time=payload["exit_time"],
+            filling_time=payload["filling_time"],
+            entry_time=payload["entry_time"],
+            retry_on_failure=False,
+            idempotency_key=payload.get("idempotency_key")
+        )
+
+    def _complete(self, event, result, error=None):
+        """Acknowledge or record the failure of a delivered event and run its callback. Returns True on success."""
+        if event["type"] == "entry":
+            success = result is not None
+        else:
+            success = result is True
+
+        if isinstance(error, CircuitOpenError):
+            # Never sent, so it does not count as an attempt
+            return False
+
+        if success:
+            server_id = result.get("VehicleID") if event["type"] == "entry" else None
+            self._outbox.ack(event, server_id)
+        elif breaker.state != breaker.CLOSED:
+            # The backend is down rather than rejecting this event; keep it buffered without using up attempts
+            return False
+        else:
+            gave_up = self._outbox.record_failure(event, error or "request failed", Config.MAX_RETRIES)
+            if not gave_up:
+                return False
+            logger.error(f"Giving up on {event['type']} for vehicle {event['track_id']} after {Config.MAX_RETRIES} attempts")
+
+        callback = self._callbacks.pop(event["id"], None)
+        if callback is not None:
+            try:
+                callback(result if success else (None if event["type"] == "entry" else False))
+            except Exception as e:
+                logger.error(f"Error in {event['type']} callback for vehicle {event['track_id']}: {str(e)}")
+        return success
+
+    def _resolve_vehicle_id(self, event):
+        """Prefer the server-assigned ID; fall back to the track ID, which the client maps once the POST completes."""
+        if event["server_id"]:
+            return event["server_id"]
+
+        status = get_vehicle_status(track_id=str(event["track_id"]))
+        if status and status.get("posted") and status.get("server_vehicle_id"):
+            logger.info(f"Retrieved server ID {status['server_vehicle_id']} from tracker for vehicle {event['track_id']}")
+            return status["server_vehicle_id"]
+
+        logger.warning(f"No server ID available for vehicle {event['track_id']}, using track ID")
+        return str(event["track_id"])
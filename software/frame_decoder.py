@@ -0,0 +1,186 @@
+import multiprocessing as mp
+import logging
+import argparse
+import time
+import re
+import cv2
+from config import Config
+from frame_ring import FrameRing
+
+logger = logging.getLogger('frame_decoder')
+
+# Spawn rather than fork so the decoder does not inherit the CUDA context and model threads
+_mp = mp.get_context("spawn")
+
+
+def _decode_worker(source, threads, resize, slots, lossless, conn, stop_event):
+    """Decoder process entry point: decode with PyAV and publish frames into a FrameRing."""
+    ring = None
+    container = None
+    try:
+        import av
+
+        options = {}
+        if re.match(r'^rtsp://', source):
+            options = {
+                "rtsp_transport": "tcp",
+                "timeout": str(Config.RTSP_CONNECTION_TIMEOUT * 1000000)
+            }
+        container = av.open(source, options=options, timeout=Config.RTSP_CONNECTION_TIMEOUT)
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        stream.codec_context.thread_count = threads
+
+        source_size = (stream.codec_context.width, stream.codec_context.height)
+        width, height = resize if resize else source_size
+
+        ring = FrameRing((height, width, 3), slots=slots)
+        conn.send((ring.name, ring.shape, source_size))
+
+        for frame in container.decode(stream):
+            if stop_event.is_set():
+                break
+            # Scaling happens in swscale as part of the pixel format conversion
+            image = frame.to_ndarray(width=width, height=height, format="bgr24")
+            ring.write(image, block=lossless, should_stop=stop_event.is_set)
+    except Exception as e:
+        logger.error(f"Decoder for {source} failed: {str(e)}")
+        if ring is None:
+            conn.send(None)
+    finally:
+        if container is not None:
+            container.close()
+        if ring is not None:
+            # The reader keeps its own mapping, so it can drain after the segment is unlinked
+            ring.mark_closed()
+            ring.close()
+            ring.unlink()
+        conn.close()
+
+
+class DecoderProcess:
+    """
+    Decode a video source in a separate process with PyAV/FFmpeg and hand frames to
+    the detector through shared memory. Exposes the subset of the cv2.VideoCapture
+    interface used by VideoProcessor (isOpened, read, release).
+    """
+    def __init__(self, source, threads=None, resize=None, slots=None, lossless=None):
+        """
+        Args:
+            source (str): Video file path or RTSP URL
+            threads (int): FFmpeg decoder threads (0 lets FFmpeg decide)
+            resize (tuple): Optional (width, height) to scale frames to at decode time
+            slots (int): Number of shared-memory frame slots
+            lossless (bool): Never drop frames (default for files); live streams drop stale frames
+        """
+        self.source = source
+        self.threads = Config.DECODER_THREADS if threads is None else threads
+        self.resize = Config.DECODE_RESIZE if resize is None else resize
+        self.slots = Config.DECODER_RING_SLOTS if slots is None else slots
+        self.lossless = not source.startswith("rtsp://") if lossless is None else lossless
+        self.source_size = None
+        self.frame_size = None
+
+        self._ring = None
+        self._last_seq = 0
+        self._stop_event = _mp.Event()
+        parent_conn, child_conn = _mp.Pipe(duplex=False)
+        self._process = _mp.Process(
+            target=_decode_worker,
+            args=(source, self.threads, self.resize, self.slots, self.lossless, child_conn, self._stop_event),
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+        # Wait for the worker to open the source and report the frame geometry
+        if parent_conn.poll(Config.RTSP_CONNECTION_TIMEOUT):
+            info = parent_conn.recv()
+            if info:
+                name, shape, self.source_size = info
+                self._ring = FrameRing(shape, slots=self.slots, name=name, create=False)
+                self.frame_size = (shape[1], shape[0])
+        parent_conn.close()
+
+        if self._ring is None:
+            logger.error(f"Decoder process could not open {source}")
+            self.release()
+
+    def isOpened(self):
+        return self._ring is not None
+
+    def read(self):
+        """Return (ret, frame) like cv2.VideoCapture.read."""
+        ring = self._ring
+        if ring is None:
+            return False, None
+
+        # Release the previous frame's slot back to the decoder
+        ring.mark_consumed(self._last_seq)
+
+        # Lossless consumers get a view that stays valid until the next read;
+        # live streams may overwrite any slot, so take a copy
+        seq, frame = ring.read_next(
+            self._last_seq,
+            timeout=Config.RTSP_CONNECTION_TIMEOUT,
+            copy=not self.lossless
+        )
+        if frame is None:
+            return False, None
+        self._last_seq = seq
+        return True, frame
+
+    def release(self):
+        self._stop_event.set()
+        # Not closed here: the last lossless frame handed out is a view into the ring, and
+        # the mapping is released only once that frame and the ring are no longer referenced
+        self._ring = None
+        if self._process.is_alive():
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+
+
+def _benchmark(label, cap, frames, resize):
+    """Read up to `frames` frames and report FPS and CPU time (including child processes)."""
+    import resource  # Unix only, so imported here rather than by everything that uses DecoderProcess
+    start_self = resource.getrusage(resource.RUSAGE_SELF)
+    start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start_wall = time.time()
+
+    count = 0
+    while count < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if resize and (frame.shape[1], frame.shape[0]) != tuple(resize):
+            frame = cv2.resize(frame, tuple(resize))
+        count += 1
+
+    wall = time.time() - start_wall
+    end_self = resource.getrusage(resource.RUSAGE_SELF)
+    cap.release()
+    end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu_self = (end_self.ru_utime - start_self.ru_utime) + (end_self.ru_stime - start_self.ru_stime)
+    cpu_children = (end_children.ru_utime - start_children.ru_utime) + (end_children.ru_stime - start_children.ru_stime)
+    print(f"{label:>10}: {count} frames in {wall:.2f}s = {count / wall:.1f} FPS | "
+          f"CPU in detector process {cpu_self:.2f}s, in decoder processes {cpu_children:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-thread OpenCV decode with the PyAV decoder process")
+    parser.add_argument("source", help="Video file or RTSP URL")
+    parser.add_argument("--frames", type=int, default=500, help="Frames to decode per backend")
+    parser.add_argument("--threads", type=int, default=Config.DECODER_THREADS, help="PyAV decoder threads")
+    parser.add_argument("--resize", default=None, help="Resize at decode time, e.g. 640x360")
+    args = parser.parse_args()
+
+    resize = tuple(int(v) for v in args.resize.split("x")) if args.resize else None
+
+    _benchmark("opencv", cv2.VideoCapture(args.source), args.frames, resize)
+    _benchmark("pyav", DecoderProcess(args.source, threads=args.threads, resize=resize), args.frames, resize)
+
+
+if __name__ == "__main__":
+    main()
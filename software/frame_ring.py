@@ -0,0 +1,247 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+
+class _Mapping:
+    """
+    Owner of a shared memory mapping that numpy arrays use as their base.
+
+    NumPy keeps no buffer export on shared_memory's memoryview, so closing the segment
+    while a view of a frame is still referenced would unmap memory the view points
+    into. Arrays built on this object keep it alive instead, and the segment is closed
+    only when the last of them is gone.
+    """
+    def __init__(self, shm):
+        self._shm = shm
+        address = np.frombuffer(shm.buf, dtype=np.uint8).__array_interface__["data"][0]
+        self.__array_interface__ = {"shape": (shm.size,), "typestr": "|u1", "data": (address, False), "version": 3}
+
+    def __del__(self):
+        self._shm.close()
+
+
+class FrameRing:
+    """
+    Fixed-size ring of equally shaped frames stored in shared memory.
+
+    One writer publishes frames with increasing sequence numbers; any number of
+    readers in the same or other processes attach by name and read the latest
+    or next frame. Each slot carries the sequence number of the frame it holds,
+    which lets readers skip frames they have already seen and detect a slot that
+    was overwritten while they were reading it.
+    """
+    # Header layout (int64): latest sequence, consumer sequence, closed flag, one sequence per slot
+    _LATEST = 0
+    _CONSUMED = 1
+    _CLOSED = 2
+    _SLOT_BASE = 3
+
+    def __init__(self, shape, slots=4, name=None, create=True, dtype=np.uint8):
+        """
+        Create a new ring or attach to an existing one.
+
+        Args:
+            shape (tuple): Frame shape, e.g. (height, width, 3)
+            slots (int): Number of frames kept in the ring
+            name (str): Shared memory name (required when attaching)
+            create (bool): True to create the segment, False to attach to it
+            dtype: Frame element type
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._owner = create
+
+        header_bytes = (self._SLOT_BASE + slots) * 8
+        total_bytes = header_bytes + slots * self.frame_bytes
+
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=total_bytes)
+        else:
+            # Only the creator should unlink the segment, so keep the resource
+            # tracker from removing it when an attached process exits
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Python < 3.13 has no track argument
+                self._shm = shared_memory.SharedMemory(name=name)
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        memory = np.asarray(_Mapping(self._shm))
+        self._header = memory[:header_bytes].view(np.int64)
+        self._frames = memory[header_bytes:total_bytes].view(self.dtype).reshape((slots,) + self.shape)
+        if create:
+            self._header[:] = 0
+
+    @property
+    def name(self):
+        """Shared memory name used by other processes to attach."""
+        return self._shm.name
+
+    @property
+    def latest_seq(self):
+        """Sequence number of the most recently published frame (0 if none)."""
+        return int(self._header[self._LATEST])
+
+    @property
+    def closed(self):
+        """True once the writer has signalled that no more frames will follow."""
+        return bool(self._header[self._CLOSED])
+
+    def mark_closed(self):
+        """Signal readers that the writer has finished."""
+        self._header[self._CLOSED] = 1
+
+    def mark_consumed(self, seq):
+        """Record the last frame a lossless consumer has finished with."""
+        self._header[self._CONSUMED] = seq
+
+    def write(self, frame, block=False, timeout=None, should_stop=None):
+        """
+        Publish a frame into the next slot.
+
+        Args:
+            frame (np.ndarray): Frame with the ring's shape
+            block (bool): Wait for the consumer instead of overwriting unread frames
+            timeout (float): Maximum time to wait when blocking
+            should_stop (callable): Returns True to abandon a blocking wait
+
+        Returns:
+            int: Sequence number of the published frame, or 0 if it was not written
+        """
+        seq = self.latest_seq + 1
+
+        if block:
+            deadline = None if timeout is None else time.time() + timeout
+            while seq - self._header[self._CONSUMED] > self.slots:
+                if (should_stop and should_stop()) or (deadline and time.time() > deadline):
+                    return 0
+                time.sleep(0.001)
+
+        slot = seq % self.slots
+        slot_index = self._SLOT_BASE + slot
+
+        # Invalidate the slot while it is being written so readers can detect tearing
+        self._header[slot_index] = 0
+        np.copyto(self._frames[slot], frame, casting="unsafe")
+        self._header[slot_index] = seq
+        self._header[self._LATEST] = seq
+        return seq
+
+    def is_current(self, seq):
+        """True while the slot for seq still holds that frame, i.e. a view of it is intact."""
+        return self._header[self._SLOT_BASE + seq % self.slots] == seq
+
+    def read(self, seq):
+        """Read a copy of the frame with the given sequence number, or None if it is gone or torn."""
+        return self._read_slot(seq, True)
+
+    def view(self, seq):
+        """
+        Get a zero-copy view of the frame with the given sequence number, or None if it is gone.
+
+        The writer may reuse the slot at any time, so anything derived from the view is
+        only valid if is_current(seq) still holds after the caller finished with it.
+        consume_latest() does that check.
+        """
+        return self._read_slot(seq, False)
+
+    def consume_latest(self, consumer, last_seq=0, attempts=3):
+        """
+        Run consumer on a zero-copy view of the most recent frame newer than last_seq.
+
+        The result is kept only if the slot still holds the frame after consumer
+        returned; a frame overwritten meanwhile is dropped and the newest one is tried
+        again, up to `attempts` times.
+
+        Returns:
+            tuple: (seq, consumer result), or (last_seq, None) if there is nothing new or intact
+        """
+        for _ in range(attempts):
+            seq = self.latest_seq
+            if seq <= last_seq:
+                return last_seq, None
+            frame = self.view(seq)
+            if frame is None:
+                continue
+            result = consumer(frame)
+            if self.is_current(seq):
+                return seq, result
+        return last_seq, None
+
+    def _read_slot(self, seq, copy):
+        """Read the frame with the given sequence number, or None if it is gone or torn."""
+        slot_index = self._SLOT_BASE + seq % self.slots
+        if self._header[slot_index] != seq:
+            return None
+
+        frame = self._frames[seq % self.slots]
+        if copy:
+            frame = frame.copy()
+
+        # The writer may have reused the slot while we were reading
+        if self._header[slot_index] != seq:
+            return None
+        return frame
+
+    def read_latest(self, last_seq=0):
+        """
+        Read a copy of the most recent frame if it is newer than last_seq.
+        Use consume_latest() to work on the frame without copying it.
+
+        Args:
+            last_seq (int): Sequence number the caller has already seen
+
+        Returns:
+            tuple: (seq, frame), or (last_seq, None) if there is nothing new
+        """
+        for _ in range(3):
+            seq = self.latest_seq
+            if seq <= last_seq:
+                return last_seq, None
+            frame = self._read_slot(seq, True)
+            if frame is not None:
+                return seq, frame
+        return last_seq, None
+
+    def read_next(self, last_seq, timeout=None, copy=True):
+        """
+        Wait for and read the frame following last_seq, in order.
+        Frames that were already overwritten are skipped.
+
+        copy=False is only safe with a writer that blocks on mark_consumed(), which
+        keeps the slot from being reused until the reader moves on.
+
+        Returns:
+            tuple: (seq, frame), or (last_seq, None) on timeout or when the ring is closed
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            latest = self.latest_seq
+            if latest > last_seq:
+                seq = max(last_seq + 1, latest - self.slots + 1)
+                frame = self._read_slot(seq, copy)
+                if frame is not None:
+                    return seq, frame
+                last_seq = seq
+                continue
+            if self.closed or (deadline and time.time() > deadline):
+                return last_seq, None
+            time.sleep(0.001)
+
+    def close(self):
+        """
+        Detach from the shared memory segment. Frames handed out as views stay readable:
+        the mapping is released once the last of them is gone. The ring itself must not
+        be used afterwards.
+        """
+        self._header = None
+        self._frames = None
+
+    def unlink(self):
+        """Remove the shared memory segment (creator only, once)."""
+        if self._owner:
+            self._owner = False
+            self._shm.unlink()
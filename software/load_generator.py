@@ -0,0 +1,213 @@
+import argparse
+import heapq
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+import api_client
+from config import Config
+from outbox import EventOutbox
+from event_dispatcher import EventDispatcher
+from mock_backend import MockBackend, start_in_thread, add_fault_arguments, faults_from_args
+
+logger = logging.getLogger('load_generator')
+
+
+def simulate_traffic(pumps, rate, dwell, duration, seed=None):
+    """
+    Build a vehicle schedule for several pumps.
+
+    Arrivals at each pump are a Poisson process of `rate` vehicles per minute, and each
+    vehicle stays for an exponentially distributed time with mean `dwell` seconds.
+
+    Returns:
+        list: (offset seconds, type, petrol pump ID, track ID, entry offset) sorted by offset
+    """
+    rng = random.Random(seed)
+    events = []
+    track_id = 0
+    for pump in range(1, pumps + 1):
+        petrol_pump_id = f"LOAD-{pump}"
+        offset = rng.expovariate(rate / 60)
+        while offset < duration:
+            track_id += 1
+            exit_offset = offset + max(1.0, rng.expovariate(1 / dwell))
+            heapq.heappush(events, (offset, "entry", petrol_pump_id, track_id, offset))
+            heapq.heappush(events, (exit_offset, "exit", petrol_pump_id, track_id, offset))
+            offset += rng.expovariate(rate / 60)
+    return [heapq.heappop(events) for _ in range(len(events))]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class LoadGenerator:
+    """
+    Replay a vehicle schedule through the real EventDispatcher and api_client and
+    measure how long each event takes from dispatch until the backend accepted it.
+    """
+    def __init__(self, schedule, outbox_path):
+        self.schedule = schedule
+        self.outbox = EventOutbox(outbox_path)
+        self.dispatcher = EventDispatcher(self.outbox)
+        self._lock = threading.Lock()
+        self._dispatched_at = {}
+        self._entry_keys = {}  # (petrol pump ID, track ID) -> idempotency key of the entry
+        self.latencies = []
+        self.delivered = 0
+        self.failed = 0
+        self.dispatched = {"entry": 0, "exit": 0}
+        self.started = None
+        self.last_delivery = None
+
+    def _callback(self, key):
+        def done(result):
+            now = time.monotonic()
+            with self._lock:
+                if result:
+                    self.delivered += 1
+                    self.latencies.append(now - self._dispatched_at.pop(key))
+                    self.last_delivery = now
+                else:
+                    self.failed += 1
+                    self._dispatched_at.pop(key, None)
+        return done
+
+    def run(self, drain_timeout):
+        """Dispatch every event at its scheduled time, then wait up to drain_timeout for deliveries."""
+        self.dispatcher.start()
+        start_wall = datetime.now()
+        self.started = time.monotonic()
+
+        for offset, event_type, petrol_pump_id, track_id, entry_offset in self.schedule:
+            delay = self.started + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            key = (event_type, petrol_pump_id, track_id)
+            entry_time = (start_wall + timedelta(seconds=entry_offset)).strftime("%H:%M:%S")
+            with self._lock:
+                self._dispatched_at[key] = time.monotonic()
+                self.dispatched[event_type] += 1
+            if event_type == "entry":
+                self._entry_keys[(petrol_pump_id, track_id)] = self.dispatcher.dispatch_entry(
+                    petrol_pump_id, track_id, entry_time, start_wall.strftime("%Y-%m-%d"), "Car",
+                    camera_id=petrol_pump_id, callback=self._callback(key)
+                )
+            else:
+                exit_time = (start_wall + timedelta(seconds=offset)).strftime("%H:%M:%S")
+                self.dispatcher.dispatch_exit(petrol_pump_id, track_id, exit_time,
+                                              f"{int(offset - entry_offset)} seconds", entry_time,
+                                              idempotency_key=self._entry_keys.pop((petrol_pump_id, track_id)),
+                                              callback=self._callback(key))
+
+        logger.info(f"Dispatched {len(self.schedule)} events, waiting up to {drain_timeout}s for delivery")
+        deadline = time.monotonic() + drain_timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                outstanding = len(self._dispatched_at)
+            if not outstanding:
+                break
+            time.sleep(0.2)
+        self.dispatcher.stop()
+        self.outbox.close()
+
+    def outstanding(self):
+        with self._lock:
+            return len(self._dispatched_at)
+
+
+def fetch_stats(base_url, backend=None):
+    if backend is not None:
+        return backend.stats()
+    with urllib.request.urlopen(f"{base_url}/_stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+def report(generator, stats):
+    events = sum(generator.dispatched.values())
+    elapsed = (generator.last_delivery or time.monotonic()) - generator.started
+    lost_entries = generator.dispatched["entry"] - stats["distinct_entries"]
+    lost_exits = generator.dispatched["exit"] - stats["exits"]
+    requests = sum(stats["requests"].values())
+
+    print(f"Events dispatched:   {events} ({generator.dispatched['entry']} entries, {generator.dispatched['exit']} exits)")
+    print(f"Delivered:           {generator.delivered}, gave up: {generator.failed}, "
+          f"still undelivered: {generator.outstanding()}")
+    print(f"Throughput:          {generator.delivered / elapsed:.1f} events/s over {elapsed:.1f}s")
+    print(f"Delivery latency:    p50 {percentile(generator.latencies, 0.5) * 1000:.0f} ms, "
+          f"p99 {percentile(generator.latencies, 0.99) * 1000:.0f} ms")
+    print(f"Event loss:          {max(lost_entries, 0)} entries, {max(lost_exits, 0)} exits not stored on the server")
+    print(f"Duplicate entries:   {stats['duplicate_entries']} "
+          f"({stats.get('idempotent_replays', 0)} replayed entries dropped by idempotency key)")
+    print(f"Retry amplification: {stats['events_received'] / events:.2f} events sent per event "
+          f"({requests} HTTP requests: {', '.join(f'{route} {count}' for route, count in sorted(stats['requests'].items()))})")
+    print(f"Upload size:         {stats['bytes_received'] / max(stats['events_received'], 1):.0f} bytes per event sent "
+          f"(request line, headers and body)")
+    print(f"Faults injected:     {stats['faults_injected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Send simulated entry/exit traffic from several pumps through the real client "
+                    "to a mock backend with injected faults"
+    )
+    parser.add_argument("--url", help="Use an already running backend instead of starting a mock")
+    parser.add_argument("--port", type=int, default=8800, help="Port for the built-in mock backend")
+    parser.add_argument("--pumps", type=int, default=10, help="Number of simulated petrol pumps")
+    parser.add_argument("--rate", type=float, default=6.0, help="Vehicle arrivals per minute per pump")
+    parser.add_argument("--dwell", type=float, default=30.0, help="Mean time a vehicle stays, in seconds")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of arrivals to simulate")
+    parser.add_argument("--drain-timeout", type=float, default=60.0,
+                        help="Seconds to wait for undelivered events after the last dispatch")
+    parser.add_argument("--client-timeout", type=float, help="Override the client's per-request timeout")
+    parser.add_argument("--no-bulk", action="store_true", help="Send every event as its own request")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default=Config.BULK_ENCODING,
+                        help="Wire format of bulk uploads")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=Config.BULK_COMPRESSION,
+                        help="Compression of bulk uploads")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible schedule")
+    parser.add_argument("--verbose", action="store_true", help="Show client logs")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    # The client modules configure logging on import, so only the level is adjusted here
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    backend = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        backend = MockBackend(faults_from_args(args))
+        base_url = start_in_thread(backend, port=args.port)
+    api_client.set_base_url(base_url)
+    if args.client_timeout:
+        Config.API_REQUEST_TIMEOUT = args.client_timeout
+        Config.API_ENTRY_WAIT_TIMEOUT = args.client_timeout
+    if args.no_bulk:
+        Config.BULK_UPLOAD_ENABLED = False
+    Config.BULK_ENCODING = args.encoding
+    Config.BULK_COMPRESSION = args.compression
+
+    schedule = simulate_traffic(args.pumps, args.rate, args.dwell, args.duration, args.seed)
+    logger.info(f"Simulating {args.pumps} pumps for {args.duration}s against {base_url}: {len(schedule)} events")
+
+    with tempfile.TemporaryDirectory() as directory:
+        generator = LoadGenerator(schedule, os.path.join(directory, "outbox.db"))
+        generator.run(args.drain_timeout)
+        report(generator, fetch_stats(base_url, backend))
+    api_client.close_session()
+
+
+if __name__ == "__main__":
+    main()
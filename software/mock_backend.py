@@ -0,0 +1,343 @@
+import asyncio
+import argparse
+import logging
+import random
+import sqlite3
+import threading
+import base64
+import gzip
+import json
+from aiohttp import web
+
+logger = logging.getLogger('mock_backend')
+
+
+class FaultConfig:
+    """
+    Faults injected into every API request.
+
+    latency: base delay in seconds, plus up to `jitter` seconds at random
+    error_rate: fraction answered with 503 before anything is written
+    timeout_rate: fraction that is written but answered only after `timeout_delay`
+                  seconds, i.e. after the client gave up (the client then retries a
+                  request the server already applied)
+    drop_rate: fraction whose connection is closed without a response
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, timeout_delay=15.0,
+                 drop_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_delay = timeout_delay
+        self.drop_rate = drop_rate
+
+
+class MockBackend:
+    """
+    Local stand-in for the /PetrolPumps/details endpoints used by api_client, backed by SQLite.
+
+    Implements entry POST, exit PUT, paged detail GET and the bulk endpoint with the same
+    payloads and status codes as the client expects, and counts every request so load
+    tests can compare what the client sent with what was stored.
+    """
+    def __init__(self, faults=None, path=":memory:"):
+        self.faults = faults or FaultConfig()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                server_id TEXT,
+                petrol_pump_id TEXT,
+                vehicle_id TEXT,
+                vehicle_type TEXT,
+                entering_time TEXT,
+                exit_time TEXT DEFAULT '',
+                filling_time TEXT DEFAULT '',
+                date TEXT,
+                idempotency_key TEXT UNIQUE
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_details_pump ON details (petrol_pump_id, date, vehicle_id)")
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.events_received = 0  # Entry/exit events in write requests, counting each event of a bulk request
+        self.bytes_received = 0   # Request line, headers and body of write requests, as sent on the wire
+        self.idempotent_replays = 0  # Entries not stored again because their idempotency key was known
+        self.connections = set()  # Client (host, port) pairs, i.e. TCP connections opened to the backend
+        self.faults_injected = {"error": 0, "timeout": 0, "drop": 0}
+
+    def app(self):
+        app = web.Application(middlewares=[self._fault_middleware])
+        app.router.add_post("/PetrolPumps/details/", self._post_entry)
+        app.router.add_post("/PetrolPumps/detail/bulk", self._post_bulk)
+        app.router.add_put("/PetrolPumps/details/{pump}/vehicle/{vehicle}", self._put_exit)
+        app.router.add_get("/PetrolPumps/details/{pump}", self._get_details)
+        app.router.add_get("/PetrolPumps/details/{pump}/vehicle/{vehicle}", self._get_vehicle)
+        app.router.add_get("/_stats", self._get_stats)
+        return app
+
+    @web.middleware
+    async def _fault_middleware(self, request, handler):
+        if request.path == "/_stats":
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        route = f"{request.method} {resource.canonical if resource else request.path}"
+        self.requests[route] = self.requests.get(route, 0) + 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if request.method in ("POST", "PUT"):
+            self.bytes_received += (len(request.method) + len(request.raw_path) + 11 + len(await request.read())
+                                    + sum(len(name) + len(value) + 4 for name, value in request.raw_headers))
+            if request.path.endswith("/bulk"):
+                self.events_received += len(await self._read_events(request))
+            else:
+                self.events_received += 1
+
+        faults = self.faults
+        await asyncio.sleep(faults.latency + random.uniform(0, faults.jitter))
+
+        roll = random.random()
+        if roll < faults.drop_rate:
+            self.faults_injected["drop"] += 1
+            # The client sees the connection close without a response; the response below is never sent
+            request.transport.close()
+            return web.Response(status=500)
+        roll -= faults.drop_rate
+        if roll < faults.error_rate:
+            self.faults_injected["error"] += 1
+            return web.json_response({"message": "Injected error"}, status=503)
+        roll -= faults.error_rate
+
+        response = await handler(request)
+        if roll < faults.timeout_rate:
+            self.faults_injected["timeout"] += 1
+            await asyncio.sleep(faults.timeout_delay)
+        return response
+
+    def _insert_entry(self, petrol_pump_id, vehicle_id, vehicle_type, entering_time, date, idempotency_key=None):
+        """Store an entry and return its server ID; a replayed idempotency key returns the stored entry's ID."""
+        with self._lock:
+            if idempotency_key:
+                row = self._db.execute("SELECT server_id FROM details WHERE idempotency_key = ?",
+                                       (idempotency_key,)).fetchone()
+                if row:
+                    self.idempotent_replays += 1
+                    return row[0]
+            cursor = self._db.execute(
+                "INSERT INTO details (petrol_pump_id, vehicle_id, vehicle_type, entering_time, date, idempotency_key) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (petrol_pump_id, str(vehicle_id), vehicle_type, entering_time, date, idempotency_key)
+            )
+            server_id = f"14-{cursor.lastrowid}"
+            self._db.execute("UPDATE details SET server_id = ? WHERE id = ?", (server_id, cursor.lastrowid))
+            self._db.commit()
+        return server_id
+
+    def _apply_exit(self, petrol_pump_id, vehicle_id, exit_time, filling_time, idempotency_key=None):
+        """
+        Close the record of the entry with this idempotency key, or else the latest record
+        matching a server ID or, failing that, a local vehicle ID.
+        """
+        with self._lock:
+            row = None
+            if idempotency_key:
+                row = self._db.execute("SELECT id FROM details WHERE petrol_pump_id = ? AND idempotency_key = ?",
+                                       (petrol_pump_id, idempotency_key)).fetchone()
+            if row is None:
+                row = self._db.execute(
+                    "SELECT id FROM details WHERE petrol_pump_id = ? AND (server_id = ? OR vehicle_id = ?) "
+                    "ORDER BY server_id = ? DESC, id DESC LIMIT 1",
+                    (petrol_pump_id, vehicle_id, vehicle_id, vehicle_id)
+                ).fetchone()
+            if row is None:
+                return False
+            self._db.execute("UPDATE details SET exit_time = ?, filling_time = ? WHERE id = ?",
+                             (exit_time, filling_time, row[0]))
+            self._db.commit()
+        return True
+
+    async def _post_entry(self, request):
+        payload = await request.json()
+        server_id = self._insert_entry(payload.get("petrolPumpID"), payload.get("VehicleID"),
+                                       payload.get("VehicleType"), payload.get("EnteringTime"), payload.get("Date"),
+                                       request.headers.get("Idempotency-Key") or payload.get("IdempotencyKey"))
+        return web.json_response({**payload, "VehicleID": server_id}, status=201)
+
+    async def _put_exit(self, request):
+        payload = await request.json()
+        if not self._apply_exit(request.match_info["pump"], request.match_info["vehicle"],
+                                payload.get("ExitTime"), payload.get("FillingTime"),
+                                request.headers.get("Idempotency-Key") or payload.get("IdempotencyKey")):
+            return web.json_response({"message": "Vehicle not found"}, status=404)
+        return web.json_response({"message": "Updated"}, status=200)
+
+    @staticmethod
+    async def _read_events(request):
+        """Decode a bulk body: JSON or MessagePack, optionally gzip or zstd compressed."""
+        # Bodies arrive as sent because the app is served with auto_decompress=False
+        data = await request.read()
+        encoding = request.headers.get("Content-Encoding", "identity")
+        if encoding == "gzip":
+            data = gzip.decompress(data)
+        elif encoding == "zstd":
+            import zstandard
+            data = zstandard.ZstdDecompressor().decompress(data)
+        elif encoding != "identity":
+            raise web.HTTPUnsupportedMediaType(text=f"Unsupported Content-Encoding {encoding}")
+
+        if request.content_type == "application/msgpack":
+            import msgpack
+            return msgpack.unpackb(data).get("events") or []
+        return json.loads(data).get("events") or []
+
+    async def _post_bulk(self, request):
+        events = await self._read_events(request)
+        results = []
+        for event in events:
+            if event.get("type") == "entry":
+                server_id = self._insert_entry(event.get("petrolPumpID"), event.get("vehicleID"),
+                                               event.get("vehicleType"), event.get("enteringTime"), event.get("date"),
+                                               event.get("idempotencyKey"))
+                results.append({"status": "ok", "vehicleID": server_id})
+            elif self._apply_exit(event.get("petrolPumpID"), str(event.get("vehicleID")),
+                                  event.get("exitTime"), event.get("fillingTime"), event.get("idempotencyKey")):
+                results.append({"status": "ok", "vehicleID": event.get("vehicleID")})
+            else:
+                results.append({"status": "error", "vehicleID": event.get("vehicleID"), "error": "Vehicle not found"})
+        if "application/msgpack" in request.headers.get("Accept", ""):
+            import msgpack
+            return web.Response(body=msgpack.packb({"results": results}), content_type="application/msgpack")
+        return web.json_response({"results": results})
+
+    @staticmethod
+    def _row_to_record(row):
+        return {
+            "PetrolPumpID": row[0],
+            "VehicleID": row[1],
+            "VehicleType": row[2],
+            "EnteringTime": row[3],
+            "ExitTime": row[4],
+            "FillingTime": row[5],
+            "Date": row[6]
+        }
+
+    async def _get_details(self, request):
+        """Paged like the real server: ordered by (date, id), next page cursor in X-Next-Cursor."""
+        query = request.query
+        conditions = ["petrol_pump_id = ?"]
+        values = [request.match_info["pump"]]
+        if query.get("date"):
+            conditions.append("date = ?")
+            values.append(query["date"])
+        if query.get("since"):
+            date, _, entering_time = query["since"].partition(" ")
+            conditions.append("(date > ? OR (date = ? AND entering_time >= ?))")
+            values += [date, date, entering_time]
+        if query.get("cursor"):
+            conditions.append("id > ?")
+            values.append(json.loads(base64.urlsafe_b64decode(query["cursor"]))["id"])
+        limit = int(query.get("limit", 1000))
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT server_id, vehicle_type, entering_time, exit_time, filling_time, date, id, petrol_pump_id "
+                f"FROM details WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?",
+                values + [limit + 1]
+            ).fetchall()
+
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = base64.urlsafe_b64encode(json.dumps({"id": rows[-1][6]}).encode()).decode()
+        records = [self._row_to_record((row[7],) + row[:6]) for row in rows]
+        return web.json_response(records, headers=headers)
+
+    async def _get_vehicle(self, request):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT petrol_pump_id, server_id, vehicle_type, entering_time, exit_time, filling_time, date "
+                "FROM details WHERE petrol_pump_id = ? AND server_id = ?",
+                (request.match_info["pump"], request.match_info["vehicle"])
+            ).fetchone()
+        if row is None:
+            return web.json_response({"message": "Vehicle not found"}, status=404)
+        return web.json_response(self._row_to_record(row))
+
+    def stats(self):
+        """Requests received per route, injected faults and what ended up stored."""
+        with self._lock:
+            entries, exits = self._db.execute(
+                "SELECT COUNT(*), SUM(exit_time != '') FROM details"
+            ).fetchone()
+            distinct_entries = self._db.execute(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT petrol_pump_id, vehicle_id, date, entering_time FROM details)"
+            ).fetchone()[0]
+        return {
+            "requests": dict(self.requests),
+            "events_received": self.events_received,
+            "bytes_received": self.bytes_received,
+            "faults_injected": dict(self.faults_injected),
+            "entries": entries,
+            "distinct_entries": distinct_entries,
+            "duplicate_entries": entries - distinct_entries,
+            "idempotent_replays": self.idempotent_replays,
+            "connections": len(self.connections),
+            "exits": exits or 0
+        }
+
+    async def _get_stats(self, request):
+        return web.json_response(self.stats())
+
+
+def start_in_thread(backend, host="127.0.0.1", port=8800):
+    """Serve a MockBackend from a daemon thread with its own event loop; returns the base URL."""
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(backend.app(), access_log=None, auto_decompress=False)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="mock-backend", daemon=True).start()
+    if not ready.wait(timeout=10):
+        raise RuntimeError(f"Mock backend did not start on {host}:{port}")
+    return f"http://{host}:{port}"
+
+
+def add_fault_arguments(parser):
+    """Add the fault injection options shared by this module and the load generator."""
+    parser.add_argument("--latency", type=float, default=0.02, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.03, help="Extra random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--timeout-rate", type=float, default=0.0,
+                        help="Fraction of requests applied but answered only after --timeout-delay")
+    parser.add_argument("--timeout-delay", type=float, default=15.0, help="Delay of timed-out responses in seconds")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of connections closed without a response")
+
+
+def faults_from_args(args):
+    return FaultConfig(args.latency, args.jitter, args.error_rate, args.timeout_rate, args.timeout_delay,
+                       args.drop_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the PetrolPumps API with fault injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--db", default=":memory:", help="SQLite file for stored records")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    backend = MockBackend(faults_from_args(args), args.db)
+    logger.info(f"Mock backend on http://{args.host}:{args.port}/PetrolPumps/details (stats at /_stats)")
+    web.run_app(backend.app(), host=args.host, port=args.port, print=None, auto_decompress=False)
+
+
+if __name__ == "__main__":
+    main()
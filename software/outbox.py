@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import json
+import time
+import logging
+import os
+from config import Config
+
+logger = logging.getLogger('outbox')
+
+
+class EventOutbox:
+    """
+    Durable, ordered store for entry and exit events that still have to reach the server.
+
+    Events are committed to SQLite in WAL mode with synchronous=FULL before delivery,
+    so a crash or power loss does not lose them, and are deleted only once the server
+    has accepted them. Events left over from a previous run are drained on restart.
+    """
+    def __init__(self, path=None):
+        self.path = path or Config.OUTBOX_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                petrol_pump_id TEXT NOT NULL,
+                track_id TEXT NOT NULL,
+                entry_time TEXT,
+                server_id TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_events_status ON events (status, id)")
+
+        pending = self.count()
+        if pending:
+            logger.info(f"Outbox {self.path} has {pending} undelivered events from a previous run")
+
+    def append_many(self, events):
+        """
+        Durably store events in one transaction.
+
+        Args:
+            events (list): Dicts with type, petrol_pump_id, track_id, entry_time, server_id and payload
+
+        Returns:
+            list: Outbox IDs of the stored events, in order
+        """
+        now = time.time()
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for event in events:
+                    cursor = self._conn.execute(
+                        "INSERT INTO events (type, petrol_pump_id, track_id, entry_time, server_id, payload, created) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (event["type"], event["petrol_pump_id"], str(event["track_id"]), event.get("entry_time"),
+                         event.get("server_id"), json.dumps(event["payload"]), now)
+                    )
+                    ids.append(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def pending(self, limit):
+        """Get up to `limit` undelivered events, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, type, petrol_pump_id, track_id, entry_time, server_id, payload, attempts "
+                "FROM events WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [{
+            "id": row[0],
+            "type": row[1],
+            "petrol_pump_id": row[2],
+            "track_id": row[3],
+            "entry_time": row[4],
+            "server_id": row[5],
+            "payload": json.loads(row[6]),
+            "attempts": row[7]
+        } for row in rows]
+
+    def ack(self, event, server_id=None):
+        """
+        Remove a delivered event. For entries, the server ID is copied onto pending
+        exits of the same vehicle so they survive a restart that clears the tracker.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM events WHERE id = ?", (event["id"],))
+                if event["type"] == "entry" and server_id:
+                    self._conn.execute(
+                        "UPDATE events SET server_id = ? WHERE type = 'exit' AND status = 'pending' "
+                        "AND petrol_pump_id = ? AND track_id = ? AND entry_time = ? AND server_id IS NULL",
+                        (server_id, event["petrol_pump_id"], event["track_id"], event["entry_time"])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_failure(self, event, error, max_attempts):
+        """
+        Count a failed delivery attempt; the event stays pending until max_attempts,
+        then it is kept as 'failed' for inspection instead of blocking the outbox.
+
+        Returns:
+            bool: True if the event was given up on
+        """
+        attempts = event["attempts"] + 1
+        status = "failed" if attempts >= max_attempts else "pending"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE events SET attempts = ?, status = ?, last_error = ? WHERE id = ?",
+                (attempts, status, str(error)[:500], event["id"])
+            )
+        return status == "failed"
+
+    def count(self, status="pending"):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events WHERE status = ?", (status,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -4,6 +4,7 @@ import cv2
 import numpy as np
 from datetime import datetime
 from video_processor import VideoProcessor
+from camera import CameraSource
 from streamlit_extras.image_selector import image_selector, show_selection
 from api_client import get_vehicle_details
 import tempfile
@@ -65,6 +66,7 @@ def main():
         'temp_dir': None,
         'source_type': 'file',  # Default source type: 'file' or 'rtsp'
         'rtsp_url': '',
+        'evidence_url': '',
     }
     for key, value in session_defaults.items():
         if key not in st.session_state:
@@ -123,6 +125,16 @@ def main():
             if rtsp_url != st.session_state.rtsp_url:
                 st.session_state.rtsp_url = rtsp_url
             
+            # Optional high-resolution main stream, decoded only for entry/exit evidence
+            evidence_url = st.text_input(
+                "📸 Evidence Stream URL (Optional)",
+                value=st.session_state.evidence_url,
+                placeholder="rtsp://username:password@ip_address:port/main",
+                help="Detection runs on the stream above (e.g. the 640x360 substream); "
+                     "this stream is only used for entry/exit snapshots"
+            )
+            st.session_state.evidence_url = evidence_url
+            
             # Validate and set RTSP URL
             if st.button("✅ Connect to RTSP Stream"):
                 if rtsp_url.startswith("rtsp://"):
@@ -163,9 +175,11 @@ def main():
         
         if start_button:
             if st.session_state.source_path and len(st.session_state.roi_points) >= 3:
-                # Start processing with the source path and ROI points
+                # Start processing with the camera and ROI points
+                evidence_url = st.session_state.evidence_url if st.session_state.source_type == 'rtsp' else None
+                camera = CameraSource(st.session_state.source_path, evidence_url)
                 success = st.session_state.processor.start_processing(
-                    st.session_state.source_path, 
+                    camera, 
                     np.array(st.session_state.roi_points)
                 )
                 if success:
@@ -254,22 +268,29 @@ def main():
             stats_container = st.empty()
             
             # Main display loop
+            last_seq = 0
             while st.session_state.processing:
-                # Get the current frames from the processor
-                original_frame, processed_frame = st.session_state.processor.get_current_frames()
+                # Get the shared JPEG previews; every viewer receives the same encoded bytes
+                seq, original_jpeg = st.session_state.processor.get_preview_jpeg("original")
+                _, processed_jpeg = st.session_state.processor.get_preview_jpeg("processed")
                 progress, total_frames, is_processing, fps = st.session_state.processor.get_progress()
                 
-                # Only update UI if valid frames exist
-                if original_frame is not None and processed_frame is not None:
+                # A restarted processor publishes previews numbered from 1 again
+                if seq < last_seq:
+                    last_seq = 0
+                
+                # Only update UI when a new preview was encoded
+                if seq > last_seq and original_jpeg is not None and processed_jpeg is not None:
+                    last_seq = seq
                     # Update displays
                     original_placeholder.image(
-                        cv2.cvtColor(original_frame, cv2.COLOR_BGR2RGB), 
+                        original_jpeg, 
                         caption="Original Video",
                         use_container_width=True
                     )
                     
                     processed_placeholder.image(
-                        cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB), 
+                        processed_jpeg, 
                         caption="Processed Video with Tracking",
                         use_container_width=True
                     )
@@ -0,0 +1,186 @@
+import cv2
+import threading
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+logger = logging.getLogger('preview_server')
+
+
+class PreviewPublisher:
+    """
+    Encode a camera's frames to downscaled JPEG once, at a capped rate and only
+    when a new frame was published. Every viewer is served the same bytes, so
+    preview cost does not grow with the number of viewers.
+    """
+    VIEWS = ("original", "processed")
+
+    def __init__(self, processor, fps=None, quality=None, max_width=None):
+        self.processor = processor
+        self.fps = fps or Config.PREVIEW_FPS
+        self.quality = quality or Config.PREVIEW_JPEG_QUALITY
+        self.max_width = max_width or Config.PREVIEW_MAX_WIDTH
+        self._condition = threading.Condition()
+        self._seq = 0        # Number of previews published; never goes backwards for a publisher
+        self._frame_seq = 0  # Ring sequence of the frames last encoded
+        self._jpegs = {view: None for view in self.VIEWS}
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self):
+        return self._running
+
+    def stop(self):
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def _encode(self, frame):
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)),
+                               interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes() if ok else None
+
+    def _encode_pair(self, original, processed):
+        return {"original": self._encode(original), "processed": self._encode(processed)}
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        while self._running:
+            started = time.time()
+            try:
+                # Encode straight from the shared-memory views; JPEGs of frames the
+                # writer overwrote during encoding are dropped
+                frame_seq, jpegs = self.processor.consume_frames_since(self._encode_pair, self._frame_seq)
+                if jpegs is not None:
+                    self._frame_seq = frame_seq
+                    with self._condition:
+                        self._seq += 1
+                        self._jpegs = jpegs
+                        self._condition.notify_all()
+            except Exception as e:
+                logger.error(f"Error encoding preview: {str(e)}")
+            time.sleep(max(0.0, interval - (time.time() - started)))
+
+    def get_jpeg(self, view="processed"):
+        """
+        Get the latest encoded preview.
+
+        Returns:
+            tuple: (seq, jpeg bytes), with bytes None before the first frame
+        """
+        with self._condition:
+            return self._seq, self._jpegs.get(view)
+
+    def wait_for_jpeg(self, last_seq, view="processed", timeout=None):
+        """Block until a preview newer than last_seq is available, then return (seq, jpeg bytes)."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > last_seq or not self._running, timeout=timeout)
+            return self._seq, self._jpegs.get(view)
+
+
+# Registered publishers by camera ID
+_publishers = {}
+_server = None
+_server_lock = threading.Lock()
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    """
+    Serve /<camera_id>/<view>.mjpg as an MJPEG stream and /<camera_id>/<view>.jpg
+    as a single snapshot, where view is "original" or "processed".
+    """
+    BOUNDARY = "frame"
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or "." not in parts[1]:
+            self.send_error(404)
+            return
+
+        camera_id, filename = parts
+        view, extension = filename.rsplit(".", 1)
+        publisher = _publishers.get(camera_id)
+        if publisher is None or view not in PreviewPublisher.VIEWS or extension not in ("jpg", "mjpg"):
+            self.send_error(404)
+            return
+
+        if extension == "jpg":
+            _, jpeg = publisher.get_jpeg(view)
+            if jpeg is None:
+                self.send_error(503, "No frame yet")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(jpeg)))
+            self.end_headers()
+            self.wfile.write(jpeg)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        last_seq = 0
+        try:
+            while _publishers.get(camera_id) is publisher and publisher.running:
+                seq, jpeg = publisher.wait_for_jpeg(last_seq, view, timeout=5.0)
+                if jpeg is None or seq == last_seq:
+                    continue
+                last_seq = seq
+                self.wfile.write(
+                    f"--{self.BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                )
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_server(host=None, port=None):
+    """Start the shared MJPEG preview server once per process."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        host = host or Config.PREVIEW_HOST
+        port = port or Config.PREVIEW_PORT
+        try:
+            _server = ThreadingHTTPServer((host, port), _PreviewHandler)
+            _server.daemon_threads = True
+        except OSError as e:
+            logger.error(f"Could not start preview server on {host}:{port}: {str(e)}")
+            return None
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        logger.info(f"Preview server running on http://{host}:{port}/")
+        return _server
+
+
+def register(camera_id, publisher):
+    """Serve a camera's previews at /<camera_id>/..."""
+    _publishers[camera_id] = publisher
+
+
+def unregister(camera_id):
+    _publishers.pop(camera_id, None)
+
+
+def preview_url(camera_id, view="processed"):
+    """URL of a camera's MJPEG stream on the preview server."""
+    return f"http://{Config.PREVIEW_HOST}:{Config.PREVIEW_PORT}/{camera_id}/{view}.mjpg"
@@ -0,0 +1,38 @@
+import os
+import re
+
+import api_client
+from mock_backend import MockBackend
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "server")
+
+
+def _read(*parts):
+    with open(os.path.join(SERVER_DIR, *parts)) as f:
+        return f.read()
+
+
+def _server_post_routes():
+    """POST paths of the Node server's PetrolPump router, with the prefix it is mounted at."""
+    mount = re.search(r"app\.use\('([^']+)',\s*petrolPumpRouter\)", _read("server.js")).group(1)
+    routes = re.findall(r"PetrolPumpRouter\.post\('([^']+)'", _read("routes", "petrolPump.router.js"))
+    return {mount + route for route in routes}
+
+
+def test_bulk_path_is_routed_by_server():
+    assert api_client.BULK_EVENTS_PATH in _server_post_routes()
+
+
+def test_bulk_endpoint_uses_bulk_path():
+    assert api_client.BULK_EVENTS_ENDPOINT.endswith(api_client.BULK_EVENTS_PATH)
+    base_url = api_client.BASE_URL
+    api_client.set_base_url("http://127.0.0.1:9")
+    try:
+        assert api_client.BULK_EVENTS_ENDPOINT == "http://127.0.0.1:9" + api_client.BULK_EVENTS_PATH
+    finally:
+        api_client.set_base_url(base_url)
+
+
+def test_mock_backend_serves_bulk_path():
+    paths = {resource.canonical for resource in MockBackend().app().router.resources()}
+    assert api_client.BULK_EVENTS_PATH in paths
@@ -0,0 +1,48 @@
+import socket
+
+import api_client
+from mock_backend import MockBackend, start_in_thread
+
+
+class RecordingBackend(MockBackend):
+    """Mock backend that keeps the idempotency key of every exit PUT it receives."""
+    def __init__(self):
+        super().__init__()
+        self.put_keys = []
+
+    async def _put_exit(self, request):
+        payload = await request.json()
+        self.put_keys.append(request.headers.get("Idempotency-Key") or payload.get("IdempotencyKey"))
+        return await super()._put_exit(request)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_batch_put_of_bulk_posted_vehicle_sends_entry_key():
+    backend = RecordingBackend()
+    base_url = api_client.BASE_URL
+    api_client.set_base_url(start_in_thread(backend, port=_free_port()))
+    try:
+        results = api_client.post_events_bulk([{
+            "type": "entry",
+            "petrol_pump_id": "TEST-45",
+            "vehicle_id": "bulk-45",
+            "vehicle_type": "Car",
+            "entering_time": "10:00:00",
+            "date": "2026-01-01",
+            "idempotency_key": "entry-key-45"
+        }]).result(timeout=10)
+        server_id = results[0]["VehicleID"]
+
+        status = api_client.get_vehicle_status(server_id=server_id)
+        assert status["post_payload"]["IdempotencyKey"] == "entry-key-45"
+
+        outcome = api_client.manual_batch_put_request("TEST-45", [server_id])
+        assert outcome["success"] == 1
+        assert backend.put_keys == ["entry-key-45"]
+    finally:
+        api_client.set_base_url(base_url)
@@ -0,0 +1,40 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from camera import CameraSource, EvidenceRecorder
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_snapshot_from_open_evidence_stream(tmp_path):
+    video = tmp_path / "evidence.avi"
+    writer = cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*"MJPG"), 25, (160, 120))
+    for _ in range(250):
+        writer.write(np.full((120, 160, 3), 200, np.uint8))
+    writer.release()
+
+    output_dir = tmp_path / "evidence"
+    recorder = EvidenceRecorder(CameraSource("detection.avi", str(video), camera_id="cam"),
+                                output_dir=str(output_dir), clip_seconds=0)
+    recorder.start()
+    try:
+        recorder.request(7, "exit", (80, 60), box=(10, 10, 40, 40))
+        assert _wait_for(lambda: os.listdir(output_dir))
+    finally:
+        recorder.stop()
+
+    (snapshot,) = os.listdir(output_dir)
+    assert snapshot.startswith("cam_7_exit_") and snapshot.endswith(".jpg")
+    assert cv2.imread(str(output_dir / snapshot)).shape == (120, 160, 3)
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+SOFTWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(tmp_path, source):
+    """Run source as a script, so a view into unmapped memory fails the test instead of crashing pytest."""
+    script = tmp_path / "script.py"
+    script.write_text(f"import sys\nsys.path.insert(0, {SOFTWARE_DIR!r})\n" + textwrap.dedent(source))
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+def test_view_outlives_close_and_unlink(tmp_path):
+    output = _run(tmp_path, """
+        import gc
+        import numpy as np
+        from frame_ring import FrameRing
+
+        ring = FrameRing((8, 8, 3))
+        seq = ring.write(np.full((8, 8, 3), 5, np.uint8))
+        frame = ring.view(seq)
+        rows = frame[2:4]
+        ring.close()
+        ring.unlink()
+        del ring
+        gc.collect()
+        print(int(frame.sum()), int(rows.sum()))
+    """)
+    assert output == [str(8 * 8 * 3 * 5), str(2 * 8 * 3 * 5)]
+
+
+def test_mapping_released_with_last_view(tmp_path):
+    output = _run(tmp_path, """
+        import gc
+        import numpy as np
+        from frame_ring import FrameRing
+
+        def mapped(name):
+            with open("/proc/self/maps") as maps:
+                return any(name.lstrip("/") in line for line in maps)
+
+        ring = FrameRing((8, 8, 3))
+        name = ring.name
+        frame = ring.view(ring.write(np.zeros((8, 8, 3), np.uint8)))
+        ring.close()
+        ring.unlink()
+        gc.collect()
+        print(mapped(name))
+        del frame
+        gc.collect()
+        print(mapped(name))
+    """)
+    assert output == ["True", "False"]
+
+
+def test_view_outlives_stop_processing(tmp_path):
+    pytest.importorskip("ultralytics")
+    output = _run(tmp_path, """
+        import gc
+        import threading
+        import numpy as np
+        from video_processor import VideoProcessor
+
+        # Only the frame publishing and stop paths are exercised; skip loading the model
+        processor = VideoProcessor.__new__(VideoProcessor)
+        processor.is_processing = False
+        processor.processing_thread = None
+        processor.maintenance_running = False
+        processor.maintenance_thread = threading.Thread(target=lambda: None)
+        processor.evidence_recorder = None
+        processor.preview = None
+        processor.camera = None
+        processor.frame_rings = None
+        processor._publish_frames(np.full((8, 8, 3), 1, np.uint8), np.full((8, 8, 3), 2, np.uint8))
+
+        seq, (original, processed) = processor.consume_frames_since(lambda original, processed: (original, processed))
+        processor.stop_processing()
+        gc.collect()
+        print(seq, int(original.sum()), int(processed.sum()))
+    """)
+    assert output == ["1", str(8 * 8 * 3), str(8 * 8 * 3 * 2)]
+
+
+def test_lossless_decoder_frame_outlives_release(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    pytest.importorskip("av")
+    import numpy as np
+
+    video = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for _ in range(5):
+        writer.write(np.full((48, 64, 3), 128, np.uint8))
+    writer.release()
+
+    output = _run(tmp_path, f"""
+        import gc
+        from frame_decoder import DecoderProcess
+
+        if __name__ == "__main__":
+            decoder = DecoderProcess({str(video)!r}, lossless=True)
+            ok, frame = decoder.read()
+            decoder.release()
+            del decoder
+            gc.collect()
+            print(ok, frame.shape[0], frame.shape[1], abs(float(frame.mean()) - 128) < 8)
+    """)
+    assert output == ["True", "48", "64", "True"]
@@ -0,0 +1,128 @@
+import argparse
+import heapq
+import logging
+import random
+import time
+import types
+import api_request_tracker
+from api_request_tracker import VehicleRequestTracker
+from config import Config
+
+logger = logging.getLogger('tracker_benchmark')
+
+
+def _tracker():
+    """A tracker without its background retry thread, so only the measured calls run."""
+    tracker = VehicleRequestTracker()
+    tracker._ensure_retry_thread = lambda: None
+    return tracker
+
+
+def run_lookup(sizes, lookups):
+    """Time lookups by track ID and server ID and exit updates as the number of tracked vehicles grows."""
+    for size in sizes:
+        tracker = _tracker()
+        for i in range(size):
+            tracker.track_post_request(i, "BENCH-1", {"VehicleID": str(i)})
+            tracker.update_post_status(i, "BENCH-1", {"VehicleID": f"14-{i}"})
+
+        # Spread the probes over the whole range, newest vehicles first
+        track_ids = [size - 1 - (i * 7919) % size for i in range(lookups)]
+        timings = []
+        for lookup in (lambda i: tracker.get_vehicle_status(track_id=i),
+                       lambda i: tracker.get_vehicle_status(server_id=f"14-{i}"),
+                       lambda i: tracker.update_put_status(f"14-{i}", "BENCH-1", True)):
+            started = time.perf_counter()
+            for track_id in track_ids:
+                lookup(track_id)
+            timings.append((time.perf_counter() - started) / len(track_ids) * 1e6)
+
+        print(f"{size:>8} vehicles: by track ID {timings[0]:8.1f} us, by server ID {timings[1]:8.1f} us, "
+              f"update_put_status {timings[2]:8.1f} us")
+
+
+def run_soak(days, interval, lost_exits, unbounded, seed=7):
+    """
+    Feed the tracker a simulated stream of vehicles for `days` days on a fake clock: one entry
+    every `interval` seconds on average, an exit about two minutes later, and a fraction
+    `lost_exits` of exits never sent. Reports the stats and the tracker's memory at the end.
+    """
+    # Every lost exit is given up on with a warning
+    logging.getLogger('api_request_tracker').setLevel(logging.ERROR)
+    if unbounded:
+        Config.REQUEST_TRACKER_MAX_COMPLETED = Config.REQUEST_TRACKER_COMPLETED_AGE = 10 ** 12
+        Config.REQUEST_TRACKER_MAX_ACTIVE_AGE = 10 ** 12
+
+    # Retention ages are measured with time.monotonic in the tracker module; drive it from the simulation
+    clock = [0.0]
+    real_time = api_request_tracker.time
+    api_request_tracker.time = types.SimpleNamespace(monotonic=lambda: clock[0], time=time.time, sleep=time.sleep)
+    try:
+        tracker = _tracker()
+        rng = random.Random(seed)
+        exits = []
+        vehicles = 0
+        started = time.perf_counter()
+        while clock[0] < days * 86400:
+            clock[0] += rng.expovariate(1 / interval)
+            while exits and exits[0][0] <= clock[0]:
+                _, petrol_pump_id, server_id = heapq.heappop(exits)
+                tracker.track_put_request(server_id, petrol_pump_id,
+                                          {"ExitTime": "10:05:00", "FillingTime": "120 seconds"})
+                tracker.update_put_status(server_id, petrol_pump_id, True)
+
+            vehicles += 1
+            petrol_pump_id = f"BENCH-{vehicles % 4 + 1}"
+            track_id = vehicles % 100000  # Track IDs wrap like the detector's
+            server_id = f"14-{vehicles}"
+            tracker.track_post_request(track_id, petrol_pump_id, {
+                "petrolPumpID": petrol_pump_id, "VehicleID": str(track_id), "EnteringTime": "10:00:00",
+                "Date": "2026-01-01", "VehicleType": "Car", "IdempotencyKey": f"{vehicles:032x}"
+            })
+            tracker.update_post_status(track_id, petrol_pump_id, {"VehicleID": server_id})
+            if rng.random() >= lost_exits:
+                heapq.heappush(exits, (clock[0] + rng.expovariate(1 / 120), petrol_pump_id, server_id))
+
+            # Stands in for the retry thread, which runs expiry every few seconds
+            if vehicles % 1000 == 0:
+                with tracker._lock:
+                    tracker._expire()
+        elapsed = time.perf_counter() - started
+    finally:
+        api_request_tracker.time = real_time
+
+    stats = tracker.get_stats()
+    memory = tracker.get_memory_usage()
+    print(f"{'unbounded' if unbounded else 'bounded'}: {vehicles} vehicles over {days} days in {elapsed:.1f} s")
+    print("  " + ", ".join(f"{name} {stats[name]}" for name in (
+        "total_vehicles", "tracked_vehicles", "archived_vehicles", "puts_completed", "puts_pending",
+        "expired_vehicles")))
+    print(f"  memory {memory['total_bytes'] / 2 ** 20:.1f} MiB (records {memory['vehicles_bytes'] / 2 ** 20:.1f}, "
+          f"indexes {memory['index_bytes'] / 2 ** 20:.1f}, archive {memory['archive_bytes'] / 2 ** 20:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vehicle request tracker")
+    parser.add_argument("mode", choices=["lookup", "soak"],
+                        help="lookup: time status lookups and exit updates against the number of tracked "
+                             "vehicles; soak: simulate days of traffic and report retention and memory")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Tracked vehicle counts to measure (lookup)")
+    parser.add_argument("--lookups", type=int, default=200, help="Lookups timed per size (lookup)")
+    parser.add_argument("--days", type=float, default=7, help="Simulated days of traffic (soak)")
+    parser.add_argument("--interval", type=float, default=3.0, help="Mean seconds between vehicles (soak)")
+    parser.add_argument("--lost-exits", type=float, default=0.02,
+                        help="Fraction of vehicles whose exit is never sent (soak)")
+    parser.add_argument("--unbounded", action="store_true",
+                        help="Disable the retention limits, to compare with the unbounded tracker (soak)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.mode == "lookup":
+        run_lookup(args.sizes, args.lookups)
+    else:
+        run_soak(args.days, args.interval, args.lost_exits, args.unbounded)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,20 @@ import numpy as np
 from ultralytics import YOLO
 from sort import Sort
 from config import Config
+from frame_decoder import DecoderProcess
+from frame_ring import FrameRing
+from preview_server import PreviewPublisher
+import preview_server
+import api_metrics
+from camera import CameraSource, EvidenceRecorder, map_points
 from datetime import datetime
 import threading
 import time
 import os
 import re
 import logging
-from api_client import post_vehicle_entry, update_vehicle_exit, VEHICLE_TYPE_MAPPING, get_vehicle_status, force_update_stale_vehicles
+from api_client import VEHICLE_TYPE_MAPPING, force_update_stale_vehicles
+from event_dispatcher import EventDispatcher
 logger = logging.getLogger('video_processor')
 
 class VideoProcessor:
@@ -27,26 +34,34 @@ class VideoProcessor:
         # Initialize tracked vehicles
         self.tracked_vehicles = {}
         
+        # Entry and exit events are delivered off the frame loop; results come back via callbacks
+        self.dispatcher = EventDispatcher()
+        
         # For video processing
+        self.camera = None
+        self.evidence_recorder = None
         self.source_path = None
         self.is_rtsp = False
         self.roi_points = None
         self.is_processing = False
         self.processing_thread = None
-        self.original_frame = None
-        self.processed_frame = None
+        self.frame_rings = None  # Shared-memory rings holding the latest original and processed frames
+        self.preview = None      # Encode-once JPEG previews shared by all viewers
         self.current_progress = 0
         self.total_frames = 0
         self.detection_fps = 0
         self.frame_count = 0
         
-        # Set a timer for periodic forced updates
+        # Set a timer for periodic forced updates (run by the maintenance thread)
         self.last_forced_update = time.time()
         self.force_update_interval = 120  # 2 minutes
         
         # Maintenance thread
         self.maintenance_running = False
         self.maintenance_thread = None
+        
+        # Connection statistics for the current camera (reconnects and downtime)
+        self.connection_stats = self._new_connection_stats(None)
 
     def point_in_polygon(self, point, polygon):
         """Check if a point is inside a polygon using the ray-casting algorithm."""
@@ -121,8 +136,17 @@ class VideoProcessor:
             # For files, check if the file exists
             return os.path.exists(source_path) and os.access(source_path, os.R_OK)
 
-    def start_processing(self, source_path, roi_points):
-        """Start video processing in a separate thread with either file or RTSP stream."""
+    def start_processing(self, source, roi_points):
+        """
+        Start video processing in a separate thread with either file or RTSP stream.
+        
+        Args:
+            source: Video file path, RTSP URL or CameraSource. Detection runs on the
+                    camera's detection stream; ROI points are in its coordinates.
+            roi_points: ROI polygon
+        """
+        camera = source if isinstance(source, CameraSource) else CameraSource(source)
+        source_path = camera.detection_url
         print(f"Attempting to start processing with: {source_path}")
         
         # Determine if the source is an RTSP stream
@@ -145,10 +169,29 @@ class VideoProcessor:
                 print(f"Warning: Could not get frame count: {e}")
                 self.total_frames = 1000  # Fallback to a default value
         
+        self.camera = camera
         self.source_path = source_path
         self.roi_points = roi_points
         self.is_processing = True
         self.frame_count = 0
+        self.connection_stats = self._new_connection_stats(source_path)
+        
+        # Evidence frames are only converted and written when an entry or exit needs a snapshot
+        if self.evidence_recorder:
+            self.evidence_recorder.stop()
+            self.evidence_recorder = None
+        if camera.has_evidence_stream:
+            self.evidence_recorder = EvidenceRecorder(camera)
+            self.evidence_recorder.start()
+        
+        # JPEG previews are encoded once per camera and served to every viewer
+        if self.preview:
+            self.preview.stop()
+        self.preview = PreviewPublisher(self)
+        self.preview.start()
+        preview_server.register(camera.camera_id, self.preview)
+        if Config.PREVIEW_SERVER_ENABLED:
+            preview_server.start_server()
         
         # Reset tracking data
         self.tracked_vehicles = {}
@@ -160,7 +203,10 @@ class VideoProcessor:
             self.processing_thread.daemon = True
             self.processing_thread.start()
             
-        # Start maintenance tasks
+        # Start event delivery and maintenance tasks
+        self.dispatcher.start()
+        if Config.METRICS_SERVER_ENABLED:
+            api_metrics.start_server()
         self.start_maintenance_tasks()
         
         return True
@@ -173,6 +219,22 @@ class VideoProcessor:
         
         # Stop maintenance tasks
         self.stop_maintenance_tasks()
+        
+        if self.evidence_recorder:
+            self.evidence_recorder.stop()
+        
+        if self.preview:
+            self.preview.stop()
+            if self.camera:
+                preview_server.unregister(self.camera.camera_id)
+        
+        # Remove the shared-memory segments so each start/stop does not leave them in /dev/shm.
+        # The rings are not closed: the preview publisher and UI threads may still be reading
+        # them or hold frame views, and the mapping is released once the last of those is gone.
+        if self.frame_rings is not None:
+            for ring in self.frame_rings.values():
+                ring.unlink()
+            self.frame_rings = None
 
     def _process_video(self):
         """Process video directly with YOLO streaming."""
@@ -186,13 +248,9 @@ class VideoProcessor:
             previous_in_roi_track_ids = set()
             current_in_roi_track_ids = set()
             
-            # Use YOLO's streaming mode by directly passing the source path
-            for result in self.vehicle_model.predict(
-                    source=self.source_path,
-                    conf=Config.YOLO_CONFIDENCE,
-                    classes=Config.YOLO_CLASSES,
-                    device='0',
-                    stream=True):  # Enable streaming mode for real-time processing
+            # Frames are read by our own capture so that a dropped RTSP stream can be
+            # reopened without reloading the model or resetting the tracker
+            for result in self._stream_results():
                 
                 if not self.is_processing:
                     break
@@ -262,25 +320,18 @@ class VideoProcessor:
                             
                             # Log entry
                             logger.info(f"Vehicle entered ROI: ID {track_id}, Time {current_time}")
+                            self.request_evidence(track_id, "entry", frame, (x1, y1, x2, y2))
                             
-                            # Send entry data to the server
-                            response = post_vehicle_entry(
+                            # Queue entry data for the server; the server ID arrives via callback
+                            self.tracked_vehicles[track_id]["idempotency_key"] = self.dispatcher.dispatch_entry(
                                 petrol_pump_id="IOCL-1",  # Replace with actual petrol pump ID
-                                vehicle_id=str(track_id),
+                                track_id=track_id,
                                 entering_time=current_time,
                                 date=current_date,
-                                vehicle_type=vehicle_type  # Pass vehicle type to the API
+                                vehicle_type=vehicle_type,  # Pass vehicle type to the API
+                                camera_id=self.camera.camera_id if self.camera else None,
+                                callback=lambda response, track_id=track_id: self._on_entry_result(track_id, response)
                             )
-                            
-                            # Check and store server response
-                            if response and "VehicleID" in response:
-                                server_id = response["VehicleID"]
-                                self.tracked_vehicles[track_id]["server_vehicle_id"] = server_id
-                                self.tracked_vehicles[track_id]["post_completed"] = True
-                                logger.info(f"Server assigned ID {server_id} to vehicle {track_id}")
-                                print(f"[ENTRY] Track ID {track_id} -> Server ID {server_id}")
-                            else:
-                                logger.warning(f"No server ID received for vehicle {track_id} entry")
                         
                         # Display additional info in bounding boxes
                         # Draw bounding box and labels
@@ -321,47 +372,10 @@ class VideoProcessor:
                         
                         # Log exit
                         logger.info(f"Vehicle exited ROI: ID {track_id}, Exit Time {exit_time}, Duration {filling_time}")
+                        self.request_evidence(track_id, "exit", frame)
                         
-                        # Check if we have a server-assigned ID
-                        vehicle_id_for_update = self.tracked_vehicles[track_id].get("server_vehicle_id")
-                        
-                        # First check if POST was completed
-                        if not self.tracked_vehicles[track_id].get("post_completed", False):
-                            # POST not completed - check if we can get status from the tracker
-                            status = get_vehicle_status(track_id=str(track_id))
-                            if status and status.get("posted") and status.get("server_vehicle_id"):
-                                # We have server ID from tracker
-                                vehicle_id_for_update = status.get("server_vehicle_id")
-                                self.tracked_vehicles[track_id]["server_vehicle_id"] = vehicle_id_for_update
-                                self.tracked_vehicles[track_id]["post_completed"] = True
-                                logger.info(f"Retrieved server ID {vehicle_id_for_update} from tracker for vehicle {track_id}")
-                        
-                        # Debug which ID we're using
-                        if vehicle_id_for_update:
-                            logger.info(f"Using server ID {vehicle_id_for_update} for exit update")
-                            print(f"[EXIT] Using server ID {vehicle_id_for_update} for track ID {track_id}")
-                        else:
-                            logger.warning(f"No server ID available for vehicle {track_id}, using track ID")
-                            print(f"[EXIT] Using fallback track ID {track_id} (no server ID)")
-                            vehicle_id_for_update = str(track_id)
-                        
-                        # Update exit data on the server
-                        update_result = update_vehicle_exit(
-                            petrol_pump_id="IOCL-1",  # Replace with actual petrol pump ID
-                            vehicle_id=vehicle_id_for_update,
-                            exit_time=exit_time,
-                            filling_time=filling_time,
-                            entry_time=entry_time
-                        )
-                        
-                        # Check update result
-                        if update_result is True:
-                            self.tracked_vehicles[track_id]["put_completed"] = True
-                            logger.info(f"Successfully updated exit for vehicle {track_id}")
-                        elif update_result is False:
-                            logger.warning(f"Failed to update exit for vehicle {track_id}")
-                        else:
-                            logger.info(f"Exit update for vehicle {track_id} running in background")
+                        # Queue exit data for the server; the dispatcher resolves the server ID
+                        self._dispatch_exit(track_id, exit_time, filling_time, entry_time)
                         
                         # Mark vehicle as exited
                         self.tracked_vehicles[track_id]["in_roi"] = False
@@ -387,9 +401,8 @@ class VideoProcessor:
                     cv2.putText(processed_frame, fps_text, (10, 30), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
                 
-                # Update shared data for Streamlit to access
-                self.original_frame = frame.copy()
-                self.processed_frame = processed_frame
+                # Publish frames for the UI and any other readers
+                self._publish_frames(frame, processed_frame)
                 
                 # Update progress (for video files)
                 frame_count += 1
@@ -400,18 +413,6 @@ class VideoProcessor:
                     # For RTSP streams, we don't know the total frames, so we set progress to a cycling value
                     self.current_progress = (frame_count % 100) / 100
                 
-                # Check if it's time to force update stale vehicles
-                current_time = time.time()
-                if current_time - self.last_forced_update > self.force_update_interval:
-                    try:
-                        updated_count = force_update_stale_vehicles()
-                        if updated_count > 0:
-                            logger.info(f"Forced updates for {updated_count} stale vehicles")
-                    except Exception as e:
-                        logger.error(f"Error during forced updates: {str(e)}")
-                    
-                    self.last_forced_update = current_time
-                
                 # Small delay to reduce CPU usage
                 time.sleep(0.001)
             
@@ -421,14 +422,274 @@ class VideoProcessor:
         self.is_processing = False
         print("Video processing completed.")
     
+    def _new_connection_stats(self, source_path):
+        """Create an empty connection statistics record for a camera source."""
+        return {
+            "camera_id": self.camera.camera_id if self.camera else None,
+            "source": source_path,
+            "connected": False,
+            "disconnects": 0,
+            "reconnects": 0,
+            "reconnect_attempts": 0,
+            "downtime_seconds": 0.0,
+            "last_disconnect": None,
+            "last_reconnect": None
+        }
+    
+    def _open_capture(self):
+        """Open a capture for the current source, applying RTSP timeouts."""
+        if Config.DECODER_BACKEND == "pyav":
+            # Decode in a separate process and receive frames through shared memory
+            cap = DecoderProcess(self.source_path)
+        elif self.is_rtsp:
+            timeout_ms = Config.RTSP_CONNECTION_TIMEOUT * 1000
+            cap = cv2.VideoCapture(self.source_path, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+            ])
+        else:
+            cap = cv2.VideoCapture(self.source_path)
+        
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+    
+    def _read_frame(self, cap):
+        """Read a frame, retrying transient RTSP read failures."""
+        retries = Config.RTSP_MAX_RETRIES if self.is_rtsp else 1
+        for _ in range(retries):
+            ret, frame = cap.read()
+            if ret:
+                return True, frame
+        return False, None
+    
+    def _reconnect(self):
+        """
+        Reopen the capture with exponential backoff after the stream dropped.
+        Only the capture is recreated; the model, tracker and tracked vehicles are kept.
+        
+        Returns:
+            cv2.VideoCapture: The reopened capture, or None if all attempts failed
+        """
+        stats = self.connection_stats
+        disconnected_at = time.time()
+        stats["connected"] = False
+        stats["disconnects"] += 1
+        stats["last_disconnect"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        logger.warning(f"Stream {self.source_path} dropped, reconnecting")
+        
+        delay = Config.RTSP_RECONNECT_DELAY
+        for attempt in range(1, Config.RTSP_RECONNECT_ATTEMPTS + 1):
+            if not self.is_processing:
+                break
+            
+            stats["reconnect_attempts"] += 1
+            cap = self._open_capture()
+            if cap is not None:
+                downtime = time.time() - disconnected_at
+                stats["connected"] = True
+                stats["reconnects"] += 1
+                stats["downtime_seconds"] += downtime
+                stats["last_reconnect"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                logger.info(f"Reconnected to {self.source_path} after {downtime:.1f}s (attempt {attempt})")
+                return cap
+            
+            # Back off before the next attempt, doubling the delay each time
+            if attempt < Config.RTSP_RECONNECT_ATTEMPTS:
+                wait = min(delay, Config.RTSP_RECONNECT_MAX_DELAY)
+                logger.warning(f"Reconnect attempt {attempt} failed, retrying in {wait}s")
+                time.sleep(wait)
+                delay *= 2
+        
+        stats["downtime_seconds"] += time.time() - disconnected_at
+        logger.error(f"Giving up on {self.source_path} after {Config.RTSP_RECONNECT_ATTEMPTS} reconnect attempts")
+        return None
+    
+    def _stream_results(self):
+        """Yield detection results frame by frame, reconnecting RTSP sources when they drop."""
+        cap = self._open_capture()
+        if cap is None:
+            print(f"Error: Could not open source {self.source_path}")
+            return
+        self.connection_stats["connected"] = True
+        
+        # Frames resized at decode time need the ROI (drawn on a full-size frame) scaled to match
+        source_size = getattr(cap, "source_size", None)
+        frame_size = getattr(cap, "frame_size", None)
+        if source_size and frame_size and source_size != frame_size:
+            self.roi_points = map_points(self.roi_points, source_size, frame_size)
+        
+        try:
+            while self.is_processing:
+                ret, frame = self._read_frame(cap)
+                if not ret:
+                    # End of file for videos; a dropped connection for RTSP streams
+                    if not self.is_rtsp:
+                        break
+                    cap.release()
+                    cap = self._reconnect()
+                    if cap is None:
+                        break
+                    continue
+                
+                yield self.vehicle_model.predict(
+                    source=frame,
+                    conf=Config.YOLO_CONFIDENCE,
+                    classes=Config.YOLO_CLASSES,
+                    device='0',
+                    verbose=False)[0]
+        finally:
+            if cap is not None:
+                cap.release()
+            self.connection_stats["connected"] = False
+    
+    def request_evidence(self, track_id, event, frame, box=None):
+        """Queue a snapshot of an entry or exit from the evidence stream, if the camera has one."""
+        if self.evidence_recorder is None:
+            return
+        detection_size = (frame.shape[1], frame.shape[0])
+        self.evidence_recorder.request(track_id, event, detection_size, box, self.roi_points)
+    
+    def get_connection_stats(self):
+        """Get reconnect counts and downtime for the current camera."""
+        return dict(self.connection_stats)
+    
+    def _publish_frames(self, frame, processed_frame):
+        """Write the original and processed frame into their shared-memory rings under the same sequence number."""
+        if self.frame_rings is None or self.frame_rings["original"].shape != frame.shape:
+            if self.frame_rings is not None:
+                # Readers may still hold views into the old rings; only drop their names
+                for ring in self.frame_rings.values():
+                    ring.unlink()
+            self.frame_rings = {
+                "original": FrameRing(frame.shape, slots=Config.FRAME_RING_SLOTS),
+                "processed": FrameRing(frame.shape, slots=Config.FRAME_RING_SLOTS)
+            }
+        self.frame_rings["original"].write(frame)
+        self.frame_rings["processed"].write(processed_frame)
+    
+    def get_frames_since(self, last_seq=0):
+        """
+        Get copies of the latest original and processed frames if they are newer than last_seq.
+        
+        Args:
+            last_seq (int): Sequence number the caller has already displayed
+        
+        Returns:
+            tuple: (seq, original_frame, processed_frame), or (last_seq, None, None) if nothing is new
+        """
+        rings = self.frame_rings
+        if rings is None:
+            return last_seq, None, None
+        
+        # The processed frame is written last, so its sequence is always available in both rings
+        seq, processed = rings["processed"].read_latest(last_seq)
+        if processed is None:
+            return last_seq, None, None
+        original = rings["original"].read(seq)
+        if original is None:
+            return last_seq, None, None
+        return seq, original, processed
+    
+    def consume_frames_since(self, consumer, last_seq=0, attempts=3):
+        """
+        Run consumer(original, processed) on zero-copy views of the latest frames newer than last_seq.
+        
+        The result is kept only if neither ring reused the frames' slots before consumer
+        returned; torn frames are dropped and the newest pair is tried again.
+        
+        Returns:
+            tuple: (seq, consumer result), or (last_seq, None) if there is nothing new or intact
+        """
+        rings = self.frame_rings
+        if rings is None:
+            return last_seq, None
+        
+        original_ring, processed_ring = rings["original"], rings["processed"]
+        for _ in range(attempts):
+            seq = processed_ring.latest_seq
+            # A sequence below last_seq means the rings were recreated and numbering restarted
+            if seq == 0 or seq == last_seq:
+                return last_seq, None
+            original, processed = original_ring.view(seq), processed_ring.view(seq)
+            if original is None or processed is None:
+                continue
+            result = consumer(original, processed)
+            if original_ring.is_current(seq) and processed_ring.is_current(seq):
+                return seq, result
+        return last_seq, None
+    
+    def get_frame_ring_info(self):
+        """
+        Describe the frame rings so readers in other processes can attach with
+        FrameRing(shape, slots=slots, name=name, create=False).
+        """
+        if self.frame_rings is None:
+            return None
+        return {key: {"name": ring.name, "shape": ring.shape, "slots": ring.slots}
+                for key, ring in self.frame_rings.items()}
+    
+    def get_preview_jpeg(self, view="processed"):
+        """
+        Get the latest downscaled JPEG preview ("original" or "processed").
+        
+        Returns:
+            tuple: (seq, jpeg bytes), with bytes None before the first preview
+        """
+        if self.preview is None:
+            return 0, None
+        return self.preview.get_jpeg(view)
+    
     def get_current_frames(self):
         """Get the current original and processed frames."""
-        return self.original_frame, self.processed_frame
+        _, original, processed = self.get_frames_since(0)
+        return original, processed
     
     def get_progress(self):
         """Get the current processing progress."""
         return self.current_progress, self.total_frames, self.is_processing, self.detection_fps
         
+    def _dispatch_exit(self, track_id, exit_time, filling_time, entry_time):
+        """Queue an exit update for a tracked vehicle, using its server ID when already known."""
+        self.dispatcher.dispatch_exit(
+            petrol_pump_id="IOCL-1",  # Replace with actual petrol pump ID
+            track_id=track_id,
+            exit_time=exit_time,
+            filling_time=filling_time,
+            entry_time=entry_time,
+            server_id=self.tracked_vehicles[track_id].get("server_vehicle_id"),
+            idempotency_key=self.tracked_vehicles[track_id].get("idempotency_key"),
+            callback=lambda success: self._on_exit_result(track_id, success)
+        )
+    
+    def _on_entry_result(self, track_id, response):
+        """Store the server-assigned ID once a dispatched entry completes."""
+        vehicle = self.tracked_vehicles.get(track_id)
+        if vehicle is None:
+            return
+        
+        if response and "VehicleID" in response:
+            server_id = response["VehicleID"]
+            vehicle["server_vehicle_id"] = server_id
+            vehicle["post_completed"] = True
+            logger.info(f"Server assigned ID {server_id} to vehicle {track_id}")
+            print(f"[ENTRY] Track ID {track_id} -> Server ID {server_id}")
+        else:
+            logger.warning(f"No server ID received for vehicle {track_id} entry")
+    
+    def _on_exit_result(self, track_id, success):
+        """Record the outcome of a dispatched exit update."""
+        vehicle = self.tracked_vehicles.get(track_id)
+        if vehicle is None:
+            return
+        
+        if success is True:
+            vehicle["put_completed"] = True
+            logger.info(f"Successfully updated exit for vehicle {track_id}")
+        else:
+            logger.warning(f"Failed to update exit for vehicle {track_id}")
+    
     def calculate_filling_time(self, entry_time, exit_time):
         """Calculate the filling time in minutes."""
         fmt = "%H:%M:%S"
@@ -468,23 +729,8 @@ class VideoProcessor:
                         # Calculate filling time
                         filling_time = self.calculate_filling_time(vehicle_data["entry_time"], current_time_str)
                         
-                        # Get server ID if available
-                        vehicle_id_for_update = vehicle_data.get("server_vehicle_id", str(track_id))
-                        
-                        # Update exit data on the server
-                        update_result = update_vehicle_exit(
-                            petrol_pump_id="IOCL-1",  # Replace with actual petrol pump ID
-                            vehicle_id=vehicle_id_for_update,
-                            exit_time=current_time_str,
-                            filling_time=filling_time,
-                            entry_time=vehicle_data["entry_time"]
-                        )
-                        
-                        if update_result is True:
-                            self.tracked_vehicles[track_id]["put_completed"] = True
-                            logger.info(f"Successfully forced exit update for vehicle {track_id}")
-                        else:
-                            logger.warning(f"Failed to force exit update for vehicle {track_id}")
+                        # Queue exit data for the server
+                        self._dispatch_exit(track_id, current_time_str, filling_time, vehicle_data["entry_time"])
             except Exception as e:
                 logger.error(f"Error checking vehicle {track_id}: {e}")
                 
@@ -544,6 +790,15 @@ class VideoProcessor:
                 # Clean up old tracked vehicles
                 self.cleanup_tracked_vehicles()
                 
+                # Periodically force exit updates for stale vehicles; the batch runs
+                # concurrently on the API client loop and is bounded in time
+                current_time = time.time()
+                if current_time - self.last_forced_update > self.force_update_interval:
+                    self.last_forced_update = current_time
+                    updated_count = force_update_stale_vehicles()
+                    if updated_count > 0:
+                        logger.info(f"Forced updates for {updated_count} stale vehicles")
+                
             except Exception as e:
                 logger.error(f"Error in maintenance tasks: {str(e)}")
     
@@ -582,25 +837,10 @@ class VideoProcessor:
                 self.tracked_vehicles[track_id]["in_roi"] = False
                 self.tracked_vehicles[track_id]["exit_time"] = current_time
                 
-                # Get server ID if available
-                vehicle_id_for_update = vehicle_data.get("server_vehicle_id", str(track_id))
-                
-                # Update exit data on the server
-                update_result = update_vehicle_exit(
-                    petrol_pump_id="IOCL-1",  # Replace with actual petrol pump ID
-                    vehicle_id=vehicle_id_for_update,
-                    exit_time=current_time,
-                    filling_time=filling_time,
-                    entry_time=entry_time
-                )
-                
-                if update_result is True:
-                    self.tracked_vehicles[track_id]["put_completed"] = True
-                    logger.info(f"Successfully forced exit for vehicle {track_id}")
-                    return True
-                else:
-                    logger.warning(f"Failed to force exit for vehicle {track_id}")
-                    return False
+                # Queue exit data for the server
+                self._dispatch_exit(track_id, current_time, filling_time, entry_time)
+                logger.info(f"Forced exit dispatched for vehicle {track_id}")
+                return True
             else:
                 logger.warning(f"Vehicle {track_id} is not in ROI")
                 return False